@@ -0,0 +1 @@
+# This file makes the capacity_test directory a Python package
@@ -0,0 +1,103 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import capacity_test
+
+COEFFICIENTS = [20.0, 0.002, -0.05, 0.1]
+
+
+def make_fifteen_min_df(windows=2000, noise=50.0, seed=1):
+    """
+    Good 15 minute windows whose power follows the capacity test model with COEFFICIENTS, plus noise.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'15 Minute': pd.date_range("2024-01-01 00:00:00", periods=windows, freq="h")})
+    poa = rng.uniform(100, 1100, windows)
+    temperature = rng.uniform(5, 35, windows)
+    wind_speed = rng.uniform(0, 10, windows)
+    a1, a2, a3, a4 = COEFFICIENTS
+    df[capacity_test.POWER_TAG] = (poa * (a1 + a2 * poa + a3 * temperature + a4 * wind_speed)
+                                   + rng.normal(0, noise, windows))
+    df[capacity_test.POA_TAG] = poa
+    df[capacity_test.AMBIENT_TEMPERATURE_TAG] = temperature
+    df[capacity_test.WIND_SPEED_TAG] = wind_speed
+    df['is_valid'] = 1
+    return df
+
+
+class TestCapacityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.df = make_fifteen_min_df()
+
+    def reference_fit(self, df, rc_poa, band=0.2):
+        # Least squares of the windows near the reporting irradiance of one period
+        df = df[(df['is_valid'] == 1) & ((df[capacity_test.POA_TAG] - rc_poa).abs() <= band * rc_poa)]
+        poa = df[capacity_test.POA_TAG].to_numpy()
+        x = np.column_stack([poa, poa ** 2, poa * df[capacity_test.AMBIENT_TEMPERATURE_TAG],
+                             poa * df[capacity_test.WIND_SPEED_TAG]])
+        coefficients = np.linalg.lstsq(x, df[capacity_test.POWER_TAG].to_numpy(), rcond=None)[0]
+        return coefficients, len(df)
+
+    def test_matches_least_squares(self):
+        periods = capacity_test.calendar_periods(self.df['15 Minute'], "MS")
+        capacity_df = capacity_test.fit_capacity(self.df, periods)
+
+        self.assertEqual(len(capacity_df), 3)
+        for row, (start, end) in zip(capacity_df.itertuples(index=False), periods):
+            period_df = self.df[(self.df['15 Minute'] >= start) & (self.df['15 Minute'] < end)]
+            self.assertAlmostEqual(row.rc_poa, np.percentile(period_df[capacity_test.POA_TAG], 60))
+
+            coefficients, windows = self.reference_fit(period_df, row.rc_poa)
+            self.assertEqual(row.windows, windows)
+            np.testing.assert_allclose([row.a1, row.a2, row.a3, row.a4], coefficients, rtol=1e-6)
+
+    def test_capacity_and_confidence_interval(self):
+        capacity_df = capacity_test.fit_capacity(self.df, reporting_conditions={'poa': 800, 'temperature': 25,
+                                                                                'wind_speed': 4})
+
+        a1, a2, a3, a4 = COEFFICIENTS
+        expected = 800 * (a1 + a2 * 800 + a3 * 25 + a4 * 4)
+        row = capacity_df.iloc[0]
+        self.assertEqual((row['rc_poa'], row['rc_temperature'], row['rc_wind_speed']), (800, 25, 4))
+        self.assertLess(row['capacity_lower'], expected)
+        self.assertGreater(row['capacity_upper'], expected)
+        self.assertLess(row['capacity_upper'] - row['capacity_lower'], 0.01 * expected)
+        self.assertGreater(row['r_squared'], 0.99)
+
+    def test_not_fitted(self):
+        df = self.df.copy()
+        df.loc[df.index[:1990], 'is_valid'] = 0
+        self.assertTrue(capacity_test.fit_capacity(df)['capacity'].isna().all())
+
+        df = self.df.copy()
+        df[capacity_test.POA_TAG] = 800.0
+        self.assertTrue(capacity_test.fit_capacity(df)['capacity'].isna().all())
+
+        self.assertTrue(capacity_test.fit_capacity(self.df.iloc[:0]).empty)
+
+    def test_periods(self):
+        periods = [("2024-01-01", "2024-01-15"), ("2024-02-01", "2024-02-10")]
+        labels = capacity_test.period_labels(self.df['15 Minute'].to_numpy(), periods)
+
+        self.assertEqual(np.bincount(labels + 1).tolist(), [2000 - 14 * 24 - 9 * 24, 14 * 24, 9 * 24])
+        with self.assertRaises(ValueError):
+            capacity_test.period_labels(self.df['15 Minute'].to_numpy(), [("2024-01-01", "2024-01-15"),
+                                                                          ("2024-01-10", "2024-01-20")])
+
+    def test_local_calendar_periods(self):
+        utc_times = pd.to_datetime(["2024-01-31 10:00:00", "2024-01-31 12:00:00"])  # 11 pm and 1 am in New Zealand
+
+        periods = capacity_test.calendar_periods(utc_times, "MS", "Pacific/Auckland")
+
+        self.assertEqual(periods, [(pd.Timestamp("2023-12-31 11:00:00"), pd.Timestamp("2024-01-31 11:00:00")),
+                                   (pd.Timestamp("2024-01-31 11:00:00"), pd.Timestamp("2024-02-29 11:00:00"))])
+
+    def test_t_quantile(self):
+        np.testing.assert_allclose(capacity_test.t_quantile(0.975, [5, 10, 30]), [2.5706, 2.2281, 2.0423], atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
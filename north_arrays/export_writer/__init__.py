@@ -0,0 +1 @@
+# This file makes the export_writer directory a Python package
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+import export_writer
+
+
+class TestExportWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_writes_to_same_file_keep_submission_order(self):
+        filename = os.path.join(self.directory.name, "out.csv")
+
+        def append(value, delay):
+            time.sleep(delay)
+            with open(filename, "a") as f:
+                f.write(f"{value}\n")
+
+        with export_writer.ExportWriter(max_workers=4) as writer:
+            for value, delay in [(1, 0.05), (2, 0.0), (3, 0.02)]:
+                writer.submit(filename, append, value, delay)
+
+        with open(filename) as f:
+            self.assertEqual(f.read().split(), ["1", "2", "3"])
+
+    def test_different_files_are_written_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        with export_writer.ExportWriter(max_workers=2) as writer:
+            writer.submit("a.csv", barrier.wait)
+            writer.submit("b.csv", barrier.wait)  # Would time out if the jobs ran one after the other
+
+    def test_flush_writes_frames(self):
+        filename = os.path.join(self.directory.name, "frame.csv")
+        df = pd.DataFrame({"a": [1, 2, 3]})
+
+        writer = export_writer.ExportWriter()
+        writer.submit(filename, df.to_csv, filename, index=False)
+        writer.flush()
+
+        pd.testing.assert_frame_equal(pd.read_csv(filename), df)
+        writer.close()
+
+    def test_flush_raises_export_errors(self):
+        def fail():
+            raise OSError("disk full")
+
+        writer = export_writer.ExportWriter()
+        writer.submit("bad.csv", fail)
+
+        with self.assertRaises(OSError):
+            writer.flush()
+        writer.close()
+
+    def test_pipeline_error_is_not_masked(self):
+        with self.assertRaises(ValueError):
+            with export_writer.ExportWriter() as writer:
+                writer.submit("bad.csv", lambda: 1 / 0)
+                raise ValueError("pipeline failed")
+
+
+if __name__ == '__main__':
+    unittest.main()
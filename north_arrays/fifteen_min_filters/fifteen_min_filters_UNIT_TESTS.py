@@ -126,6 +126,37 @@ class FilterIrradiance(unittest.TestCase):
 
 
 
+class FilterIrradianceReference(unittest.TestCase):
+
+    def make_window(self, ghi):
+        df = pd.DataFrame({'15 Minute': [pd.Timestamp("2024-01-10 12:00:00")] * 15})
+        ghi_tag, poa_tag = fifteen_min_filters.REQUIRED_COLUMNS['irradiance']
+        df[ghi_tag] = ghi
+        df[poa_tag] = 900.0
+        return df
+
+    def test_clear_sky_reference(self):
+        # Arrange
+        df = self.make_window(ghi=700.0)
+
+        # Act
+        _, constant_reasons = fifteen_min_filters.filter_irradiance_range(df, [], 400, 250)
+        _, clear_sky_reasons = fifteen_min_filters.filter_irradiance_range(df, [], 400, 250, reference="clear_sky",
+                                                                           reference_ghi=950.0)
+        _, missing_reference_reasons = fifteen_min_filters.filter_irradiance_range(df, [], 400, 250,
+                                                                                   reference="clear_sky",
+                                                                                   reference_ghi=float("nan"))
+
+        # Assert
+        self.assertEqual(len(constant_reasons), 1, "700 is above 1.2 * TRC.")
+        self.assertEqual(clear_sky_reasons, [], "700 is within 0.5 to 1.2 times the clear-sky GHI.")
+        self.assertEqual(missing_reference_reasons, constant_reasons, "TRC is used without a clear-sky GHI.")
+
+    def test_unknown_reference(self):
+        with self.assertRaises(ValueError):
+            fifteen_min_filters.filter_irradiance_range(self.make_window(ghi=500.0), [], 400, 250, reference="model")
+
+
 class FilterTemperature(unittest.TestCase):
 
         def test_filter_temperature_range_good(self):
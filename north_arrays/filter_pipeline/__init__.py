@@ -0,0 +1 @@
+# This file makes the filter_pipeline directory a Python package
@@ -0,0 +1,368 @@
+import json
+import time
+
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import rejection_codes.rejection_codes as rejection_codes
+import three_sec_filters.three_sec_filters as three_sec_filters
+
+# This file contains the filter registry and the pipeline builder.
+# Every 3 second filter and 15 minute sub-filter is registered with the columns it reads, its parameters
+# and the rejection reasons it can add. A pipeline is built from the registry and an optional config,
+# so rules can be enabled, disabled or re-parameterised without editing code.
+
+
+class FilterSpec:
+    """
+    A registered filter.
+
+    - stage: "3s" (function(df, **context, **params) -> df) or
+             "15min" (function(window_df, rejection_reasons, **context, **params) -> (window_df, rejection_reasons))
+    - columns: SCADA tags read, or a function of the inverters returning them
+    - params: default parameters, passed as keyword arguments
+    - rejection_reasons: reasons the filter can add, "{inverter}" is replaced by each inverter name
+    - context: names of the pipeline context values the function takes (e.g. inverters, state, backend, events)
+    - stateful: the filter carries state between chunks and always runs
+    - enabled: whether the filter runs when the config does not say otherwise
+    """
+
+    def __init__(self, name, stage, function, description, columns=(), params=None, rejection_reasons=(),
+                 context=(), stateful=False, enabled=True):
+        self.name = name
+        self.stage = stage
+        self.function = function
+        self.description = description
+        self.columns = columns
+        self.params = params or {}
+        self.rejection_reasons = list(rejection_reasons)
+        self.context = tuple(context)
+        self.stateful = stateful
+        self.enabled = enabled
+
+    def required_columns(self, inverters):
+        return list(self.columns(inverters)) if callable(self.columns) else list(self.columns)
+
+    def expanded_rejection_reasons(self, inverters):
+        """
+        Returns the rejection reasons, with the per-inverter reasons listed inverter by inverter.
+        """
+        reasons = [reason for reason in self.rejection_reasons if "{inverter}" not in reason]
+        templates = [reason for reason in self.rejection_reasons if "{inverter}" in reason]
+        for inverter in inverters:
+            reasons += [template.format(inverter=inverter.name) for template in templates]
+        return reasons
+
+    def __repr__(self):
+        return f"FilterSpec({self.name}, {self.stage})"
+
+
+# Registered filters, by name, in the order they run
+FILTER_REGISTRY = {}
+
+
+def register_filter(spec):
+    """
+    Adds a filter to the registry. Filters run in the order they are registered.
+    """
+    if spec.stage not in ("3s", "15min"):
+        raise ValueError(f"Unknown filter stage: {spec.stage}")
+    if spec.name in FILTER_REGISTRY:
+        raise ValueError(f"Filter already registered: {spec.name}")
+    FILTER_REGISTRY[spec.name] = spec
+    return spec
+
+
+def inverter_rejection_reasons(inverters):
+    """
+    Returns the per-inverter rejection reasons of the registered filters, by inverter name.
+    """
+    templates = [reason for spec in FILTER_REGISTRY.values() for reason in spec.rejection_reasons
+                 if "{inverter}" in reason]
+    return {inverter.name: [template.format(inverter=inverter.name) for template in templates]
+            for inverter in inverters}
+
+
+def load_filter_config(filename):
+    """
+    Loads a filter config from a JSON file, e.g.
+    {"power_dead_value": {"enabled": true}, "irradiance_range": {"params": {"TRC": 450}}}
+    """
+    with open(filename) as f:
+        return json.load(f)
+
+
+def build_pipeline(stage, config=None, skip_invalid=False, short_circuit=False):
+    """
+    Builds the pipeline of enabled filters of a stage ("3s" or "15min").
+
+    - config: dict of filter name -> {"enabled": bool, "params": {...}}, overriding the registry defaults
+    - skip_invalid: skip stateless 3 second filters when every row is already invalid
+      (the skipped filters do not add their rejection reasons)
+    - short_circuit: stop evaluating the 15 minute filters of a window once it is rejected
+      (faster, but only the first rejection reasons are recorded)
+    """
+    config = config or {}
+    unknown = [name for name in config if name not in FILTER_REGISTRY]
+    if unknown:
+        raise ValueError(f"Unknown filters in config: {unknown}")
+
+    steps = []
+    for spec in FILTER_REGISTRY.values():
+        if spec.stage != stage:
+            continue
+        filter_config = config.get(spec.name, {})
+        if not filter_config.get("enabled", spec.enabled):
+            continue
+
+        params = dict(spec.params)
+        unknown_params = [name for name in filter_config.get("params", {}) if name not in params]
+        if unknown_params:
+            raise ValueError(f"Unknown parameters for {spec.name}: {unknown_params}")
+        params.update(filter_config.get("params", {}))
+
+        steps.append((spec, params))
+
+    return FilterPipeline(stage, steps, skip_invalid=skip_invalid, short_circuit=short_circuit)
+
+
+class FilterPipeline:
+    """
+    An ordered list of enabled filters with their parameters.
+    Records the time spent and the rows (3s) or windows (15min) rejected by each filter.
+    """
+
+    def __init__(self, stage, steps, skip_invalid=False, short_circuit=False):
+        self.stage = stage
+        self.steps = steps
+        self.skip_invalid = skip_invalid
+        self.short_circuit = short_circuit
+        self.costs = {spec.name: {'seconds': 0.0, 'calls': 0, 'rejected': 0, 'skipped': 0} for spec, _ in steps}
+
+    @property
+    def names(self):
+        return [spec.name for spec, _ in self.steps]
+
+    def params(self, name):
+        """
+        Returns the parameters of an enabled filter, or None if it is not in the pipeline.
+        """
+        for spec, params in self.steps:
+            if spec.name == name:
+                return params
+        return None
+
+    def required_columns(self, inverters=()):
+        """
+        Returns the columns read by the enabled filters (each column once), so they can be read together.
+        Parameters naming a SCADA tag (ending in _tag, e.g. a setpoint) are read too.
+        """
+        columns = []
+        for spec, params in self.steps:
+            columns += spec.required_columns(inverters)
+            columns += [value for name, value in params.items() if name.endswith("_tag") and value]
+        return list(dict.fromkeys(columns))
+
+    def register_rejection_reasons(self, inverters=()):
+        """
+        Registers the rejection reasons of the enabled filters, so rejection codes get the same bits on every run.
+        """
+        for spec, _ in self.steps:
+            for reason in spec.expanded_rejection_reasons(inverters):
+                rejection_codes.get_rejection_bit(reason)
+
+    def run(self, df, context):
+        """
+        Runs the 3 second filters on a DataFrame.
+        """
+        for spec, params in self.steps:
+            print(f"    ⚙️  Applying '{spec.description}' filter...\n")
+            cost = self.costs[spec.name]
+            df_before = df["is_valid"].sum()
+
+            if self.skip_invalid and not spec.stateful and df_before == 0:
+                cost['skipped'] += 1
+                print("    ✅  Skipped, no valid rows left.\n")
+                continue
+
+            start = time.perf_counter()
+            df = spec.function(df, **{name: context.get(name) for name in spec.context}, **params)
+            cost['seconds'] += time.perf_counter() - start
+            cost['calls'] += 1
+
+            df_after = df["is_valid"].sum()
+            cost['rejected'] += int(df_before - df_after)
+            print(f"    ✅  Filter applied. {df_before - df_after} rows invalidated.\n")
+
+        return df
+
+    def run_window(self, window_df, context, rejection_reasons=None):
+        """
+        Runs the 15 minute filters on one window and returns its rejection reasons.
+        With short_circuit, the remaining filters are skipped as soon as there is a rejection reason
+        (including one passed in).
+        """
+        rejection_reasons = [] if rejection_reasons is None else rejection_reasons
+
+        for spec, params in self.steps:
+            cost = self.costs[spec.name]
+
+            if self.short_circuit and rejection_reasons:
+                cost['skipped'] += 1
+                continue
+
+            reasons_before = len(rejection_reasons)
+            start = time.perf_counter()
+            window_df, rejection_reasons = spec.function(window_df, rejection_reasons,
+                                                         **{name: context.get(name) for name in spec.context}, **params)
+            cost['seconds'] += time.perf_counter() - start
+            cost['calls'] += 1
+            cost['rejected'] += len(rejection_reasons) > reasons_before
+
+        return rejection_reasons
+
+    @property
+    def skipped_count(self):
+        return sum(cost['skipped'] for cost in self.costs.values())
+
+    def print_cost_report(self):
+        unit = "rows" if self.stage == "3s" else "windows"
+        print(f"🔹 Filter cost ({self.stage}):\n")
+        for name, cost in self.costs.items():
+            print(f"    {name:<34} {cost['seconds']:8.3f} s  {cost['rejected']:>8} {unit} rejected  "
+                  f"{cost['skipped']:>6} skipped")
+        print(f"\n    {self.skipped_count} filter evaluations skipped.\n")
+
+
+def inverter_columns(inverters):
+    return three_sec_filters.required_columns(inverters)['constrained_inverters']
+
+
+# 3 second filters
+register_filter(FilterSpec(
+    "point_of_connection_constraint", "3s", three_sec_filters.point_of_connection_constraint,
+    "Point of Connection Constraint",
+    columns=three_sec_filters.required_columns([])['point_of_connection_constraint'],
+    params={'real_power_limit': 30000 * 0.998, 'apparent_power_limit': 35120 * 0.998},
+    rejection_reasons=["Point of Connection Limitation"],
+    context=("events",),
+))
+register_filter(FilterSpec(
+    "constrained_inverters", "3s", three_sec_filters.filter_constrained_inverters,
+    "Constrained Inverter",
+    columns=inverter_columns,
+    params={'module_rating': 1.0975, 'threshold_factor': 0.998},
+    rejection_reasons=["{inverter} is constrained (apparent power)", "Not all power modules running in {inverter} "],
+    context=("inverters", "events"),
+))
+register_filter(FilterSpec(
+    "ac_curtailment", "3s", three_sec_filters.filter_ac_curtailment_periods,
+    "AC Curtailment",
+    columns=three_sec_filters.required_columns([])['ac_curtailment'],
+    params={'setpoint_tag': None, 'rating': 30000, 'tolerance_pct': 0.5, 'min_power_pct': 10,
+            'min_duration_seconds': 300},
+    rejection_reasons=["AC Curtailment"],
+    enabled=False,  # Without a setpoint tag, the flat output rule also rejects the clear-sky plateau around noon
+))
+register_filter(FilterSpec(
+    "bad_power_points", "3s", three_sec_filters.filter_bad_power_points,
+    "Bad Power Points",
+    columns=lambda inverters: three_sec_filters.required_columns(inverters)['bad_power_points'],
+    params={'rating': 30000, 'inverter_rating': 4 * 1097.5, 'negative_pct': 1, 'spike_pct': 20, 'sample_seconds': 3},
+    rejection_reasons=["Bad power point at POC", "{inverter} has a bad power point"],
+    context=("inverters",),
+    enabled=False,  # Opt in, it rejects readings the baseline filters keep
+))
+register_filter(FilterSpec(
+    "wind_stow", "3s", three_sec_filters.filter_wind_stow,
+    "Wind Stow",
+    columns=three_sec_filters.required_columns([])['wind_stow'],
+    params={'stow_start_threshold': 11.11, 'stow_end_threshold': 10.55, 'stow_release_seconds': 300},
+    rejection_reasons=["Wind Stow Active"],
+    context=("state", "backend", "events"),
+    stateful=True,
+))
+register_filter(FilterSpec(
+    "enough_points_in_minute", "3s", three_sec_filters.check_enough_points_in_minute,
+    "Enough Points In Minute",
+    params={'min_points': 5},
+    rejection_reasons=["Not enough points in minute"],
+))
+
+# 15 minute sub-filters
+register_filter(FilterSpec(
+    "irradiance_range", "15min", fifteen_min_filters.filter_irradiance_range,
+    "Irradiance - Range",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['irradiance'],
+    params={'TRC': 400, 'POA_lower_limit': 250, 'reference': "constant"},
+    rejection_reasons=["Irradiance - Range - WS241_ghi_lower_limit", "Irradiance - Range - WS241_ghi_upper_limit",
+                       "Irradiance - Range - WS241_poa_lower_limit"],
+    context=("reference_ghi",),
+))
+register_filter(FilterSpec(
+    "irradiance_dead_value", "15min", fifteen_min_filters.filter_irradiance_dead_value,
+    "Irradiance - Dead value",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['irradiance'],
+    rejection_reasons=["Irradiance - Dead value - WS241"],
+))
+register_filter(FilterSpec(
+    "irradiance_abrupt_change", "15min", fifteen_min_filters.filter_irradiance_abrupt_change,
+    "Irradiance - Abrupt change",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['irradiance'],
+    params={'max_std_ratio': 0.05},
+    rejection_reasons=["Irradiance - Abrupt change - WS241"],
+))
+register_filter(FilterSpec(
+    "temperature_range", "15min", fifteen_min_filters.filter_temperature_range,
+    "Temperature - Range",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['temperature'],
+    params={'lower_temp_limit': -10, 'upper_temp_limit': 50},
+    rejection_reasons=["Temperature - Range - WS211", "Temperature - Range - WS241"],
+))
+register_filter(FilterSpec(
+    "temperature_dead_value", "15min", fifteen_min_filters.filter_temperature_dead_value,
+    "Temperature - Dead value",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['temperature'],
+    rejection_reasons=["Temperature - Dead value - WS211", "Temperature - Dead value - WS241"],
+))
+register_filter(FilterSpec(
+    "temperature_abrupt_change", "15min", fifteen_min_filters.filter_temperature_abrupt_change,
+    "Temperature - Abrupt change",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['temperature'],
+    params={'max_change': 4},
+    rejection_reasons=["Temperature - Abrupt change - WS211", "Temperature - Abrupt change - WS241"],
+))
+register_filter(FilterSpec(
+    "wind_dead_value", "15min", fifteen_min_filters.filter_wind_dead_value,
+    "Wind - Dead value",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['wind_speed'],
+    rejection_reasons=["Wind - Dead value - WS211", "Wind - Dead value - WS241"],
+))
+register_filter(FilterSpec(
+    "wind_abrupt_change", "15min", fifteen_min_filters.filter_wind_abrupt_change,
+    "Wind - Abrupt change",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['wind_speed'],
+    params={'max_change': 10},
+    rejection_reasons=["Wind - Abrupt change - WS211", "Wind - Abrupt change - WS241"],
+))
+register_filter(FilterSpec(
+    "power_range", "15min", fifteen_min_filters.filter_power_range,
+    "Power - Range",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['AC_power'],
+    params={'rating': 30000},
+    rejection_reasons=["Power - Range"],
+))
+register_filter(FilterSpec(
+    "power_dead_value", "15min", fifteen_min_filters.filter_power_dead_value,
+    "Power - Dead value",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['AC_power'],
+    params={'threshold_pct': 0.1, 'run_length': 3},
+    rejection_reasons=["Power - Dead value"],
+    context=("backend",),
+    enabled=False,  # Tolerance is too high, see filter_AC_power
+))
+register_filter(FilterSpec(
+    "power_abrupt_change", "15min", fifteen_min_filters.filter_power_abrupt_change,
+    "Power - Abrupt change",
+    columns=fifteen_min_filters.REQUIRED_COLUMNS['AC_power'],
+    params={'max_std_ratio': 0.05},
+    rejection_reasons=["Power - Abrupt change"],
+))
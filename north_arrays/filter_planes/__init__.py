@@ -0,0 +1 @@
+# This file makes the filter_planes directory a Python package
@@ -0,0 +1,273 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import filter_pipeline.filter_pipeline as filter_pipeline
+import parameter_sweep.parameter_sweep as parameter_sweep
+import rejection_codes.rejection_codes as rejection_codes
+import solar_position.solar_position as solar_position
+import time_grid.time_grid as time_grid
+
+# This file contains the per-filter bit planes of a run, for filter ablation studies.
+# Bit i of a plane word is set when filter i of the stage rejected the row (3s) or window (15min).
+# The 3 second rows are stored pre-aggregated: one group per minute and plane word, with its number of samples
+# and the sums of the columns the 15 minute filters read. Rows rejected for other reasons than the 3 second filters
+# (e.g. the missing samples added by --regularize) stay rejected without any filter, so they are left out.
+# The validity of the run without any subset of filters is then recomputed from the groups, without the raw data:
+# - samples are valid when no remaining 3 second filter rejected them
+# - minutes need MIN_POINTS valid samples (the 1 minute rule) and windows WINDOW_ROWS minutes (the 15 minute rule)
+# - the 15 minute filters are taken from the stored planes when the 3 second filters are unchanged, and are
+#   evaluated again on the rebuilt 1 minute means otherwise (see parameter_sweep)
+
+PLANES_VERSION = 1
+MIN_POINTS = 5  # Valid 3 second samples needed in a minute, as in aggregate_to_one_minute
+WINDOW_ROWS = parameter_sweep.WINDOW_ROWS
+
+# 3 second filters whose rejections follow from the others, recomputed instead of read from their plane
+DERIVED_FILTERS = ('enough_points_in_minute',)
+
+
+def fifteen_min_columns():
+    """
+    Returns the SCADA tags read by the 15 minute filters, each once.
+    """
+    return list(dict.fromkeys(tag for tags in fifteen_min_filters.REQUIRED_COLUMNS.values() for tag in tags))
+
+
+def plane_words(codes, masks):
+    """
+    Returns the plane word of every rejection code: bit i is set when the code has a reason of masks[i].
+    """
+    words = np.zeros(len(codes), dtype=np.uint64)
+    for bit, mask in enumerate(masks):
+        words[(codes & mask) != 0] |= np.uint64(1) << np.uint64(bit)
+    return words
+
+
+def reason_masks(pipeline, inverters=()):
+    """
+    Returns the rejection code bits of the reasons of every enabled filter of a pipeline.
+    """
+    masks = []
+    for spec, _ in pipeline.steps:
+        mask = np.uint64(0)
+        for reason in spec.expanded_rejection_reasons(inverters):
+            mask |= rejection_codes.get_rejection_bit(reason)
+        masks.append(mask)
+    return masks
+
+
+def build_planes(df, fifteen_min_df, inverters, filter_config=None, timezone=solar_position.SITE_TIMEZONE):
+    """
+    Returns the FilterPlanes of a run, from the filtered 3 second data (every row, before the rejected rows are
+    dropped) and the filtered 15 minute data.
+
+    - filter_config: filters and parameters of the run (see filter_pipeline.build_pipeline)
+    - timezone: timezone of the timestamps, for the clear-sky GHI when the irradiance range uses it
+    Planes are only complete when every filter ran on every row and window (no skip_invalid or short_circuit).
+    """
+    three_sec_pipeline = filter_pipeline.build_pipeline("3s", filter_config)
+    fifteen_min_pipeline = filter_pipeline.build_pipeline("15min", filter_config)
+    columns = [tag for tag in fifteen_min_columns() if tag in df.columns]
+
+    # 3 second rows grouped by minute and plane word, without the rows rejected for other reasons
+    if len(df):
+        codes = rejection_codes.get_rejection_codes(df)
+        masks = reason_masks(three_sec_pipeline, inverters)
+        filter_bits = np.bitwise_or.reduce(np.array(masks, dtype=np.uint64)) if masks else np.uint64(0)
+        filtered_only = (codes & ~filter_bits) == 0
+        df, codes = df[filtered_only], codes[filtered_only]
+    if len(df):
+        words = plane_words(codes, masks)
+        minute_slots = time_grid.to_slots(df['Date'], "1min")
+        groups, inverse = np.unique(np.stack([minute_slots, words.astype(np.int64)]), axis=1, return_inverse=True)
+        inverse = inverse.ravel()
+    else:
+        groups, inverse = np.zeros((2, 0), dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    values = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    not_nan = ~np.isnan(values)
+    group_sums = np.zeros((groups.shape[1], len(columns)))
+    group_value_counts = np.zeros((groups.shape[1], len(columns)), dtype=np.int64)
+    for i in range(len(columns)):
+        group_sums[:, i] = np.bincount(inverse, np.where(not_nan[:, i], values[:, i], 0.0), minlength=groups.shape[1])
+        group_value_counts[:, i] = np.bincount(inverse, not_nan[:, i], minlength=groups.shape[1])
+
+    # 15 minute windows and their plane words
+    if len(fifteen_min_df):
+        window_slots = time_grid.to_slots(fifteen_min_df['15 Minute'], "15min")
+        window_planes = plane_words(rejection_codes.get_rejection_codes(fifteen_min_df),
+                                    reason_masks(fifteen_min_pipeline))
+    else:
+        window_slots, window_planes = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint64)
+
+    return FilterPlanes(
+        three_sec_filters=three_sec_pipeline.names,
+        fifteen_min_params={spec.name: params for spec, params in fifteen_min_pipeline.steps},
+        minute_slots=groups[0],
+        group_planes=groups[1].astype(np.uint64),
+        group_samples=np.bincount(inverse, minlength=groups.shape[1]),
+        columns=columns,
+        group_sums=group_sums,
+        group_value_counts=group_value_counts,
+        window_slots=window_slots,
+        window_planes=window_planes,
+        min_points=max([MIN_POINTS] + [params['min_points'] for spec, params in three_sec_pipeline.steps
+                                       if spec.name in DERIVED_FILTERS]),
+        timezone=timezone,
+    )
+
+
+def load_planes(filename):
+    """
+    Reads the planes written by FilterPlanes.save.
+    """
+    with np.load(filename) as data:
+        if int(data['version']) != PLANES_VERSION:
+            raise ValueError(f"{filename} was written by another version of the filter planes")
+        return FilterPlanes(
+            three_sec_filters=json.loads(str(data['three_sec_filters'])),
+            fifteen_min_params=json.loads(str(data['fifteen_min_params'])),
+            minute_slots=data['minute_slots'],
+            group_planes=data['group_planes'],
+            group_samples=data['group_samples'],
+            columns=json.loads(str(data['columns'])),
+            group_sums=data['group_sums'],
+            group_value_counts=data['group_value_counts'],
+            window_slots=data['window_slots'],
+            window_planes=data['window_planes'],
+            min_points=int(data['min_points']),
+            timezone=str(data['timezone']),
+        )
+
+
+class FilterPlanes:
+    """
+    Per-filter bit planes of a run with the pre-aggregated 3 second groups (see build_planes).
+    """
+
+    def __init__(self, three_sec_filters, fifteen_min_params, minute_slots, group_planes, group_samples, columns,
+                 group_sums, group_value_counts, window_slots, window_planes, min_points=MIN_POINTS,
+                 timezone=solar_position.SITE_TIMEZONE):
+        self.three_sec_filters = list(three_sec_filters)
+        self.fifteen_min_params = dict(fifteen_min_params)
+        self.minute_slots = np.asarray(minute_slots, dtype=np.int64)
+        self.group_planes = np.asarray(group_planes, dtype=np.uint64)
+        self.group_samples = np.asarray(group_samples, dtype=np.int64)
+        self.columns = list(columns)
+        self.group_sums = np.asarray(group_sums, dtype=np.float64).reshape(len(self.minute_slots), len(self.columns))
+        self.group_value_counts = np.asarray(group_value_counts, dtype=np.int64).reshape(self.group_sums.shape)
+        self.window_slots = np.asarray(window_slots, dtype=np.int64)
+        self.window_planes = np.asarray(window_planes, dtype=np.uint64)
+        self.min_points = min_points
+        self.timezone = timezone
+
+    @property
+    def fifteen_min_filters(self):
+        return list(self.fifteen_min_params)
+
+    def save(self, filename):
+        np.savez(filename, version=PLANES_VERSION, three_sec_filters=json.dumps(self.three_sec_filters),
+                 fifteen_min_params=json.dumps(self.fifteen_min_params), minute_slots=self.minute_slots,
+                 group_planes=self.group_planes, group_samples=self.group_samples, columns=json.dumps(self.columns),
+                 group_sums=self.group_sums, group_value_counts=self.group_value_counts,
+                 window_slots=self.window_slots, window_planes=self.window_planes, min_points=self.min_points,
+                 timezone=str(self.timezone))
+
+    def _mask(self, filters, disabled):
+        # Plane word bits of the filters that are not disabled
+        mask = np.uint64(0)
+        for bit, name in enumerate(filters):
+            if name not in disabled:
+                mask |= np.uint64(1) << np.uint64(bit)
+        return mask
+
+    def one_minute_means(self, disabled=()):
+        """
+        Returns the 1 minute means of the 15 minute filter columns without the disabled 3 second filters,
+        for the minutes with enough valid samples, as aggregate_to_one_minute would.
+        """
+        disabled = set(disabled) | set(DERIVED_FILTERS)
+        valid = (self.group_planes & self._mask(self.three_sec_filters, disabled)) == 0
+
+        minutes, inverse = np.unique(self.minute_slots[valid], return_inverse=True)
+        samples = np.bincount(inverse, self.group_samples[valid], minlength=len(minutes))
+        sums = np.zeros((len(minutes), len(self.columns)))
+        value_counts = np.zeros((len(minutes), len(self.columns)))
+        for i in range(len(self.columns)):
+            sums[:, i] = np.bincount(inverse, self.group_sums[valid, i], minlength=len(minutes))
+            value_counts[:, i] = np.bincount(inverse, self.group_value_counts[valid, i], minlength=len(minutes))
+
+        keep = samples >= self.min_points
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = np.where(value_counts[keep] > 0, sums[keep] / value_counts[keep], np.nan)
+
+        one_minute_df = pd.DataFrame(means, columns=self.columns)
+        minute_ns = time_grid.EPOCH.value + minutes[keep] * pd.Timedelta("1min").value
+        one_minute_df.insert(0, 'Minute', pd.to_datetime(minute_ns))
+        for tag in fifteen_min_columns():
+            if tag not in one_minute_df.columns:
+                one_minute_df[tag] = np.nan
+        return one_minute_df
+
+    def validity(self, disabled=(), backend="auto"):
+        """
+        Returns the 15 minute windows of the run without the disabled filters (3s or 15min, by name),
+        with their number of 1 minute rows and is_valid.
+        """
+        unknown = [name for name in disabled if name not in self.three_sec_filters + self.fifteen_min_filters]
+        if unknown:
+            raise ValueError(f"Filters not in the run: {unknown}")
+
+        one_minute_df = self.one_minute_means(disabled)
+        if one_minute_df.empty:
+            return pd.DataFrame({'15 Minute': pd.to_datetime([]), 'rows': np.zeros(0, dtype=np.int64),
+                                 'is_valid': np.zeros(0)})
+
+        stats = parameter_sweep.compute_window_statistics(one_minute_df)
+        window_slots = time_grid.to_slots(stats['15 Minute'], "15min")
+
+        if set(disabled) & (set(self.three_sec_filters) - set(DERIVED_FILTERS)):
+            # Other minutes: the 15 minute filters are evaluated again on the rebuilt 1 minute means
+            pipeline = filter_pipeline.FilterPipeline("15min", [(filter_pipeline.FILTER_REGISTRY[name], params)
+                                                                for name, params in self.fifteen_min_params.items()
+                                                                if name not in disabled])
+            stats = parameter_sweep.add_reference_ghi(stats, pipeline, self.timezone)
+            rejected = ~parameter_sweep.evaluate_combinations(stats, pd.DataFrame(index=[0]), pipeline, backend)[0]
+        else:
+            # Same minutes as the run: the stored 15 minute planes apply
+            planes = self.window_planes[np.searchsorted(self.window_slots, window_slots)]
+            rejected = ((planes & self._mask(self.fifteen_min_filters, set(disabled))) != 0) | \
+                       (stats['rows'] != WINDOW_ROWS)
+
+        return pd.DataFrame({'15 Minute': stats['15 Minute'], 'rows': stats['rows'],
+                             'is_valid': np.where(rejected, 0.0, 1.0)})
+
+    def ablation_table(self, backend="auto"):
+        """
+        Returns the valid minutes and windows of the run, and of the run without each filter in turn.
+        """
+        rows = []
+        for stage, name in [(None, None)] + [("3s", name) for name in self.three_sec_filters] + \
+                           [("15min", name) for name in self.fifteen_min_filters]:
+            disabled = () if name is None else (name,)
+            window_df = self.validity(disabled, backend)
+            rows.append({'stage': stage or "all", 'without': name or "", 'valid_minutes': int(window_df['rows'].sum()),
+                         'valid_windows': int(window_df['is_valid'].sum())})
+
+        table = pd.DataFrame(rows)
+        table['windows_gained'] = table['valid_windows'] - table.loc[0, 'valid_windows']
+        return table
+
+
+def print_summary(ablation_df):
+    """
+    Prints the valid windows of the run and the windows gained without each filter.
+    """
+    print(f"\n🔹 Filter ablation: {ablation_df.loc[0, 'valid_windows']} valid windows with every filter\n")
+    for row in ablation_df.iloc[1:].itertuples(index=False):
+        print(f"    ⚙️  Without {row.without:<34} ({row.stage:>5}) {row.valid_windows:>6} valid windows "
+              f"({row.windows_gained:+d})")
+    print("")
@@ -1,6 +1,12 @@
+import os
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 
+import helper_functions
+import memory_layout.memory_layout as memory_layout
+import three_sec_filters.three_sec_filters as three_sec_filters
 from helper_functions import load_and_initialize_df
 
 class TestHelperFunctions(unittest.TestCase):
@@ -33,5 +39,144 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertEqual(inverters[0].label, "INV011")
         self.assertEqual(inverters[0].name, "inverter_1")
 
+
+class TestLeanLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.inverters = helper_functions.create_inverters()
+
+        df = pd.DataFrame({"Date": pd.date_range("2024-01-10 12:00:00", periods=40, freq="3s")})
+        df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)'] = 20000.0
+        for inverter in self.inverters:
+            df[inverter.apparent_power_scada_tag] = 3000.0
+            df[inverter.NRM_scada_tag] = 4.0
+        self.raw_df = df
+
+    def test_lean_layout_uses_less_memory(self):
+        standard = helper_functions.initialize_validation_columns(self.raw_df.copy(), self.inverters)
+        lean = helper_functions.initialize_validation_columns(self.raw_df.copy(), self.inverters, lean=True)
+
+        self.assertLess(memory_layout.bytes_per_row(lean), memory_layout.bytes_per_row(standard) / 2)
+
+    def test_constrained_inverter_bitfield(self):
+        df = self.raw_df.iloc[:4].copy()
+        df.loc[1, self.inverters[1].apparent_power_scada_tag] = 5000.0
+        df.loc[2, self.inverters[0].apparent_power_scada_tag] = 5000.0
+        df.loc[2, self.inverters[1].apparent_power_scada_tag] = 5000.0
+
+        standard = three_sec_filters.filter_constrained_inverters(
+            helper_functions.initialize_validation_columns(df.copy(), self.inverters), self.inverters)
+        lean = three_sec_filters.filter_constrained_inverters(
+            helper_functions.initialize_validation_columns(df.copy(), self.inverters, lean=True), self.inverters)
+
+        self.assertEqual(lean["constrained_inverters"].tolist(), [0, 2, 3, 0])
+        self.assertEqual(lean["is_valid"].tolist(), standard["is_valid"].tolist())
+        self.assertEqual(list(helper_functions.get_valid_3s_data(lean).columns),
+                         [col for col in helper_functions.get_valid_3s_data(standard).columns if col != "rejection_reason"])
+
+class TestColumnProjection(unittest.TestCase):
+
+    def setUp(self):
+        self.inverters = helper_functions.create_inverters()
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "raw.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_required_columns(self):
+        columns = helper_functions.get_required_columns(self.inverters, output_columns=["VALUE(EXTRA)"])
+
+        self.assertEqual(columns[0], "Date")
+        self.assertEqual(len(columns), len(set(columns)))
+        self.assertIn(three_sec_filters.POC_APPARENT_POWER_TAG, columns)
+        self.assertIn(three_sec_filters.WS211_WIND_SPEED_TAG, columns)
+        self.assertIn(self.inverters[0].NRM_scada_tag, columns)
+        self.assertNotIn(self.inverters[0].active_power_scada_tag, columns)
+        self.assertEqual(columns[-1], "VALUE(EXTRA)")
+
+    def test_read_raw_csv_projection(self):
+        with open(self.filename, "w") as f:
+            f.write("a\nb\nc\nd\ne\nDate,VALUE(A),VALUE(B),VALUE(C)\n10/01/2024 01:00:00 PM,1,2,3\n")
+
+        df = helper_functions.read_raw_csv(self.filename, usecols=["Date", "VALUE(C)"])
+
+        self.assertEqual(list(df.columns), ["Date", "VALUE(C)"])
+        self.assertEqual(df.loc[0, "Date"], pd.Timestamp("2024-01-10 13:00:00"))
+
+        with self.assertRaises(ValueError):
+            helper_functions.read_raw_csv(self.filename, usecols=["Date", "VALUE(D)"])
+
+    def test_read_raw_csv_parse_cache(self):
+        filename = 'unit_test_data/load_and_initialize_df_data.csv'
+        expected = helper_functions.read_raw_csv(filename)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            parsed = helper_functions.read_raw_csv(filename, cache_dir=cache_dir)
+            cached = helper_functions.read_raw_csv(filename, cache_dir=cache_dir)
+            subset = helper_functions.read_raw_csv(filename, usecols=list(expected.columns[:2]), cache_dir=cache_dir)
+
+            pd.testing.assert_frame_equal(parsed, expected)
+            pd.testing.assert_frame_equal(cached, expected)
+            pd.testing.assert_frame_equal(subset, expected.iloc[:, :2])
+            with self.assertRaises(ValueError):
+                helper_functions.read_raw_csv(filename, usecols=["Date", "VALUE(D)"], cache_dir=cache_dir)
+
+class TestNormalizeTimestamps(unittest.TestCase):
+
+    def test_daylight_saving_and_duplicates(self):
+        # Daylight saving ends at 3 am on 7 April 2024, the hour from 2 am is repeated
+        local_times = ["2024-04-07 01:59:00", "2024-04-07 02:00:00", "2024-04-07 02:30:00", "2024-04-07 02:30:00",
+                       "2024-04-07 02:00:00", "2024-04-07 02:30:00", "2024-04-07 03:00:00", "2024-04-07 02:59:00"]
+        df = pd.DataFrame({"Date": pd.to_datetime(local_times), "value": np.arange(8, dtype=float)})
+
+        normalized_df = helper_functions.normalize_timestamps(df, "Pacific/Auckland")
+
+        self.assertEqual(normalized_df["Date"].tolist(), list(pd.to_datetime([
+            "2024-04-06 12:59:00", "2024-04-06 13:00:00", "2024-04-06 13:30:00", "2024-04-06 14:00:00",
+            "2024-04-06 14:30:00", "2024-04-06 14:59:00", "2024-04-06 15:00:00"])))
+        self.assertEqual(normalized_df["value"].tolist(), [0, 1, 2, 4, 5, 7, 6],
+                         "Duplicates are dropped and late rows sorted in.")
+
+    def test_non_existent_times(self):
+        # Daylight saving starts at 2 am on 29 September 2024, 2:30 am does not exist
+        df = pd.DataFrame({"Date": pd.to_datetime(["2024-09-29 01:30:00", "2024-09-29 02:30:00",
+                                                   "2024-09-29 03:00:00"])})
+
+        normalized_df = helper_functions.normalize_timestamps(df, "Pacific/Auckland")
+
+        self.assertEqual(normalized_df["Date"].tolist(), list(pd.to_datetime(["2024-09-28 13:30:00",
+                                                                             "2024-09-28 14:00:00"])))
+
+class TestTimeGridAggregation(unittest.TestCase):
+
+    def test_grid_matches_groupby(self):
+        df = pd.DataFrame({"Date": pd.date_range("2024-01-10 12:00:00", periods=200, freq="3s")})
+        df["power"] = np.arange(200, dtype=float)
+        df.loc[5, "power"] = np.nan
+        df["is_valid"] = 1
+        # Leave minute 2 with 3 rows and minute 3 empty
+        df = df[(df.index < 43) | (df.index >= 80)].reset_index(drop=True)
+
+        grid_df = helper_functions.aggregate_to_one_minute(df, method="grid")
+        groupby_df = helper_functions.aggregate_to_one_minute(df, method="groupby")
+
+        pd.testing.assert_frame_equal(grid_df, groupby_df, check_dtype=False)
+
+    def test_reshape_matches_grid(self):
+        df = pd.DataFrame({"Date": pd.date_range("2024-01-10 12:00:30", periods=200, freq="3s")})
+        df["power"] = np.arange(200, dtype=float)
+        df.loc[5, "power"] = np.nan
+        df["is_valid"] = 1
+        df = df[(df.index < 43) | (df.index >= 80)].reset_index(drop=True)
+
+        reshape_df = helper_functions.aggregate_to_one_minute(df, method="reshape")
+        grid_df = helper_functions.aggregate_to_one_minute(df, method="grid")
+
+        pd.testing.assert_frame_equal(reshape_df, grid_df)
+
+        with self.assertRaises(ValueError):
+            helper_functions.aggregate_to_one_minute(pd.concat([df, df.head(1)]), method="reshape")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import inverter_analytics
+import helper_functions_dir.helper_functions as helper_functions
+
+
+def make_3s_df(inverters, power, nrm=4.0, minutes=30):
+    # 3 second data, constant power per inverter
+    df = pd.DataFrame({'Date': pd.date_range("2024-01-10 12:00:00", periods=minutes * 20, freq="3s")})
+    for inverter, inverter_power in zip(inverters, power):
+        df[inverter.active_power_scada_tag] = inverter_power
+        df[inverter.NRM_scada_tag] = nrm
+    return df
+
+
+class TestInverterAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.inverters = helper_functions.create_inverters()[:3]
+
+    def test_energy_and_relative_performance(self):
+        df = make_3s_df(self.inverters, power=[2000.0, 1000.0, 1900.0])
+
+        performance_df = inverter_analytics.compute_inverter_performance(df, self.inverters, "15min")
+
+        self.assertEqual(performance_df['15 Minute'].tolist(), [pd.Timestamp("2024-01-10 12:00:00"),
+                                                                 pd.Timestamp("2024-01-10 12:15:00")])
+        np.testing.assert_allclose(performance_df[f"{self.inverters[0].name}_energy_kWh"], [500, 500])
+        np.testing.assert_allclose(performance_df[f"{self.inverters[1].name}_relative_performance"], [1000 / 1900] * 2)
+        np.testing.assert_allclose(performance_df[f"{self.inverters[2].name}_relative_performance"], [1, 1])
+
+    def test_availability(self):
+        df = make_3s_df(self.inverters, power=[2000.0, 0.0, 1900.0], minutes=1)
+        df.loc[:9, self.inverters[0].NRM_scada_tag] = 0
+        df[self.inverters[1].NRM_scada_tag] = 0
+
+        performance_df = inverter_analytics.compute_inverter_performance(df, self.inverters, "1min")
+
+        self.assertEqual(performance_df[f"{self.inverters[0].name}_availability"].tolist(), [0.5])
+        self.assertEqual(performance_df[f"{self.inverters[1].name}_availability"].tolist(), [0.0])
+        np.testing.assert_allclose(performance_df[f"{self.inverters[2].name}_relative_performance"], [1900 / 1950],
+                                   err_msg="Inverters that did not run are not part of the reference.")
+
+    def test_night_windows_are_not_compared(self):
+        df = make_3s_df(self.inverters, power=[2.0, 1.0, 2.0], minutes=1)
+
+        performance_df = inverter_analytics.compute_inverter_performance(df, self.inverters, "1min")
+
+        self.assertTrue(performance_df[f"{self.inverters[0].name}_relative_performance"].isna().all())
+
+    def test_summary(self):
+        df = make_3s_df(self.inverters, power=[2000.0, 1000.0, 1900.0])
+        performance_df = inverter_analytics.compute_inverter_performance(df, self.inverters, "15min")
+
+        summary_df = inverter_analytics.summarize_inverters(performance_df, self.inverters)
+
+        self.assertEqual(summary_df['windows_below_threshold'].tolist(), [0, 2, 0])
+        np.testing.assert_allclose(summary_df['energy_kWh'], [1000, 500, 950])
+        np.testing.assert_allclose(summary_df['relative_performance'], [2000 / 1900, 1000 / 1900, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
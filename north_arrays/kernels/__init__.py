@@ -0,0 +1 @@
+# This file makes the kernels directory a Python package
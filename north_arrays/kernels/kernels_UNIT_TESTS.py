@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import kernels
+
+
+def make_wind_data(rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Slowly varying wind around the stow thresholds, with some NaN readings
+    wind_1 = 10.8 + np.cumsum(rng.normal(0, 0.3, rows)) * 0.1
+    wind_2 = wind_1 + rng.normal(0, 0.4, rows)
+    wind_1[rng.random(rows) < 0.01] = np.nan
+    timestamps = pd.date_range("2024-01-10 12:00:00", periods=rows, freq="3s").as_unit("ns").asi8
+    return wind_1, wind_2, timestamps
+
+
+def reference_dead_value(values):
+    # Pandas version of the power dead value check
+    pct_changes = pd.Series(values).pct_change().abs() * 100
+    windows = pct_changes.rolling(window=3).apply(lambda x: all(x < 0.1) if len(x) == 3 else False)
+    return bool(windows.any())
+
+
+class TestKernels(unittest.TestCase):
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            kernels.resolve_backend("fortran")
+
+    def test_numba_falls_back_to_python(self):
+        expected = "python" if kernels.numba is None else "numba"
+        self.assertEqual(kernels.resolve_backend("numba"), expected)
+        self.assertEqual(kernels.resolve_backend("python"), "python")
+
+    def test_wind_stow_chunks_match_single_scan(self):
+        wind_1, wind_2, timestamps = make_wind_data()
+        full = kernels.wind_stow_scan(wind_1, wind_2, timestamps, 11.11, 10.55, 300, backend="python")
+
+        state = {}
+        chunks = [kernels.wind_stow_scan(wind_1[i:i + 333], wind_2[i:i + 333], timestamps[i:i + 333],
+                                         11.11, 10.55, 300, state=state, backend="python")
+                  for i in range(0, len(timestamps), 333)]
+
+        self.assertTrue(full.any())
+        np.testing.assert_array_equal(np.concatenate(chunks), full)
+
+    def test_wind_stow_release_after_300s(self):
+        wind = np.array([12.0, 12.0] + [10.0] * 101 + [10.0])
+        timestamps = pd.date_range("2024-01-10 12:00:00", periods=len(wind), freq="3s").as_unit("ns").asi8
+        stowed = kernels.wind_stow_scan(wind, wind, timestamps, 11.11, 10.55, 300, backend="python")
+
+        # Release timer starts at row 2 and ends 300s (100 rows) later
+        self.assertEqual(stowed[0], 0)
+        self.assertTrue(stowed[1:103].all())
+        self.assertEqual(stowed[103], 0)
+
+    def test_dead_value_matches_pandas(self):
+        rng = np.random.default_rng(1)
+        for _ in range(200):
+            values = 20000 * (1 + rng.choice([0.0, 0.0005, 0.01], size=15) * rng.standard_normal(15).cumsum())
+            values[rng.random(15) < 0.05] = np.nan
+            values[rng.random(15) < 0.05] = 0.0
+            self.assertEqual(kernels.longest_small_change_run(values, 0.1, backend="python") >= 3,
+                             reference_dead_value(values))
+
+
+@unittest.skipIf(kernels.numba is None, "numba is not installed")
+class TestNumbaParity(unittest.TestCase):
+
+    def test_wind_stow_parity(self):
+        for seed in range(5):
+            wind_1, wind_2, timestamps = make_wind_data(seed=seed)
+            python_state, numba_state = {}, {}
+            python_result = kernels.wind_stow_scan(wind_1, wind_2, timestamps, 11.11, 10.55, 300,
+                                                   state=python_state, backend="python")
+            numba_result = kernels.wind_stow_scan(wind_1, wind_2, timestamps, 11.11, 10.55, 300,
+                                                  state=numba_state, backend="numba")
+            np.testing.assert_array_equal(python_result, numba_result)
+            self.assertEqual(python_state, numba_state)
+
+    def test_dead_value_parity(self):
+        rng = np.random.default_rng(2)
+        for _ in range(100):
+            values = 20000 * (1 + 0.001 * rng.standard_normal(15).cumsum())
+            values[rng.random(15) < 0.05] = np.nan
+            self.assertEqual(kernels.longest_small_change_run(values, 0.1, backend="python"),
+                             kernels.longest_small_change_run(values, 0.1, backend="numba"))
+
+
+if __name__ == '__main__':
+    unittest.main()
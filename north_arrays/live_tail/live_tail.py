@@ -0,0 +1,202 @@
+import io
+import os
+import time
+
+import pandas as pd
+import helper_functions_dir.helper_functions as helper_functions
+
+# This file contains the live tail mode, which follows a raw SCADA CSV export while the historian is still appending to it.
+
+
+class ScadaCsvTail:
+    """
+    Follows a growing raw SCADA CSV file.
+
+    Each call to read_new_rows() only reads the bytes appended since the previous call.
+    An incomplete last line is kept back until the historian finishes writing it.
+    """
+
+    def __init__(self, filename, header_rows=5, usecols=None):
+        self.filename = filename
+        self.header_rows = header_rows  # Rows skipped before the column header (same as load_and_initialize_df)
+        self.usecols = usecols  # Only parse these columns (see helper_functions.get_required_columns)
+        self.columns = None
+        self.offset = 0
+        self.partial_line = b""
+
+    def read_new_rows(self):
+        """
+        Returns a DataFrame with the rows appended since the last call (may be empty).
+        """
+        if not os.path.exists(self.filename):
+            return None
+
+        # Start again if the file has been replaced by a shorter one
+        if os.path.getsize(self.filename) < self.offset:
+            print(f"⚠ Warning: {self.filename} was truncated. Following it from the start.\n")
+            self.columns = None
+            self.offset = 0
+            self.partial_line = b""
+
+        with open(self.filename, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+            self.offset = f.tell()
+
+        # Only parse complete lines
+        data = self.partial_line + data
+        last_newline = data.rfind(b"\n")
+        if last_newline == -1:
+            self.partial_line = data
+            return None
+        self.partial_line = data[last_newline + 1:]
+        lines = data[:last_newline + 1].decode("utf-8-sig").splitlines(keepends=True)
+
+        # Read the column header the first time the header rows are complete
+        if self.columns is None:
+            if len(lines) <= self.header_rows:
+                self.partial_line = data
+                return None
+            header = pd.read_csv(io.StringIO(lines[self.header_rows]), nrows=0)
+            self.columns = list(header.columns)
+            lines = lines[self.header_rows + 1:]
+
+            if self.usecols is not None:
+                missing_columns = [col for col in self.usecols if col not in self.columns]
+                if missing_columns:
+                    raise ValueError(f"Columns missing from {self.filename}: {missing_columns}")
+
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return None
+
+        selected_columns = None if self.usecols is None else set(self.usecols)
+        return pd.read_csv(io.StringIO("".join(lines)), header=None, names=self.columns,
+                           usecols=None if selected_columns is None else lambda col: col in selected_columns,
+                           parse_dates=[0], date_format="%d/%m/%Y %I:%M:%S %p")
+
+
+class LivePipeline:
+    """
+    Runs the 3-second filters, 1-minute aggregation and 15-minute filters on chunks of a stream.
+
+    - 3-second rows are held back until their minute is complete, so every row is filtered exactly once.
+    - The wind stow hysteresis is carried from one chunk to the next.
+    - 1-minute and 15-minute results are appended to the output files as soon as their window is complete.
+    - backend selects the kernel for the sequential scans (see kernels).
+    - filter_config enables, disables or re-parameterises filters (see filter_pipeline).
+    - short_circuit stops evaluating 15-minute filters for a window once it is rejected.
+    """
+
+    def __init__(self, inverters, one_minute_csv="output_data/one_minute_data.csv", backend="auto", filter_config=None,
+                 short_circuit=False):
+        self.inverters = inverters
+        self.backend = backend
+        self.filter_config = filter_config
+        self.short_circuit = short_circuit
+        self.one_minute_csv = one_minute_csv
+        self.wind_stow_state = {}
+        self.pending_3s_df = None
+        self.pending_one_minute_df = None
+
+    def process(self, new_rows, final=False):
+        """
+        Adds new raw rows and emits every 1-minute and 15-minute window they complete.
+        If final is True, all buffered rows are emitted.
+        """
+        frames = [frame for frame in [self.pending_3s_df, new_rows] if frame is not None and not frame.empty]
+        if not frames:
+            if final:
+                self._emit_15_min_windows(final=True)
+            return
+        df = pd.concat(frames, ignore_index=True)
+
+        # Split off the minute that is still being written
+        minutes = df['Date'].dt.floor('min')
+        last_minute = minutes.iloc[-1]
+        complete = (minutes < last_minute) | final
+        self.pending_3s_df = df[~complete].reset_index(drop=True)
+        complete_df = df[complete].reset_index(drop=True)
+
+        if not complete_df.empty:
+            complete_df = helper_functions.initialize_validation_columns(complete_df, self.inverters)
+            complete_df = helper_functions.apply_three_second_filters(complete_df, self.inverters,
+                                                                      wind_stow_state=self.wind_stow_state,
+                                                                      backend=self.backend,
+                                                                      filter_config=self.filter_config)
+            one_minute_df = helper_functions.aggregate_to_one_minute(helper_functions.get_valid_3s_data(complete_df))
+
+            if not one_minute_df.empty:
+                helper_functions.export_valid_one_minute_data(one_minute_df, self.one_minute_csv, append=True)
+                self.pending_one_minute_df = pd.concat(
+                    [frame for frame in [self.pending_one_minute_df, one_minute_df] if frame is not None],
+                    ignore_index=True)
+
+        self._emit_15_min_windows(final=final, current_minute=last_minute)
+
+    def _emit_15_min_windows(self, final=False, current_minute=None):
+        """
+        Filters and exports the 15-minute windows that can no longer receive data.
+        """
+        if self.pending_one_minute_df is None or self.pending_one_minute_df.empty:
+            return
+
+        windows = self.pending_one_minute_df['Minute'].dt.floor('15min')
+        if final or current_minute is None:
+            complete = pd.Series(True, index=windows.index)
+        else:
+            complete = windows < current_minute.floor('15min')
+
+        if not complete.any():
+            return
+
+        fifteen_min_df = helper_functions.apply_15_min_filter(self.pending_one_minute_df[complete].reset_index(drop=True),
+                                                             backend=self.backend, filter_config=self.filter_config,
+                                                             short_circuit=self.short_circuit)
+        helper_functions.export_good_15_min_data(fifteen_min_df, append=True)
+        self.pending_one_minute_df = self.pending_one_minute_df[~complete].reset_index(drop=True)
+
+
+def follow(filename, inverters, poll_interval=2.0, idle_timeout=None, usecols=None, backend="auto",
+           filter_config=None, short_circuit=False):
+    """
+    Tails a raw SCADA CSV file and appends 1-minute and 15-minute results as windows complete.
+    If usecols is given, only these columns are parsed.
+
+    Latency is bounded by the poll interval plus the length of the window being completed.
+    Stops (and flushes every buffered window) after idle_timeout seconds without new rows,
+    or on Ctrl+C.
+    """
+    print("-" * 60)
+    print(f"\n🔹 Following: {filename} (polling every {poll_interval}s)\n")
+
+    # Start from fresh output files, as the batch run overwrites them
+    for output_csv in ["output_data/one_minute_data.csv", "output_data/good_15_min_data.csv",
+                       "output_data/bad_15_min_data.csv"]:
+        if os.path.exists(output_csv):
+            os.remove(output_csv)
+
+    tail = ScadaCsvTail(filename, usecols=usecols)
+    pipeline = LivePipeline(inverters, backend=backend, filter_config=filter_config, short_circuit=short_circuit)
+    last_data_time = time.monotonic()
+
+    try:
+        while True:
+            new_rows = tail.read_new_rows()
+
+            if new_rows is not None and not new_rows.empty:
+                print(f"🔹 Read {len(new_rows)} new rows.\n")
+                pipeline.process(new_rows)
+                last_data_time = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - last_data_time >= idle_timeout:
+                print(f"🔹 No new data for {idle_timeout}s. Stopping.\n")
+                break
+
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("🔹 Stopped by user.\n")
+
+    # Emit everything still buffered
+    pipeline.process(None, final=True)
+
+    print("-" * 60)
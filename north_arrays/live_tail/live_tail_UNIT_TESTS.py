@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import live_tail
+import three_sec_filters.three_sec_filters as three_sec_filters
+
+
+HEADER = "Waiotahe Raw Data\n\nSCADA Tag\nName\nUnits\nDate,VALUE(A),VALUE(B)\n"
+
+
+class TestScadaCsvTail(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "raw.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def append(self, text):
+        with open(self.filename, "a") as f:
+            f.write(text)
+
+    def test_waits_for_header(self):
+        self.append("Waiotahe Raw Data\n\n")
+        tail = live_tail.ScadaCsvTail(self.filename)
+
+        self.assertIsNone(tail.read_new_rows())
+        self.assertIsNone(tail.columns)
+
+    def test_reads_only_new_complete_lines(self):
+        self.append(HEADER + "10/01/2024 12:00:00 PM,1,2\n10/01/2024 12:00:03 PM,3,")
+        tail = live_tail.ScadaCsvTail(self.filename)
+
+        df = tail.read_new_rows()
+        self.assertEqual(list(df.columns), ["Date", "VALUE(A)", "VALUE(B)"])
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df.loc[0, "Date"], pd.Timestamp("2024-01-10 12:00:00"))
+
+        # Finish the partial line and add another one
+        self.append("4\n10/01/2024 12:00:06 PM,5,6\n")
+        df = tail.read_new_rows()
+        self.assertEqual(len(df), 2)
+        self.assertEqual(df.loc[0, "VALUE(B)"], 4)
+        self.assertEqual(df.loc[1, "Date"], pd.Timestamp("2024-01-10 12:00:06"))
+
+        # Nothing new
+        self.assertIsNone(tail.read_new_rows())
+
+    def test_column_projection(self):
+        self.append(HEADER + "10/01/2024 12:00:00 PM,1,2\n")
+        tail = live_tail.ScadaCsvTail(self.filename, usecols=["Date", "VALUE(B)"])
+
+        df = tail.read_new_rows()
+        self.assertEqual(list(df.columns), ["Date", "VALUE(B)"])
+        self.assertEqual(df.loc[0, "VALUE(B)"], 2)
+
+    def test_restarts_after_truncation(self):
+        self.append(HEADER + "10/01/2024 12:00:00 PM,1,2\n10/01/2024 12:00:03 PM,3,4\n")
+        tail = live_tail.ScadaCsvTail(self.filename)
+        tail.read_new_rows()
+
+        with open(self.filename, "w") as f:
+            f.write(HEADER + "11/01/2024 12:00:00 PM,7,8\n")
+
+        df = tail.read_new_rows()
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df.loc[0, "VALUE(A)"], 7)
+
+
+class TestWindStowState(unittest.TestCase):
+
+    def test_chunked_wind_stow_matches_single_pass(self):
+        # Stow starts in the first chunk and is released in the second
+        wind = [12, 12, 12, 10, 10] + [10] * 110 + [5] * 10
+        df = pd.DataFrame({
+            "Date": pd.date_range("2024-01-10 12:00:00", periods=len(wind), freq="3s"),
+            'VALUE(\HTR-WSTAT211-WSWR.UNIT3@NET2\)': wind,
+            'VALUE(\HTR-WSTAT241-WSWR.UNIT3@NET2\)': wind,
+        })
+        df["is_valid"] = 1
+        df["rejection_reason"] = [[] for _ in range(len(df))]
+
+        single_pass = three_sec_filters.filter_wind_stow(df.copy())
+
+        state = {}
+        first = three_sec_filters.filter_wind_stow(df.iloc[:60].copy().reset_index(drop=True), state=state)
+        self.assertTrue(state["wind_stow_active"])
+        second = three_sec_filters.filter_wind_stow(df.iloc[60:].copy().reset_index(drop=True), state=state)
+        chunked = pd.concat([first, second], ignore_index=True)
+
+        self.assertEqual(single_pass["is_wind_stowed"].tolist(), chunked["is_wind_stowed"].tolist())
+        self.assertEqual(single_pass["is_valid"].tolist(), chunked["is_valid"].tolist())
+        self.assertFalse(state["wind_stow_active"])
+
+
+if __name__ == '__main__':
+    unittest.main()
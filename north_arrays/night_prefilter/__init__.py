@@ -0,0 +1 @@
+# This file makes the night_prefilter directory a Python package
@@ -0,0 +1,106 @@
+import numpy as np
+
+import filter_pipeline.filter_pipeline as filter_pipeline
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import kernels.kernels as kernels
+import solar_position.solar_position as solar_position
+import solar_table.solar_table as solar_table
+import three_sec_filters.three_sec_filters as three_sec_filters
+import time_grid.time_grid as time_grid
+
+# This file contains the night-time pre-filter.
+# 15 minute windows that will certainly be rejected by the 15 minute irradiance range filter are dropped
+# from the raw data before the 3 second stage, so they are not filtered, aggregated or exported.
+
+NIGHT_MASKS = ("irradiance", "solar")
+
+
+def prune_night_windows(df, filter_config=None, night_mask="irradiance", backend="auto",
+                        timezone=solar_position.SITE_TIMEZONE):
+    """
+    Drops the raw rows of 15 minute windows that are night-time (or otherwise out of scope).
+
+    night_mask:
+    - "irradiance": the highest GHI reading in the window is at most 0.5 times the irradiance reference (TRC or
+      the clear-sky GHI of the window), the lowest is at least 1.2 times the reference, or the highest POA reading
+      is at most the POA lower limit (or all readings are missing). No average of these readings can pass the
+      irradiance range filter, so the valid 15 minute outputs are unchanged.
+    - "solar": the sun is below the horizon for the whole window (from the solar table of the site).
+      This trusts the geometry over the sensors: an irradiance sensor reading above the range limit at night
+      would no longer be seen.
+
+    A window is only dropped if removing it cannot change the wind stow hysteresis of later rows:
+    no row of the window is wind stowed, and neither the last row of the window nor the row before it is
+    a high-wind reading.
+
+    timezone is the timezone of the Date column ("UTC" for timestamps normalized by the loader).
+
+    Returns the remaining rows (with a new index) and the number of rows pruned.
+    """
+    if night_mask not in NIGHT_MASKS:
+        raise ValueError(f"Unknown night mask: {night_mask}. Expected one of {NIGHT_MASKS}")
+
+    print("\n🔹 Pruning night-time windows...\n")
+
+    fifteen_min_steps = {spec.name: params for spec, params in filter_pipeline.build_pipeline("15min", filter_config).steps}
+    if "irradiance_range" not in fifteen_min_steps:
+        print("    ⚠ Irradiance range filter is disabled, nothing pruned.\n")
+        return df, 0
+    if df.empty:
+        return df, 0
+
+    grid = time_grid.TimeGrid.covering(df['Date'], "15min")
+    positions = grid.positions(df['Date'])
+    if np.any(positions[1:] < positions[:-1]):
+        raise ValueError("Raw data must be sorted by Date to prune night-time windows")
+    window_positions, starts, ends = time_grid.window_boundaries(positions)
+
+    # Windows that are night
+    window_times = grid.slot_times()[window_positions]
+    if night_mask == "irradiance":
+        params = fifteen_min_steps["irradiance_range"]
+
+        # GHI reference of each window, as used by the irradiance range filter
+        reference = np.full(len(window_times), float(params['TRC']))
+        if params['reference'] == "clear_sky":
+            clear_sky_ghi = solar_table.load_for_dates(window_times, timezone=timezone).lookup('clear_sky_ghi',
+                                                                                             window_times)
+            reference = np.where(np.isnan(clear_sky_ghi), reference, clear_sky_ghi)
+
+        ghi_tag, poa_tag = fifteen_min_filters.REQUIRED_COLUMNS['irradiance']
+        ghi = df[ghi_tag].to_numpy(dtype=np.float64, na_value=np.nan)
+        max_ghi = grid.maxima(positions, ghi)[window_positions]
+        min_ghi = grid.minima(positions, ghi)[window_positions]
+        max_poa = grid.maxima(positions, df[poa_tag].to_numpy(dtype=np.float64, na_value=np.nan))[window_positions]
+        with np.errstate(invalid="ignore"):
+            night = (~(max_ghi > reference * 0.5) | (min_ghi >= reference * 1.2)
+                     | ~(max_poa > params['POA_lower_limit']))
+    else:
+        night = solar_table.load_for_dates(window_times, timezone=timezone).is_night(window_times)
+
+    # Windows that can be removed without changing the wind stow hysteresis
+    three_sec_steps = {spec.name: params for spec, params in filter_pipeline.build_pipeline("3s", filter_config).steps}
+    if "wind_stow" in three_sec_steps:
+        params = three_sec_steps["wind_stow"]
+        wind_speed_1 = df[three_sec_filters.WS211_WIND_SPEED_TAG].to_numpy(dtype=np.float64, na_value=np.nan)
+        wind_speed_2 = df[three_sec_filters.WS241_WIND_SPEED_TAG].to_numpy(dtype=np.float64, na_value=np.nan)
+        stowed = kernels.wind_stow_scan(wind_speed_1, wind_speed_2, time_grid.to_nanoseconds(df['Date']),
+                                        params['stow_start_threshold'], params['stow_end_threshold'],
+                                        params['stow_release_seconds'], backend=backend)
+        high_wind = (wind_speed_1 > params['stow_start_threshold']) & (wind_speed_2 > params['stow_start_threshold'])
+
+        any_stowed = np.logical_or.reduceat(stowed.astype(bool), starts)
+        last_row_high_wind = high_wind[ends - 1]
+        previous_row_high_wind = np.concatenate([[False], high_wind[starts[1:] - 1]])
+        stow_safe = ~any_stowed & ~last_row_high_wind & ~previous_row_high_wind
+    else:
+        stow_safe = np.ones(len(starts), dtype=bool)
+
+    prune_window = night & stow_safe
+    prune_row = np.repeat(prune_window, ends - starts)
+    pruned_rows = int(prune_row.sum())
+
+    print(f"    ✅ Pruned {prune_window.sum()} of {len(prune_window)} 15-minute windows "
+          f"({pruned_rows} of {len(df)} rows, {night_mask} mask).\n")
+
+    return df[~prune_row].reset_index(drop=True), pruned_rows
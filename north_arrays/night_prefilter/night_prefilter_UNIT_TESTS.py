@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import night_prefilter
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import solar_table.solar_table as solar_table
+import three_sec_filters.three_sec_filters as three_sec_filters
+
+
+def make_raw_df(ghi_by_window, wind=5.0):
+    # One hour of 3 second data, one GHI value per 15 minute window
+    rows = 4 * 300
+    df = pd.DataFrame({'Date': pd.date_range("2024-01-10 00:00:00", periods=rows, freq="3s")})
+    ghi_tag, poa_tag = fifteen_min_filters.REQUIRED_COLUMNS['irradiance']
+    df[ghi_tag] = np.repeat(ghi_by_window, 300).astype(float)
+    df[poa_tag] = df[ghi_tag] * 1.1
+    df[three_sec_filters.WS211_WIND_SPEED_TAG] = wind
+    df[three_sec_filters.WS241_WIND_SPEED_TAG] = wind
+    return df
+
+
+class TestNightPrefilter(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.default_cache_dir = solar_table.CACHE_DIR
+        solar_table.CACHE_DIR = self.cache_dir.name
+
+    def tearDown(self):
+        solar_table.CACHE_DIR = self.default_cache_dir
+        self.cache_dir.cleanup()
+
+    def test_prunes_low_irradiance_windows(self):
+        df = make_raw_df([0, 150, 400, 0])
+        df.loc[10, fifteen_min_filters.REQUIRED_COLUMNS['irradiance'][0]] = np.nan
+
+        pruned_df, pruned_rows = night_prefilter.prune_night_windows(df, backend="python")
+
+        self.assertEqual(pruned_rows, 900)
+        self.assertTrue((pruned_df['Date'].dt.floor('15min') == pd.Timestamp("2024-01-10 00:30:00")).all())
+        self.assertEqual(list(pruned_df.index), list(range(300)))
+
+    def test_threshold_follows_config(self):
+        df = make_raw_df([0, 250, 400, 0])
+        _, pruned_rows = night_prefilter.prune_night_windows(df, backend="python")
+        self.assertEqual(pruned_rows, 600)
+
+        # GHI 250 is below 0.5 * 600
+        config = {"irradiance_range": {"params": {"TRC": 600}}}
+        _, pruned_rows = night_prefilter.prune_night_windows(df, config, backend="python")
+        self.assertEqual(pruned_rows, 900)
+
+        # GHI 400 is above 1.2 * 300 for the whole window
+        config = {"irradiance_range": {"params": {"TRC": 300}}}
+        _, pruned_rows = night_prefilter.prune_night_windows(df, config, backend="python")
+        self.assertEqual(pruned_rows, 900)
+
+        _, pruned_rows = night_prefilter.prune_night_windows(df, {"irradiance_range": {"enabled": False}})
+        self.assertEqual(pruned_rows, 0)
+
+    def test_keeps_windows_touching_wind_stow(self):
+        df = make_raw_df([0, 0, 0, 0])
+        # High wind at the end of the first window, stow runs into the second window
+        df.loc[298:310, [three_sec_filters.WS211_WIND_SPEED_TAG, three_sec_filters.WS241_WIND_SPEED_TAG]] = 13.0
+
+        _, pruned_rows = night_prefilter.prune_night_windows(df, backend="python")
+
+        # Only the last two windows are pruned, the wind stow has ended by then
+        self.assertEqual(pruned_rows, 600)
+
+    def test_clear_sky_reference(self):
+        # GHI 150 at midnight is above 1.2 times the clear-sky GHI (0), GHI 150 at 1 pm is below half of it
+        df = make_raw_df([150, 150, 150, 150])
+        df['Date'] = df['Date'] + pd.Timedelta(hours=13)
+        df.loc[df['Date'] >= "2024-01-10 13:30:00", fifteen_min_filters.REQUIRED_COLUMNS['irradiance']] = [700.0, 770.0]
+
+        config = {"irradiance_range": {"params": {"reference": "clear_sky"}}}
+        _, pruned_rows = night_prefilter.prune_night_windows(df, config, backend="python")
+        self.assertEqual(pruned_rows, 600)
+
+        _, pruned_rows = night_prefilter.prune_night_windows(df.assign(Date=df['Date'] - pd.Timedelta(hours=13)),
+                                                             config, backend="python")
+        self.assertEqual(pruned_rows, len(df))
+
+    def test_solar_mask(self):
+        df = make_raw_df([600, 600, 600, 600])  # Midnight local time, whatever the sensors say
+        _, pruned_rows = night_prefilter.prune_night_windows(df, night_mask="solar", backend="python")
+        self.assertEqual(pruned_rows, len(df))
+
+
+if __name__ == '__main__':
+    unittest.main()
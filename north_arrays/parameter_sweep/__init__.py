@@ -0,0 +1 @@
+# This file makes the parameter_sweep directory a Python package
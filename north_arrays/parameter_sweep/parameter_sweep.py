@@ -0,0 +1,182 @@
+import functools
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+import filter_pipeline.filter_pipeline as filter_pipeline
+import performance_ratio.performance_ratio as performance_ratio
+import solar_position.solar_position as solar_position
+import solar_table.solar_table as solar_table
+import time_grid.time_grid as time_grid
+import window_engine.window_engine as window_engine
+
+# This file contains the parameter sweep of the 15 minute filters.
+# The statistics the rules read (means, standard deviations, largest changes, dead values) are computed once for
+# every window (see window_engine). Every rule is then evaluated for all parameter combinations at once, with the
+# swept parameters as a column of values broadcast against the row of windows, so a grid of combinations costs a
+# few array operations per rule instead of a full filter run per combination.
+
+WINDOW_ROWS = 15  # 1 minute rows in a complete 15 minute window
+
+
+def required_columns(inverters):
+    """
+    Returns the SCADA tags read by the sweep besides those of the 15 minute filters: the performance ratio inputs.
+    """
+    return performance_ratio.required_columns(inverters)
+
+
+def load_sweep_grid(filename):
+    """
+    Loads a sweep grid from a JSON file: filter name -> parameter name -> list of values, e.g.
+    {"irradiance_range": {"TRC": [350, 400, 450], "POA_lower_limit": [200, 250, 300]},
+     "power_abrupt_change": {"max_std_ratio": [0.03, 0.05, 0.08]}}
+    """
+    with open(filename) as f:
+        return json.load(f)
+
+
+def compute_window_statistics(one_minute_df):
+    """
+    Returns the statistics of every 15 minute window of 1 minute data read by the rules, as arrays with one
+    value per window, and the window start times ('15 Minute') (see window_engine).
+    The clear-sky GHI of the windows ('reference_ghi') is NaN until it is looked up (see sweep).
+    """
+    return window_engine.MinuteStatistics(one_minute_df).window_statistics("15min")
+
+
+def rejected_by(rule):
+    """
+    Returns the rule of a filter: function(stats, **params) -> True where any reason of its reason rule
+    (see window_engine.REASON_RULES) rejects the window.
+    """
+    def rejected(stats, **params):
+        return functools.reduce(np.logical_or, (mask for _, mask in rule(stats, **params)))
+    return rejected
+
+
+# Rules: filter name -> function(stats, params) -> True where the window is rejected.
+# Parameters are scalars, or columns (combinations x 1) for the swept ones, broadcast against the windows.
+SWEEP_RULES = {name: rejected_by(rule) for name, rule in window_engine.REASON_RULES.items()}
+
+# Rules whose parameters cannot be swept (sequential scans)
+FIXED_RULES = ('power_dead_value',)
+
+
+def build_combinations(sweep_grid, pipeline):
+    """
+    Returns every combination of the swept parameter values as a DataFrame, one column per
+    "filter.parameter" and one row per combination.
+    """
+    columns = {}
+    for name, params in sweep_grid.items():
+        if name not in SWEEP_RULES:
+            raise ValueError(f"Unknown filter in sweep grid: {name}")
+        if pipeline.params(name) is None:
+            raise ValueError(f"Filter {name} is not enabled, it cannot be swept")
+        if name in FIXED_RULES or 'reference' in params:
+            raise ValueError(f"Only numeric thresholds can be swept, not the parameters of {name} or the reference")
+        unknown = [param for param in params if param not in pipeline.params(name)]
+        if unknown:
+            raise ValueError(f"Unknown parameters for {name}: {unknown}")
+        for param, values in params.items():
+            columns[f"{name}.{param}"] = list(values)
+
+    combinations = list(itertools.product(*columns.values()))
+    return pd.DataFrame(combinations, columns=list(columns)) if columns else pd.DataFrame(index=[0])
+
+
+def evaluate_combinations(stats, combinations, pipeline, backend="auto"):
+    """
+    Returns the validity of every window for every combination, as a (combinations x windows) boolean array.
+    Windows are valid when they have 15 rows and no enabled rule rejects them.
+    """
+    valid = np.broadcast_to(stats['rows'] == WINDOW_ROWS, (len(combinations), len(stats['rows']))).copy()
+
+    for spec, params in pipeline.steps:
+        if spec.name not in SWEEP_RULES:
+            raise ValueError(f"Filter {spec.name} has no sweep rule")
+        rule_params = dict(params)
+        if spec.name == 'power_dead_value':
+            rule_params['backend'] = backend
+        for column in combinations.columns:
+            name, param = column.split(".", 1)
+            if name == spec.name:
+                rule_params[param] = combinations[column].to_numpy()[:, None]
+        valid &= ~SWEEP_RULES[spec.name](stats, **rule_params)
+
+    return valid
+
+
+def sweep(one_minute_df, sweep_grid, inverters, filter_config=None, backend="auto", rated_power=None,
+          timezone=solar_position.SITE_TIMEZONE):
+    """
+    Evaluates the 15 minute filters for every combination of the sweep grid on 1 minute data.
+    Returns one row per combination with its parameters, the number of valid windows and the performance
+    ratio of the valid windows (see performance_ratio).
+
+    - filter_config: filters and parameters of the run (see filter_pipeline.build_pipeline), the sweep
+      replaces the swept parameters
+    - timezone: timezone of the timestamps, for the clear-sky GHI when the irradiance range uses it (see solar_table)
+    """
+    pipeline = filter_pipeline.build_pipeline("15min", filter_config)
+    combinations = build_combinations(sweep_grid, pipeline)
+
+    if one_minute_df.empty:
+        return combinations.assign(valid_windows=0, measured_energy_kWh=0.0, expected_energy_kWh=0.0,
+                                   performance_ratio=np.nan)
+
+    stats = add_reference_ghi(compute_window_statistics(one_minute_df), pipeline, timezone)
+    valid = evaluate_combinations(stats, combinations, pipeline, backend)
+
+    # Energy of every window, as if all were good, summed over the valid windows of each combination
+    window_means = pd.DataFrame({'15 Minute': stats['15 Minute'], 'is_valid': 1})
+    one_minute_means = compute_window_means(one_minute_df, required_columns(inverters))
+    window_means = window_means.join(one_minute_means)
+    energy_df = performance_ratio.compute_window_energy(window_means, inverters, "sweep", rated_power)
+    measured = np.nan_to_num(energy_df['measured_energy_kWh'].to_numpy(dtype=np.float64))
+    expected = np.nan_to_num(energy_df['expected_energy_kWh'].to_numpy(dtype=np.float64))
+
+    result = combinations.copy()
+    result['valid_windows'] = valid.sum(axis=1)
+    result['measured_energy_kWh'] = valid @ measured
+    result['expected_energy_kWh'] = valid @ expected
+    return performance_ratio.add_performance_ratio(result)
+
+
+def add_reference_ghi(stats, pipeline, timezone=solar_position.SITE_TIMEZONE):
+    """
+    Looks up the clear-sky GHI of the windows when the irradiance range filter uses it (see solar_table).
+    """
+    if (pipeline.params('irradiance_range') or {}).get('reference') == "clear_sky" and len(stats['15 Minute']):
+        window_times = stats['15 Minute']
+        stats['reference_ghi'] = solar_table.load_for_dates(window_times, timezone=timezone).lookup('clear_sky_ghi',
+                                                                                                   window_times)
+    return stats
+
+
+def compute_window_means(one_minute_df, columns):
+    """
+    Returns the mean of columns over every 15 minute window of 1 minute data, one row per window with data.
+    """
+    times = pd.to_datetime(one_minute_df[one_minute_df.columns[0]]).dt.floor('15min')
+    grid = time_grid.TimeGrid.covering(times, "15min")
+    positions = grid.positions(times)
+    present = grid.counts(positions) > 0
+    means = grid.means(positions, one_minute_df[columns].to_numpy(dtype=np.float64, na_value=np.nan))[present]
+    return pd.DataFrame(means, columns=columns)
+
+
+def print_summary(sweep_df, best=5):
+    """
+    Prints the combinations with the most valid windows.
+    """
+    parameters = [column for column in sweep_df.columns if "." in column]
+    print(f"\n🔹 Parameter sweep: {len(sweep_df)} combinations\n")
+    for row in sweep_df.nlargest(best, 'valid_windows').itertuples(index=False):
+        values = ", ".join(f"{name}={value}" for name, value in zip(parameters, row))
+        print(f"    ✅ {values or 'current parameters'}: {row.valid_windows} valid windows, "
+              f"PR {row.performance_ratio:.3f}")
+    print("")
@@ -0,0 +1,126 @@
+import contextlib
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import parameter_sweep
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import helper_functions_dir.helper_functions as helper_functions
+import performance_ratio.performance_ratio as performance_ratio
+
+
+def make_one_minute_df(windows=8, seed=1):
+    """
+    1 minute data of windows 15 minute windows with varied irradiance, power and temperature, the last window
+    one row short.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = pd.date_range("2024-01-10 10:00:00", periods=15 * windows, freq="1min")[:-1]
+    level = np.repeat(rng.uniform(0.2, 1.2, windows), 15)[:len(minutes)]
+    noise = 1 + rng.normal(0, 0.02, len(minutes)) * np.repeat(rng.uniform(0, 3, windows), 15)[:len(minutes)]
+
+    df = pd.DataFrame({'Minute': minutes})
+    df[fifteen_min_filters.WS241_GHI_TAG] = 400 * level * noise
+    df[fifteen_min_filters.WS241_POA_TAG] = 700 * level * noise
+    df[fifteen_min_filters.WS211_TEMPERATURE_TAG] = 20 + np.cumsum(rng.normal(0, 0.8, len(minutes)))
+    df[fifteen_min_filters.WS241_TEMPERATURE_TAG] = 20 + rng.normal(0, 0.5, len(minutes))
+    df[fifteen_min_filters.WS211_WIND_SPEED_TAG] = 5 + rng.normal(0, 2, len(minutes))
+    df[fifteen_min_filters.WS241_WIND_SPEED_TAG] = 5 + rng.normal(0, 1, len(minutes))
+    df[fifteen_min_filters.POC_ACTIVE_POWER_TAG] = 20000 * level * noise
+    for inverter in helper_functions.create_inverters():
+        df[inverter.active_power_scada_tag] = 4000 * level * noise
+
+    # A stuck temperature sensor in the second window
+    df.loc[15:29, fifteen_min_filters.WS241_TEMPERATURE_TAG] = 21.0
+    return df
+
+
+class TestParameterSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.df = make_one_minute_df()
+        self.inverters = helper_functions.create_inverters()
+
+    def run_filters(self, filter_config):
+        with contextlib.redirect_stdout(io.StringIO()):
+            fifteen_min_df = helper_functions.apply_15_min_filter(self.df.copy(), filter_config=filter_config)
+        return fifteen_min_df
+
+    def test_matches_15_minute_filter(self):
+        grid = {"irradiance_range": {"TRC": [200, 400, 600], "POA_lower_limit": [150, 250]},
+                "power_abrupt_change": {"max_std_ratio": [0.02, 0.05]},
+                "irradiance_abrupt_change": {"max_std_ratio": [0.05, 0.1]},
+                "temperature_abrupt_change": {"max_change": [2, 4]},
+                "wind_abrupt_change": {"max_change": [5, 10]}}
+
+        sweep_df = parameter_sweep.sweep(self.df, grid, self.inverters)
+
+        self.assertEqual(len(sweep_df), 96)
+        self.assertGreater(sweep_df['valid_windows'].nunique(), 2)
+        for row in sweep_df.itertuples(index=False):
+            filter_config = {}
+            for column, value in zip(sweep_df.columns, row):
+                if "." in column:
+                    name, param = column.split(".")
+                    filter_config.setdefault(name, {"params": {}})["params"][param] = value
+
+            fifteen_min_df = self.run_filters(filter_config)
+            period_df = performance_ratio.summarize_periods(
+                performance_ratio.compute_window_energy(fifteen_min_df, self.inverters, "north"))
+
+            self.assertEqual(row.valid_windows, fifteen_min_df['is_valid'].sum())
+            if row.valid_windows:
+                self.assertAlmostEqual(row.performance_ratio, period_df['performance_ratio'].iloc[0])
+
+    def test_without_grid(self):
+        sweep_df = parameter_sweep.sweep(self.df, {}, self.inverters, {"power_dead_value": {"enabled": True}})
+
+        self.assertEqual(len(sweep_df), 1)
+        self.assertEqual(sweep_df.loc[0, 'valid_windows'],
+                         self.run_filters({"power_dead_value": {"enabled": True}})['is_valid'].sum())
+
+    def test_expected_energy(self):
+        filter_config = {"power_dead_value": {"enabled": True}}
+        sweep_df = parameter_sweep.sweep(self.df, {}, self.inverters, filter_config)
+        fifteen_min_df = self.run_filters(filter_config)
+
+        # Expected energy of the valid windows, with the module temperature from the ambient temperature and POA
+        good_df = fifteen_min_df[fifteen_min_df['is_valid'] == 1]
+        poa = good_df[performance_ratio.POA_TAG]
+        module_temperature = good_df[performance_ratio.AMBIENT_TEMPERATURE_TAG] + (45 - 20) / 800 * poa
+        expected = (len(self.inverters) * performance_ratio.INVERTER_RATING * poa / 1000 * 0.25
+                    * (1 - 0.0035 * (module_temperature - 25))).sum()
+        np.testing.assert_allclose(sweep_df['expected_energy_kWh'], [expected])
+
+    def test_projected_columns(self):
+        usecols = helper_functions.get_required_columns(self.inverters, parameter_sweep.required_columns(self.inverters))
+        df = self.df.assign(**{"VALUE(UNUSED)": 1.0})
+        projected_df = df[['Minute'] + [column for column in df.columns if column in usecols]]
+        grid = {"irradiance_range": {"TRC": [200, 600]}}
+
+        pd.testing.assert_frame_equal(parameter_sweep.sweep(projected_df, grid, self.inverters),
+                                      parameter_sweep.sweep(df, grid, self.inverters))
+        self.assertIn(performance_ratio.AMBIENT_TEMPERATURE_TAG, projected_df.columns)
+        self.assertNotIn("VALUE(UNUSED)", projected_df.columns)
+
+    def test_window_statistics(self):
+        stats = parameter_sweep.compute_window_statistics(self.df)
+
+        window = self.df.iloc[:15]
+        self.assertEqual(stats['rows'].tolist(), [15] * 7 + [14])
+        self.assertAlmostEqual(stats['ghi_std'][0], window[fifteen_min_filters.WS241_GHI_TAG].std())
+        self.assertAlmostEqual(stats['temperature_211_largest_change'][0],
+                               window[fifteen_min_filters.WS211_TEMPERATURE_TAG].diff().abs().max())
+        self.assertEqual(stats['temperature_241_dead'][:3].tolist(), [False, True, False])
+
+    def test_invalid_grid(self):
+        with self.assertRaises(ValueError):
+            parameter_sweep.sweep(self.df, {"irradiance_range": {"no_such_param": [1]}}, self.inverters)
+        with self.assertRaises(ValueError):
+            parameter_sweep.sweep(self.df, {"power_dead_value": {"run_length": [3]}}, self.inverters)
+
+
+if __name__ == '__main__':
+    unittest.main()
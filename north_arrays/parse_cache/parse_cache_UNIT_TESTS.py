@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import parse_cache
+
+HEADER = "Date,VALUE(A),VALUE(B),VALUE(C)"
+
+
+def write_raw_csv(filename, rows=20, offset=0.0):
+    """
+    Raw SCADA CSV export: 5 rows above the column header, 12-hour timestamps, a NaN value.
+    """
+    times = pd.date_range("2024-01-10 12:59:00", periods=rows, freq="3s")
+    with open(filename, "w") as f:
+        f.write("a\nb\nc\nd\ne\n" + HEADER + "\n")
+        for i, time in enumerate(times):
+            b = "" if i == 3 else f"{i * 0.5 + offset}"
+            f.write(f"{time.strftime('%d/%m/%Y %I:%M:%S %p')},{i + offset},{b},{-i}\n")
+
+
+def parse_raw_csv(filename, usecols=None):
+    return pd.read_csv(filename, skiprows=5, parse_dates=[0], date_format="%d/%m/%Y %I:%M:%S %p", usecols=usecols)
+
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, "cache")
+        self.filename = os.path.join(self.directory, "raw.csv")
+        write_raw_csv(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, filename=None, usecols=None):
+        """
+        Reads a file the way helper_functions.read_raw_csv does, returns whether it was read from the cache.
+        """
+        filename = filename or self.filename
+        df = parse_cache.load(filename, usecols, self.cache_dir)
+        if df is not None:
+            return df, True
+        df = parse_raw_csv(filename, usecols)
+        parse_cache.save(filename, df, HEADER.split(","), self.cache_dir)
+        return df, False
+
+    def test_cached_equals_parsed(self):
+        expected = parse_raw_csv(self.filename)
+
+        df, cached = self.read()
+        self.assertFalse(cached)
+        df, cached = self.read()
+        self.assertTrue(cached)
+
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertTrue(np.isnan(df.loc[3, "VALUE(B)"]))
+
+    def test_columns(self):
+        self.read(usecols=["Date", "VALUE(C)"])
+
+        # Cached columns, in file order
+        df, cached = self.read(usecols=["VALUE(C)", "Date"])
+        self.assertTrue(cached)
+        self.assertEqual(list(df.columns), ["Date", "VALUE(C)"])
+
+        # Other columns are parsed and added to the cache file
+        df, cached = self.read(usecols=["Date", "VALUE(A)"])
+        self.assertFalse(cached)
+        df, cached = self.read(usecols=["VALUE(A)", "VALUE(C)"])
+        self.assertTrue(cached)
+        self.assertEqual(list(df.columns), ["VALUE(A)", "VALUE(C)"])
+
+        # Every column is needed when usecols is not given
+        df, cached = self.read()
+        self.assertFalse(cached)
+        df, cached = self.read()
+        self.assertTrue(cached)
+        self.assertEqual(list(df.columns), HEADER.split(","))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)  # Index and one cache file
+
+    def test_changed_and_copied_files(self):
+        self.read()
+
+        # Rewritten file: parsed again
+        write_raw_csv(self.filename, offset=1.0)
+        df, cached = self.read()
+        self.assertFalse(cached)
+        self.assertEqual(df.loc[0, "VALUE(A)"], 1.0)
+
+        # Same contents under another path: found by the content hash
+        copy = os.path.join(self.directory, "copy.csv")
+        shutil.copyfile(self.filename, copy)
+        df, cached = self.read(copy)
+        self.assertTrue(cached)
+        self.assertEqual(df.loc[0, "VALUE(A)"], 1.0)
+
+    def test_eviction(self):
+        filenames = []
+        for i in range(3):
+            filenames.append(os.path.join(self.directory, f"raw_{i}.csv"))
+            write_raw_csv(filenames[-1], offset=i)
+            self.read(filenames[-1])
+            os.utime(parse_cache.cache_filename(parse_cache.file_key(filenames[-1], self.cache_dir), self.cache_dir),
+                     ns=(i * 10 ** 9, i * 10 ** 9))
+        entry_bytes = os.path.getsize(parse_cache.cache_filename(
+            parse_cache.file_key(filenames[0], self.cache_dir), self.cache_dir))
+
+        # The least recently used files are removed, never the file just saved
+        parse_cache.evict(self.cache_dir, max_bytes=2 * entry_bytes)
+        self.assertEqual([self.read(filename)[1] for filename in filenames], [False, True, True])
+
+        parse_cache.evict(self.cache_dir, max_bytes=0, keep=parse_cache.cache_filename(
+            parse_cache.file_key(filenames[1], self.cache_dir), self.cache_dir))
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.endswith(".npz")]), 1)
+
+    def test_other_version(self):
+        self.read()
+        entry_filename = parse_cache.cache_filename(parse_cache.file_key(self.filename, self.cache_dir), self.cache_dir)
+        with open(entry_filename, "wb") as f:
+            np.savez(f, meta='{"version": 0}')
+
+        self.assertIsNone(parse_cache.load(self.filename, cache_dir=self.cache_dir))
+        df, cached = self.read()
+        self.assertFalse(cached)
+        self.assertTrue(self.read()[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
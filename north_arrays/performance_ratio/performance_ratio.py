@@ -0,0 +1,188 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import solar_position.solar_position as solar_position
+
+# This file contains the performance ratio engine.
+# Measured and expected (temperature-corrected) energy are computed for every good 15 minute window at once,
+# with the module temperature estimated from the ambient temperature and POA irradiance (NOCT model),
+# then summed per day and per test period. Tables of several arrays can be combined into one site result.
+
+# SCADA tags read by the performance ratio engine (irradiance and ambient temperature from the same weather station
+# as the 15 minute filters). The weather stations have no module temperature sensor.
+POA_TAG = fifteen_min_filters.REQUIRED_COLUMNS['irradiance'][1]
+AMBIENT_TEMPERATURE_TAG = fifteen_min_filters.WS241_TEMPERATURE_TAG
+
+INVERTER_RATING = 4 * 1097.5  # kW, 4 power modules of 1.0975 MVA
+STC_IRRADIANCE = 1000.0  # W/m2
+WINDOW_HOURS = 0.25
+NOCT = 45.0  # °C, nominal operating cell temperature (800 W/m2, 20 °C ambient, 1 m/s wind)
+NOCT_IRRADIANCE = 800.0  # W/m2
+NOCT_AMBIENT_TEMPERATURE = 20.0  # °C
+
+ENERGY_COLUMNS = ['measured_energy_kWh', 'expected_energy_kWh', 'irradiation_kWh_m2']
+
+
+def required_columns(inverters):
+    """
+    Returns the SCADA tags read by the performance ratio engine.
+    """
+    return [inverter.active_power_scada_tag for inverter in inverters] + [POA_TAG, AMBIENT_TEMPERATURE_TAG]
+
+
+def module_temperature(ambient_temperature, poa, noct=NOCT):
+    """
+    Returns the module temperature (°C) estimated with the NOCT model:
+    T_module = T_ambient + (NOCT - 20 °C) / 800 W/m2 * POA.
+    """
+    return ambient_temperature + (noct - NOCT_AMBIENT_TEMPERATURE) / NOCT_IRRADIANCE * poa
+
+
+def compute_window_energy(fifteen_min_df, inverters, array, rated_power=None, temperature_coefficient=-0.0035,
+                          reference_temperature=25.0, noct=NOCT):
+    """
+    Returns the measured and expected energy of every good 15 minute window.
+
+    - Measured energy: sum of the inverter active powers over the window.
+    - Expected energy: rated_power * POA / 1000 W/m2 over the window, corrected by temperature_coefficient
+      (per °C) for the module temperature difference from reference_temperature. The module temperature is
+      estimated from the ambient temperature and POA with the NOCT model (see module_temperature).
+    - rated_power: kW at STC, by default the inverter nameplate of the array (len(inverters) * INVERTER_RATING).
+      Use the DC rating of the modules when it is known.
+    - array: label of the array, so tables of several arrays can be combined.
+    """
+    if rated_power is None:
+        rated_power = len(inverters) * INVERTER_RATING
+
+    if fifteen_min_df.empty:
+        fifteen_min_df = pd.DataFrame({'15 Minute': pd.Series(dtype="datetime64[ns]"),
+                                       'is_valid': pd.Series(dtype=float)})
+        fifteen_min_df[required_columns(inverters)] = np.nan
+    good_df = fifteen_min_df[fifteen_min_df['is_valid'] == 1]
+
+    power = good_df[[inverter.active_power_scada_tag for inverter in inverters]].to_numpy(dtype=np.float64).sum(axis=1)
+    poa = good_df[POA_TAG].to_numpy(dtype=np.float64)
+    ambient_temperature = good_df[AMBIENT_TEMPERATURE_TAG].to_numpy(dtype=np.float64)
+
+    irradiation = poa / STC_IRRADIANCE * WINDOW_HOURS
+    measured_energy = power * WINDOW_HOURS
+    expected_energy = (rated_power * irradiation
+                       * (1 + temperature_coefficient
+                          * (module_temperature(ambient_temperature, poa, noct) - reference_temperature)))
+
+    window_df = pd.DataFrame({
+        '15 Minute': good_df['15 Minute'].to_numpy(),
+        'array': array,
+        'measured_energy_kWh': measured_energy,
+        'expected_energy_kWh': expected_energy,
+        'irradiation_kWh_m2': irradiation,
+    })
+    return add_performance_ratio(window_df)
+
+
+def add_performance_ratio(df):
+    """
+    Adds the performance_ratio column (measured over expected energy, NaN without expected energy).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        df['performance_ratio'] = np.where(df['expected_energy_kWh'] > 0,
+                                           df['measured_energy_kWh'] / df['expected_energy_kWh'], np.nan)
+    return df
+
+
+def summarize_days(window_df, combine_arrays=True, local_timezone=None):
+    """
+    Returns the energy and performance ratio of every day.
+    If combine_arrays is True, the energy of all arrays is added up, otherwise there is one row per array and day.
+    If local_timezone is given, the windows are UTC and are grouped by their day in local_timezone ('Day' is the
+    local date).
+    """
+    local_times = solar_position.to_local(window_df['15 Minute'], local_timezone)
+    keys = [pd.Series(local_times.floor('D'), index=window_df.index, name='Day')]
+    if not combine_arrays:
+        keys.insert(0, window_df['array'])
+
+    daily_df = window_df.groupby(keys)[ENERGY_COLUMNS].sum()
+    daily_df['windows'] = window_df.groupby(keys).size()
+    return add_performance_ratio(daily_df.reset_index())
+
+
+def summarize_periods(window_df, periods=None, combine_arrays=True):
+    """
+    Returns the energy and performance ratio of every test period.
+
+    - periods: list of (start, end) pairs, end excluded. By default the whole table is one period.
+    - Every period is read from running totals of the sorted windows, so long tables and many periods
+      cost one sort and one search.
+    - If combine_arrays is True, the energy of all arrays is added up, otherwise there is one row per array and period.
+    """
+    if periods is None:
+        periods = [] if window_df.empty else [(window_df['15 Minute'].min(),
+                                               window_df['15 Minute'].max() + pd.Timedelta(minutes=15))]
+    starts = pd.DatetimeIndex([pd.Timestamp(start) for start, _ in periods])
+    ends = pd.DatetimeIndex([pd.Timestamp(end) for _, end in periods])
+
+    groups = [("all", window_df)] if combine_arrays else list(window_df.groupby('array', sort=True))
+
+    summaries = []
+    for array, group_df in groups:
+        group_df = group_df.sort_values('15 Minute', kind="stable")
+        times = group_df['15 Minute'].to_numpy()
+        first = np.searchsorted(times, starts.to_numpy(dtype=times.dtype), side="left")
+        last = np.searchsorted(times, ends.to_numpy(dtype=times.dtype), side="left")
+
+        summary_df = pd.DataFrame({'period_start': starts, 'period_end': ends})
+        if not combine_arrays:
+            summary_df.insert(0, 'array', array)
+        for column in ENERGY_COLUMNS:
+            running_total = np.concatenate([[0.0], np.cumsum(group_df[column].to_numpy(dtype=np.float64))])
+            summary_df[column] = running_total[last] - running_total[first]
+        summary_df['windows'] = last - first
+        summaries.append(summary_df)
+
+    return add_performance_ratio(pd.concat(summaries, ignore_index=True))
+
+
+def print_summary(period_df):
+    """
+    Prints the performance ratio of every test period.
+    """
+    print("\n🔹 Performance ratio:\n")
+    for row in period_df.itertuples(index=False):
+        label = f"{getattr(row, 'array', 'all')}, {row.period_start} to {row.period_end}"
+        print(f"    ✅ {label}: PR {row.performance_ratio:.3f} "
+              f"({row.measured_energy_kWh:.0f} of {row.expected_energy_kWh:.0f} kWh expected, {row.windows} windows)")
+    print("")
+
+
+def load_window_energy(filenames):
+    """
+    Loads and combines 15 minute performance ratio tables written by the performance testing scripts.
+    """
+    return pd.concat([pd.read_csv(filename, parse_dates=['15 Minute']) for filename in filenames], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Combined performance ratio of several arrays")
+    parser.add_argument("filenames", nargs="+",
+                        help="15 minute performance ratio tables (output_data/performance_ratio_15_min.csv of each array)")
+    parser.add_argument("--test-period", nargs=2, action="append", metavar=("START", "END"), default=None,
+                        help="Test period (end excluded), can be given several times. Default: all windows")
+    parser.add_argument("--daily-output", default=None, help="CSV file for the combined daily performance ratio")
+    args = parser.parse_args()
+
+    window_df = load_window_energy(args.filenames)
+
+    if args.daily_output:
+        summarize_days(window_df).to_csv(args.daily_output, index=False)
+        print(f"🔹 Daily performance ratio saved to: {args.daily_output}\n")
+
+    print_summary(summarize_periods(window_df, args.test_period, combine_arrays=False))
+    print_summary(summarize_periods(window_df, args.test_period))
+
+
+if __name__ == "__main__":
+    main()
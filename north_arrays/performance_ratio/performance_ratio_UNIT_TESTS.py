@@ -0,0 +1,114 @@
+import csv
+import re
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import performance_ratio
+import helper_functions_dir.helper_functions as helper_functions
+
+
+def make_fifteen_min_df(inverters, power, poa, module_temperature, is_valid=1):
+    # One good 15 minute window per value, one per hour
+    df = pd.DataFrame({'15 Minute': pd.date_range("2024-01-10 10:00:00", periods=len(poa), freq="h")})
+    for inverter in inverters:
+        df[inverter.active_power_scada_tag] = power
+    df[performance_ratio.POA_TAG] = poa
+    # Ambient temperature giving this module temperature at the POA of the window
+    df[performance_ratio.AMBIENT_TEMPERATURE_TAG] = (np.asarray(module_temperature, dtype=np.float64)
+                                                     - performance_ratio.module_temperature(0.0, np.asarray(poa)))
+    df['is_valid'] = is_valid
+    return df
+
+
+class TestPerformanceRatio(unittest.TestCase):
+
+    def setUp(self):
+        self.inverters = helper_functions.create_inverters()[:2]
+
+    def test_window_energy(self):
+        df = make_fifteen_min_df(self.inverters, power=[500.0, 400.0, 500.0], poa=[500.0, 500.0, 500.0],
+                                 module_temperature=[25.0, 25.0, 35.0], is_valid=[1, 1, 0])
+
+        window_df = performance_ratio.compute_window_energy(df, self.inverters, "north", rated_power=2000)
+
+        self.assertEqual(len(window_df), 2, "Only good windows are kept.")
+        np.testing.assert_allclose(window_df['measured_energy_kWh'], [250, 200])
+        np.testing.assert_allclose(window_df['expected_energy_kWh'], [250, 250])
+        np.testing.assert_allclose(window_df['performance_ratio'], [1.0, 0.8])
+
+    def test_temperature_correction(self):
+        df = make_fifteen_min_df(self.inverters, power=500.0, poa=[1000.0], module_temperature=[45.0])
+
+        window_df = performance_ratio.compute_window_energy(df, self.inverters, "north", rated_power=1000,
+                                                            temperature_coefficient=-0.004)
+
+        np.testing.assert_allclose(window_df['expected_energy_kWh'], [1000 * 0.25 * (1 - 0.004 * 20)])
+
+    def test_module_temperature(self):
+        # NOCT conditions give the NOCT, and the module heats up with POA
+        self.assertAlmostEqual(performance_ratio.module_temperature(20.0, 800.0), performance_ratio.NOCT)
+        np.testing.assert_allclose(performance_ratio.module_temperature(np.array([10.0, 10.0]), np.array([0.0, 400.0]),
+                                                                        noct=48.0), [10.0, 24.0])
+
+        df = make_fifteen_min_df(self.inverters, power=500.0, poa=[800.0], module_temperature=[45.0])
+        window_df = performance_ratio.compute_window_energy(df, self.inverters, "north", rated_power=1000,
+                                                            temperature_coefficient=-0.004)
+        self.assertAlmostEqual(df[performance_ratio.AMBIENT_TEMPERATURE_TAG][0], 20.0)
+        np.testing.assert_allclose(window_df['expected_energy_kWh'], [800 * 0.25 * (1 - 0.004 * 20)])
+
+    def test_temperature_tag(self):
+        # The SCADA export names every tag on the row below the tags: the temperature tag must be an air temperature
+        with open("../helper_functions_dir/unit_test_data/load_and_initialize_df_data.csv", encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+        names = {re.search(r"WSTAT\d+-(\w+)\.", tag).group(1): name
+                 for tag, name in zip(rows[2], rows[3]) if "WSTAT" in tag}
+
+        measurement = re.search(r"WSTAT\d+-(\w+)\.", performance_ratio.AMBIENT_TEMPERATURE_TAG).group(1)
+        self.assertIn(measurement, names)
+        self.assertIn("AIR TEMP", names[measurement].upper())
+        self.assertIn("TILT ANGLE", names["PVATA"].upper())
+
+    def test_days_and_periods(self):
+        df = make_fifteen_min_df(self.inverters, power=250.0, poa=[1000.0] * 30, module_temperature=25.0)
+        window_df = performance_ratio.compute_window_energy(df, self.inverters, "north", rated_power=1000)
+
+        daily_df = performance_ratio.summarize_days(window_df)
+        period_df = performance_ratio.summarize_periods(window_df, [("2024-01-10", "2024-01-11"),
+                                                                    ("2024-01-11 00:00", "2024-01-11 02:00")])
+
+        self.assertEqual(daily_df['windows'].tolist(), [14, 16])
+        np.testing.assert_allclose(daily_df['performance_ratio'], [0.5, 0.5])
+        self.assertEqual(period_df['windows'].tolist(), [14, 2])
+        np.testing.assert_allclose(period_df['measured_energy_kWh'], [14 * 125, 2 * 125])
+
+    def test_local_days(self):
+        df = make_fifteen_min_df(self.inverters, power=250.0, poa=[1000.0] * 30, module_temperature=25.0)
+        window_df = performance_ratio.compute_window_energy(df, self.inverters, "north", rated_power=1000)
+        utc_df = window_df.assign(**{'15 Minute': window_df['15 Minute'] - pd.Timedelta(hours=13)})
+
+        # UTC windows are grouped by their day in New Zealand, not by the UTC day (which starts at 1 pm there)
+        pd.testing.assert_frame_equal(performance_ratio.summarize_days(utc_df, local_timezone="Pacific/Auckland"),
+                                      performance_ratio.summarize_days(window_df))
+        self.assertEqual(performance_ratio.summarize_days(utc_df)['windows'].tolist(), [3, 24, 3])
+
+    def test_combine_arrays(self):
+        north_df = performance_ratio.compute_window_energy(
+            make_fifteen_min_df(self.inverters, power=500.0, poa=[1000.0], module_temperature=25.0),
+            self.inverters, "north", rated_power=1000)
+        south_df = performance_ratio.compute_window_energy(
+            make_fifteen_min_df(self.inverters, power=250.0, poa=[1000.0], module_temperature=25.0),
+            self.inverters, "south", rated_power=3000)
+        window_df = pd.concat([north_df, south_df], ignore_index=True)
+
+        combined_df = performance_ratio.summarize_periods(window_df)
+        by_array_df = performance_ratio.summarize_periods(window_df, combine_arrays=False)
+
+        np.testing.assert_allclose(combined_df['performance_ratio'], [(250 + 125) / (250 + 750)])
+        self.assertEqual(by_array_df['array'].tolist(), ["north", "south"])
+        np.testing.assert_allclose(by_array_df['performance_ratio'], [1.0, 1 / 6])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import solar_position.solar_position as solar_position
+import time_grid.time_grid as time_grid
+
+# This file contains the multi-resolution pyramid of the valid 1 minute data.
+# Every level (1 minute, 15 minutes, hour, day) keeps the sum, count, minimum and maximum of every column for the
+# slots that have data. The 1 minute level is read from the 1 minute data in one pass, and each coarser level is
+# reduced from the level below it (sums of sums, minima of minima), so the data is only read once.
+# Slots are numbered from the time grid epoch (see time_grid), so a range query is a binary search per level,
+# and the totals of a long range read whole days where they can and only the partial days, hours and
+# quarters at its edges from the finer levels.
+# On disk, the 1 minute level is kept as its values only (its sums, counts and extremes are the values).
+# Slots of UTC data (--timezone) are numbered in local standard time (utc_offset), so the days are local days.
+# A fixed offset keeps one slot per minute over daylight saving changes: in summer the days start at 1 am, when
+# there is no solar output. Query times and slot times stay in the time of the data.
+
+# Levels finest first, the period of each a multiple of the period of the one before
+LEVELS = {'1min': "1min", '15min': "15min", 'hour': "1h", 'day': "1D"}
+BASE_LEVEL = '1min'
+TIME_COLUMNS = {'1min': 'Minute', '15min': '15 Minute', 'hour': 'Hour', 'day': 'Day'}
+STATISTICS = ('mean', 'sum', 'count', 'min', 'max')
+EXCLUDED_COLUMNS = ('is_valid', 'rejection_code')
+PYRAMID_VERSION = 2
+
+
+class Level:
+    """
+    One level of the pyramid: the slots with data (sorted) and, for every slot and column, the sum, the number of
+    non-NaN values, the minimum and the maximum (NaN without values).
+    """
+
+    def __init__(self, name, slots, sums, counts, minima, maxima):
+        self.name = name
+        self.period = pd.Timedelta(LEVELS[name])
+        self.slots = slots
+        self.sums = sums
+        self.counts = counts
+        self.minima = minima
+        self.maxima = maxima
+
+    def coarser(self, name):
+        """
+        Returns the level above this one, with the slots of this level grouped into the slots of period name.
+        """
+        factor = pd.Timedelta(LEVELS[name]) // self.period
+        present, starts, _ = time_grid.window_boundaries(self.slots // factor)
+        if not len(starts):
+            return Level(name, present, self.sums[:0], self.counts[:0], self.minima[:0], self.maxima[:0])
+        return Level(name, present, np.add.reduceat(self.sums, starts), np.add.reduceat(self.counts, starts),
+                     np.fmin.reduceat(self.minima, starts), np.fmax.reduceat(self.maxima, starts))
+
+    def range(self, start=None, end=None):
+        """
+        Returns the first and last (excluded) index of the slots starting in [start, end).
+        """
+        first = 0 if start is None else np.searchsorted(self.slots, slot_ceiling(start, self.period), side="left")
+        last = len(self.slots) if end is None else np.searchsorted(self.slots, slot_ceiling(end, self.period),
+                                                                    side="left")
+        return first, max(first, last)
+
+    def times(self, first=0, last=None):
+        return pd.to_datetime(time_grid.EPOCH.value + self.slots[first:last] * self.period.value)
+
+
+class Pyramid:
+    """
+    The levels of the pyramid by name, the columns they hold, and the offset of the slot times from the
+    times of the data.
+    """
+
+    def __init__(self, columns, levels, utc_offset=pd.Timedelta(0)):
+        self.columns = list(columns)
+        self.levels = levels
+        self.utc_offset = pd.Timedelta(utc_offset)
+
+    def query(self, level="hour", start=None, end=None, stat="mean", columns=None):
+        """
+        Returns the slots of a level that start in [start, end) with one statistic of the columns (all by default),
+        and the number of 1 minute rows of the slot ('minutes').
+        """
+        if level not in self.levels:
+            raise ValueError(f"Unknown pyramid level: {level}. Expected one of {list(self.levels)}")
+        level_data = self.levels[level]
+        indices = self._column_indices(columns)
+        first, last = level_data.range(self._slot_time(start), self._slot_time(end))
+
+        values = statistic(stat, *(array[first:last][:, indices] for array in
+                                   (level_data.sums, level_data.counts, level_data.minima, level_data.maxima)))
+        df = pd.DataFrame(values, columns=[self.columns[i] for i in indices])
+        df.insert(0, TIME_COLUMNS[level], level_data.times(first, last) - self.utc_offset)
+        df['minutes'] = self._minutes(level_data, first, last)
+        return df
+
+    def totals(self, start=None, end=None, stat="mean", columns=None):
+        """
+        Returns one statistic of the columns over [start, end), from the coarsest slots that fit in the range.
+        """
+        indices = self._column_indices(columns)
+        parts = self._cover(list(self.levels), self._slot_time(start), self._slot_time(end))
+
+        sums = np.zeros(len(indices))
+        counts = np.zeros(len(indices), dtype=np.int64)
+        minima = np.full(len(indices), np.nan)
+        maxima = np.full(len(indices), np.nan)
+        for level_data, first, last in parts:
+            sums += level_data.sums[first:last][:, indices].sum(axis=0)
+            counts += level_data.counts[first:last][:, indices].sum(axis=0)
+            if last > first:
+                minima = np.fmin(minima, np.fmin.reduce(level_data.minima[first:last][:, indices], axis=0))
+                maxima = np.fmax(maxima, np.fmax.reduce(level_data.maxima[first:last][:, indices], axis=0))
+
+        return pd.Series(statistic(stat, sums, counts, minima, maxima), index=[self.columns[i] for i in indices])
+
+    def _cover(self, names, start, end):
+        # Slices of the coarsest level inside [start, end), and the finer levels for the edges around them
+        level_data = self.levels[names[-1]]
+        if len(names) == 1:
+            return [(level_data,) + level_data.range(start, end)]
+
+        first_slot = None if start is None else slot_ceiling(start, level_data.period)
+        last_slot = None if end is None else (end - time_grid.EPOCH) // level_data.period
+        if first_slot is not None and last_slot is not None and first_slot >= last_slot:
+            return self._cover(names[:-1], start, end)
+
+        inner_start = None if first_slot is None else time_grid.EPOCH + first_slot * level_data.period
+        inner_end = None if last_slot is None else time_grid.EPOCH + last_slot * level_data.period
+        parts = [(level_data,) + level_data.range(inner_start, inner_end)]
+        if start is not None and start < inner_start:
+            parts += self._cover(names[:-1], start, inner_start)
+        if end is not None and inner_end < end:
+            parts += self._cover(names[:-1], inner_end, end)
+        return parts
+
+    def _slot_time(self, time):
+        # Time on the slot grid of a query time
+        return None if time is None else to_naive(time) + self.utc_offset
+
+    def _column_indices(self, columns):
+        if columns is None:
+            return list(range(len(self.columns)))
+        missing = [col for col in columns if col not in self.columns]
+        if missing:
+            raise ValueError(f"Columns not in the pyramid: {missing}")
+        return [self.columns.index(col) for col in columns]
+
+    def _minutes(self, level_data, first, last):
+        # 1 minute rows of every slot (the most values of a column)
+        if not self.columns:
+            return np.zeros(last - first, dtype=np.int64)
+        return level_data.counts[first:last].max(axis=1)
+
+    def save(self, filename):
+        """
+        Saves the pyramid to a compressed npz file (see load_pyramid).
+        """
+        base = self.levels[BASE_LEVEL]
+        arrays = {f"{BASE_LEVEL}_slots": base.slots, f"{BASE_LEVEL}_values": base.maxima}
+        for name, level_data in self.levels.items():
+            if name == BASE_LEVEL:
+                continue
+            for field in ('slots', 'sums', 'counts', 'minima', 'maxima'):
+                arrays[f"{name}_{field}"] = getattr(level_data, field)
+        np.savez_compressed(filename, version=PYRAMID_VERSION, columns=json.dumps(self.columns),
+                            utc_offset_ns=self.utc_offset.value, **arrays)
+
+
+def to_naive(time):
+    # Timezone-aware times are compared in UTC, as the slots of timezone-aware data are (see time_grid)
+    time = pd.Timestamp(time)
+    return time.tz_convert("UTC").tz_localize(None) if time.tzinfo is not None else time
+
+
+def slot_ceiling(time, period):
+    # First slot starting at or after time
+    return -(-(to_naive(time) - time_grid.EPOCH) // pd.Timedelta(period))
+
+
+def statistic(stat, sums, counts, minima, maxima):
+    """
+    Returns one statistic from the sums, counts, minima and maxima of slots (mean and extremes NaN without values).
+    """
+    if stat == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    if stat == "sum":
+        return sums
+    if stat == "count":
+        return counts
+    if stat == "min":
+        return minima
+    if stat == "max":
+        return maxima
+    raise ValueError(f"Unknown statistic: {stat}. Expected one of {STATISTICS}")
+
+
+def build_pyramid(one_minute_df, columns=None, local_timezone=None):
+    """
+    Builds the pyramid of the valid 1 minute data (see aggregate_to_one_minute).
+    columns: columns to keep, by default every numeric column but the validation columns.
+    local_timezone: timezone of the days when the data is UTC (--timezone), in its standard time
+    """
+    utc_offset = pd.Timedelta(0) if local_timezone is None else solar_position.standard_utc_offset(local_timezone)
+    if columns is None:
+        columns = [col for col in one_minute_df.select_dtypes(include=['number']).columns
+                   if col not in EXCLUDED_COLUMNS]
+    one_minute_df = one_minute_df.sort_values('Minute', kind="stable")
+
+    values = one_minute_df[columns].to_numpy(dtype=np.float64, na_value=np.nan).reshape(len(one_minute_df),
+                                                                                        len(columns))
+    slots, starts, _ = time_grid.window_boundaries(time_grid.to_slots(one_minute_df['Minute'] + utc_offset,
+                                                                      LEVELS[BASE_LEVEL]))
+    if len(starts) != len(one_minute_df):
+        raise ValueError("The 1 minute data must have one row per minute")
+
+    names = list(LEVELS)
+    levels = {BASE_LEVEL: base_level(slots.astype(np.int64), values)}
+    for previous, name in zip(names, names[1:]):
+        levels[name] = levels[previous].coarser(name)
+    return Pyramid(columns, levels, utc_offset)
+
+
+def base_level(slots, values):
+    # The 1 minute level: one value per slot and column
+    not_nan = ~np.isnan(values)
+    return Level(BASE_LEVEL, slots, np.where(not_nan, values, 0.0), not_nan.astype(np.int32), values, values)
+
+
+def load_pyramid(filename):
+    """
+    Loads a pyramid saved with Pyramid.save.
+    """
+    with np.load(filename) as data:
+        if int(data['version']) != PYRAMID_VERSION:
+            raise ValueError(f"Pyramid file version {int(data['version'])} is not {PYRAMID_VERSION}, build it again")
+        levels = {BASE_LEVEL: base_level(data[f"{BASE_LEVEL}_slots"], data[f"{BASE_LEVEL}_values"])}
+        for name in LEVELS:
+            if name != BASE_LEVEL:
+                levels[name] = Level(name, *(data[f"{name}_{field}"] for field in
+                                             ('slots', 'sums', 'counts', 'minima', 'maxima')))
+        return Pyramid(json.loads(str(data['columns'])), levels, pd.Timedelta(int(data['utc_offset_ns'])))
+
+
+def print_summary(pyramid):
+    """
+    Prints the number of slots of every level.
+    """
+    print("\n🔹 Pyramid:\n")
+    for name, level_data in pyramid.levels.items():
+        print(f"    ✅ {name:<6} {len(level_data.slots)} slots")
+    print("")
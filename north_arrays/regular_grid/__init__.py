@@ -0,0 +1 @@
+# This file makes the regular_grid directory a Python package
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import regular_grid
+
+
+class TestRegularGrid(unittest.TestCase):
+
+    def make_df(self, dates):
+        return pd.DataFrame({'Date': pd.to_datetime(dates), 'value': np.arange(len(dates), dtype=float)})
+
+    def test_regular_data_is_unchanged(self):
+        df = self.make_df(pd.date_range("2024-01-10 12:00:00", periods=40, freq="3s"))
+
+        regular_df, report = regular_grid.regularize(df)
+
+        pd.testing.assert_frame_equal(regular_df, df, check_index_type=False)
+        self.assertEqual((report['duplicates'], report['off_grid'], report['missing'].sum()), (0, 0, 0))
+        self.assertTrue(report['gaps'].empty)
+
+    def test_gaps_are_explicit(self):
+        dates = pd.date_range("2024-01-10 12:00:00", periods=10, freq="3s").delete([3, 4, 5, 8])
+        df = self.make_df(dates)
+
+        regular_df, report = regular_grid.regularize(df)
+
+        self.assertEqual(len(regular_df), 10)
+        self.assertEqual(regular_df['Date'].tolist(),
+                         list(pd.date_range("2024-01-10 12:00:00", periods=10, freq="3s")))
+        self.assertEqual(report['missing'].tolist(), [False] * 3 + [True] * 3 + [False] * 2 + [True, False])
+        self.assertTrue(regular_df['value'][report['missing']].isna().all())
+        self.assertEqual(report['gaps']['missing_samples'].tolist(), [3, 1])
+        self.assertEqual(report['gaps']['start'].iloc[0], pd.Timestamp("2024-01-10 12:00:09"))
+        self.assertEqual(report['gaps']['end'].iloc[0], pd.Timestamp("2024-01-10 12:00:18"))
+
+    def test_duplicates_and_off_grid_samples(self):
+        df = self.make_df(["2024-01-10 12:00:03", "2024-01-10 12:00:00", "2024-01-10 12:00:03",
+                           "2024-01-10 12:00:07"])
+
+        regular_df, report = regular_grid.regularize(df)
+
+        self.assertEqual(report['duplicates'], 1)
+        self.assertEqual(report['off_grid'], 1)
+        self.assertEqual(regular_df['value'].tolist(), [1.0, 0.0, 3.0], "The first sample of a slot is kept.")
+        self.assertEqual(regular_df['Date'].iloc[-1], pd.Timestamp("2024-01-10 12:00:06"))
+
+    def test_empty(self):
+        regular_df, report = regular_grid.regularize(self.make_df([]))
+
+        self.assertTrue(regular_df.empty)
+        self.assertEqual(report['slots'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+# This file makes the rejection_codes directory a Python package
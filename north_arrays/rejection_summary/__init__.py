@@ -0,0 +1 @@
+# This file makes the rejection_summary directory a Python package
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+import filter_pipeline.filter_pipeline as filter_pipeline
+import rejection_codes.rejection_codes as rejection_codes
+import solar_position.solar_position as solar_position
+
+# This file contains the rejection summary.
+# Rejections are counted from rejection codes (one bit per reason, see rejection_codes) instead of exploding the
+# per-row reason lists: rows are counted per group and distinct code with one bincount, and the counts of the
+# distinct codes are turned into counts per reason with one matrix product.
+
+SUMMARY_COLUMNS = ['stage', 'group', 'key', 'reason', 'rows', 'duration_s']
+ANY_REASON = "Any reason"
+
+
+def summarize_rejections(dates, codes, stage, sample_seconds, inverters=(), local_timezone=None):
+    """
+    Returns the number of rejected rows and their duration (rows * sample_seconds) by reason:
+    in total, by inverter (rows rejected for any reason of the inverter), by hour of day and by day.
+    Rows rejected for several reasons are counted once per reason, and once in the "Any reason" rows.
+    If local_timezone is given, the dates are UTC and the hours and days are those of local_timezone.
+    """
+    codes = np.asarray(codes, dtype=np.uint64)
+    rejected = codes != 0
+    dates = solar_position.to_local(pd.DatetimeIndex(pd.to_datetime(dates))[rejected], local_timezone)
+    codes = codes[rejected]
+
+    reasons = list(rejection_codes.REJECTION_REASONS)
+    unique_codes, code_index = np.unique(codes, return_inverse=True)
+    code_index = code_index.ravel()
+
+    # Reasons set in every distinct code (distinct codes x reasons), plus the "Any reason" column
+    reason_bits = (unique_codes[:, None] >> np.arange(len(reasons), dtype=np.uint64)) & np.uint64(1)
+    reason_matrix = np.hstack([reason_bits.astype(np.int64), np.ones((len(unique_codes), 1), dtype=np.int64)])
+    reasons.append(ANY_REASON)
+
+    # Distinct codes with any reason of each inverter
+    inverter_reasons = filter_pipeline.inverter_rejection_reasons(inverters)
+    inverter_matrix = np.zeros((len(unique_codes), len(inverters)), dtype=np.int64)
+    for i, inverter in enumerate(inverters):
+        mask = np.uint64(0)
+        for reason in inverter_reasons[inverter.name]:
+            if reason in rejection_codes.REJECTION_REASONS:
+                mask |= rejection_codes.get_rejection_bit(reason)
+        inverter_matrix[:, i] = (unique_codes & mask) != 0
+
+    day_keys, days = pd.factorize(dates.normalize(), sort=True)
+    groups = [
+        ("total", np.zeros(len(codes), dtype=np.int64), ["all"]),
+        ("hour", dates.hour.to_numpy(dtype=np.int64), [f"{hour:02d}:00" for hour in range(24)]),
+        ("day", day_keys, [day.strftime("%Y-%m-%d") for day in days]),
+    ]
+
+    summaries = []
+    for group, keys, labels in groups:
+        counts = np.bincount(keys * len(unique_codes) + code_index,
+                             minlength=len(labels) * len(unique_codes)).reshape(len(labels), len(unique_codes))
+        summaries.append(to_long_table(stage, group, labels, reasons, counts @ reason_matrix, sample_seconds))
+        if group == "total":
+            summaries.append(to_long_table(stage, "inverter", [inverter.name for inverter in inverters], [ANY_REASON],
+                                           (counts @ inverter_matrix).T, sample_seconds))
+
+    return pd.concat(summaries, ignore_index=True)
+
+
+def to_long_table(stage, group, labels, reasons, counts, sample_seconds):
+    """
+    Turns a (keys x reasons) count matrix into summary rows, leaving out zero counts.
+    """
+    key_index, reason_index = np.nonzero(counts)
+    rows = counts[key_index, reason_index]
+    return pd.DataFrame({
+        'stage': stage,
+        'group': group,
+        'key': np.asarray(labels, dtype=object)[key_index],
+        'reason': np.asarray(reasons, dtype=object)[reason_index],
+        'rows': rows,
+        'duration_s': rows * sample_seconds,
+    }, columns=SUMMARY_COLUMNS)
+
+
+def summarize_3s_rejections(df, inverters, sample_seconds=3, local_timezone=None):
+    """
+    Rejection summary of the filtered 3 second data.
+    """
+    return summarize_rejections(df['Date'], rejection_codes.get_rejection_codes(df), "3s", sample_seconds, inverters,
+                                local_timezone)
+
+
+def summarize_15_min_rejections(fifteen_min_df, local_timezone=None):
+    """
+    Rejection summary of the 15 minute windows.
+    """
+    if fifteen_min_df.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    return summarize_rejections(fifteen_min_df['15 Minute'], rejection_codes.get_rejection_codes(fifteen_min_df),
+                                "15min", 15 * 60, local_timezone=local_timezone)
+
+
+def print_summary(summary_df):
+    """
+    Prints the total rows and duration rejected for each reason.
+    """
+    print("\n🔹 Rejection summary:\n")
+    totals = summary_df[summary_df['group'] == "total"]
+    for row in totals.itertuples(index=False):
+        print(f"    ⚠ [{row.stage}] {row.reason}: {row.rows} rows ({pd.Timedelta(seconds=int(row.duration_s))})")
+    print("")
+
@@ -0,0 +1 @@
+# This file makes the solar_position directory a Python package
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# This file contains the solar geometry of the site.
+# Solar position uses the NOAA general solar position equations (fractional year, about 0.5 degree accuracy),
+# which is enough to tell night from day.
+
+# Waiotahe solar farm
+SITE_LATITUDE = -38.0  # degrees, north positive
+SITE_LONGITUDE = 177.2  # degrees, east positive
+SITE_TIMEZONE = "Pacific/Auckland"  # SCADA timestamps are local time
+
+
+def to_utc(dates, timezone=SITE_TIMEZONE):
+    """
+    Converts naive local timestamps to naive UTC timestamps.
+    Timestamps that are ambiguous or missing around daylight saving changes become NaT.
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    if timezone is None:
+        return dates
+    local = dates.tz_localize(timezone, ambiguous="NaT", nonexistent="NaT")
+    return local.tz_convert("UTC").tz_localize(None)
+
+
+def to_local(dates_utc, timezone=SITE_TIMEZONE):
+    """
+    Converts naive UTC timestamps to naive local timestamps (the inverse of to_utc), e.g. to group them by local
+    day. timezone None returns the timestamps unchanged.
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates_utc))
+    if timezone is None:
+        return dates
+    return dates.tz_localize("UTC").tz_convert(timezone).tz_localize(None)
+
+
+def standard_utc_offset(timezone=SITE_TIMEZONE):
+    """
+    Returns the offset of standard time (without daylight saving) from UTC in a timezone.
+    """
+    return min(pd.Timestamp(f"2024-{month:02d}-01").tz_localize(timezone).utcoffset() for month in (1, 7))
+
+
+def solar_elevation(times_utc, latitude=SITE_LATITUDE, longitude=SITE_LONGITUDE):
+    """
+    Returns the solar elevation angle (degrees above the horizon) for naive UTC timestamps.
+    NaT timestamps give NaN.
+    """
+    times_utc = pd.DatetimeIndex(times_utc)
+    day_of_year = times_utc.dayofyear.to_numpy(dtype=float, na_value=np.nan)
+    hours = (times_utc.hour + times_utc.minute / 60 + times_utc.second / 3600).to_numpy(dtype=float, na_value=np.nan)
+
+    # Fractional year (radians)
+    gamma = 2 * np.pi / 365 * (day_of_year - 1 + (hours - 12) / 24)
+
+    # Equation of time (minutes) and solar declination (radians)
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                                 - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    declination = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+                   - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+                   - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+
+    # Hour angle (radians)
+    true_solar_time = hours * 60 + equation_of_time + 4 * longitude
+    hour_angle = np.radians(true_solar_time / 4 - 180)
+
+    latitude_rad = np.radians(latitude)
+    cos_zenith = (np.sin(latitude_rad) * np.sin(declination)
+                  + np.cos(latitude_rad) * np.cos(declination) * np.cos(hour_angle))
+
+    return 90 - np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+
+
+def clear_sky_ghi(elevation):
+    """
+    Returns the clear-sky global horizontal irradiance (W/m2) for solar elevation angles (degrees),
+    using the Haurwitz model. 0 when the sun is below the horizon, NaN for NaN elevations.
+    """
+    cos_zenith = np.sin(np.radians(np.asarray(elevation, dtype=float)))
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        ghi = np.where(cos_zenith > 0, 1098 * cos_zenith * np.exp(-0.057 / cos_zenith), 0.0)
+    return np.where(np.isnan(cos_zenith), np.nan, ghi)
+
+
+def is_night(dates, timezone=SITE_TIMEZONE, latitude=SITE_LATITUDE, longitude=SITE_LONGITUDE, elevation_limit=0.0):
+    """
+    Returns True where the sun is below elevation_limit (degrees) at the site.
+    Timestamps that cannot be placed in UTC are not night.
+    """
+    elevation = solar_elevation(to_utc(dates, timezone), latitude, longitude)
+    with np.errstate(invalid="ignore"):
+        return elevation < elevation_limit
@@ -0,0 +1 @@
+# This file makes the solar_table directory a Python package
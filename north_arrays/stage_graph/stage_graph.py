@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import filter_pipeline.filter_pipeline as filter_pipeline
+import filter_planes.filter_planes as filter_planes
+import helper_functions_dir.helper_functions as helper_functions
+import night_prefilter.night_prefilter as night_prefilter
+import regular_grid.regular_grid as regular_grid
+import rejection_codes.rejection_codes as rejection_codes
+
+# This file contains the stage graph for incremental runs.
+# Every stage declares the stages it reads, its parameters and the files it writes. Its fingerprint is a hash of
+# its parameters and of the fingerprints of its inputs, and is stored on disk with its value once it has run.
+# A stage only runs again when its fingerprint changes: changing a 15 minute threshold re-runs the 15 minute
+# filters and their export, but reads the 1 minute data back from the cache.
+# A stage can depend on some columns of a DataFrame input only, through the content hashes of these columns,
+# so reloading the raw data does not re-run the 3 second filters whose columns did not change.
+# Each 3 second filter is its own stage, returning the rejection reasons and columns it adds; the filters do not
+# read each other's results, so they are combined afterwards in registry order, as the pipeline would run them.
+
+CACHE_DIR = os.path.join("cache", "stages")
+MANIFEST_FILENAME = "manifest.json"
+GRAPH_VERSION = 1  # Bump when the stage functions change, so cached values are not reused
+
+VALIDATION_COLUMNS = ('is_valid', 'rejection_reason', 'rejection_code')
+
+
+def fingerprint(*parts):
+    """
+    Returns a hash of JSON-able parts (other values are hashed by their string).
+    """
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def file_fingerprint(filename):
+    """
+    Returns the path, size and modification time of a file, which change when it is rewritten.
+    """
+    stat = os.stat(filename)
+    return [os.path.abspath(filename), stat.st_size, stat.st_mtime_ns]
+
+
+def column_fingerprints(df):
+    """
+    Returns a hash of the values and dtype of every column of a DataFrame.
+    """
+    fingerprints = {}
+    for col in df.columns:
+        values = df[col].astype(str) if df[col].dtype == object else df[col]
+        row_hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        fingerprints[col] = fingerprint(str(df[col].dtype), hashlib.sha1(row_hashes.tobytes()).hexdigest())
+    return fingerprints
+
+
+class Stage:
+    """
+    A stage of the graph.
+
+    - function(*input values, **params, **context) -> value
+    - inputs: names of the stages read, or (name, columns) to depend only on these columns of a DataFrame value
+    - params: JSON-able parameters, part of the fingerprint
+    - context: values passed to the function that do not change its result (e.g. backend, writer)
+    - key: values that change the result without being passed (e.g. the modification time of the input file)
+    - files: files written by the stage. Its value is not cached, it is up to date when its fingerprint has not
+      changed and the files exist
+    """
+
+    def __init__(self, name, function, inputs=(), params=None, context=None, key=None, files=()):
+        self.name = name
+        self.function = function
+        self.inputs = [(item, None) if isinstance(item, str) else (item[0], list(item[1])) for item in inputs]
+        self.params = params or {}
+        self.context = context or {}
+        self.key = key
+        self.files = list(files)
+
+    def __repr__(self):
+        return f"Stage({self.name})"
+
+
+class StageGraph:
+    """
+    Stages by name, with the values and fingerprints of the stages that ran before (kept in cache_dir).
+    Call save once the files written in the background are complete.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.stages = {}
+        self.values = {}
+        self.fingerprints = {}
+        self.status = {}
+        self.seconds = {}
+
+        self.manifest = {}
+        manifest_filename = os.path.join(cache_dir, MANIFEST_FILENAME)
+        if os.path.exists(manifest_filename):
+            with open(manifest_filename) as f:
+                self.manifest = json.load(f)
+
+    def add(self, stage):
+        if stage.name in self.stages:
+            raise ValueError(f"Stage already in the graph: {stage.name}")
+        for name, _ in stage.inputs:
+            if name not in self.stages:
+                raise ValueError(f"Stage {stage.name} reads {name}, which is not in the graph (add it first)")
+        self.stages[stage.name] = stage
+        return stage
+
+    def _value_filename(self, name):
+        return os.path.join(self.cache_dir, f"{name.replace(':', '_')}.pkl")
+
+    def fingerprint(self, name):
+        """
+        Returns the fingerprint of a stage, running the inputs it reads by column if they are out of date.
+        """
+        if name not in self.fingerprints:
+            stage = self.stages[name]
+            parts = [GRAPH_VERSION, stage.name, stage.params, stage.key]
+            for input_name, columns in stage.inputs:
+                if columns is None:
+                    parts.append(self.fingerprint(input_name))
+                else:
+                    parts.append(self._column_fingerprints(input_name, columns))
+            self.fingerprints[name] = fingerprint(*parts)
+        return self.fingerprints[name]
+
+    def _column_fingerprints(self, name, columns):
+        # Content hashes of columns of the value of a stage, kept with its fingerprint
+        if not self.is_up_to_date(name):
+            self.value(name)
+        known = self.manifest[name].setdefault('columns', {})
+        missing = [col for col in columns if col not in known]
+        if missing:
+            value = self.value(name)
+            known.update(column_fingerprints(value[[col for col in missing if col in value.columns]]))
+        return {col: known.get(col) for col in columns}
+
+    def is_up_to_date(self, name):
+        """
+        Whether a stage ran with the same fingerprint and its value or files are still there.
+        """
+        entry = self.manifest.get(name)
+        if entry is None or entry['fingerprint'] != self.fingerprint(name):
+            return False
+        stage = self.stages[name]
+        if stage.files:
+            return all(os.path.exists(filename) for filename in stage.files)
+        return os.path.exists(self._value_filename(name))
+
+    def value(self, name):
+        """
+        Returns the value of a stage, from memory, from the cache or by running it.
+        """
+        if name in self.values:
+            return self.values[name]
+
+        stage = self.stages[name]
+        if not stage.files and self.is_up_to_date(name):
+            self.values[name] = pd.read_pickle(self._value_filename(name))
+            self.status[name] = "cached"
+            return self.values[name]
+
+        inputs = [self.value(input_name) for input_name, _ in stage.inputs]
+        start = time.perf_counter()
+        value = stage.function(*inputs, **stage.params, **stage.context)
+        self.seconds[name] = time.perf_counter() - start
+        self.status[name] = "ran"
+
+        if not stage.files:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pd.to_pickle(value, self._value_filename(name))
+        self.manifest[name] = {'fingerprint': self.fingerprint(name)}
+        self.values[name] = value
+        return value
+
+    def run(self, names=None):
+        """
+        Brings stages up to date (all stages by default): stages writing files run if they are out of date,
+        the others are run or read from the cache only when needed.
+        """
+        for name in self.stages if names is None else names:
+            if not self.stages[name].files:
+                continue
+            if self.is_up_to_date(name):
+                self.status.setdefault(name, "up to date")
+            else:
+                self.value(name)
+
+    def save(self):
+        """
+        Writes the fingerprints of the stages that ran, so the next run can reuse their values.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump(self.manifest, f, indent=1)
+
+    def print_report(self):
+        print("🔹 Stages:\n")
+        for name in self.stages:
+            status = self.status.get(name, "not needed")
+            seconds = f" in {self.seconds[name]:.2f} s" if name in self.seconds else ""
+            print(f"    {'⚙️ ' if status == 'ran' else '✅'} {name:<42} {status}{seconds}")
+        print(f"\n    {sum(status == 'ran' for status in self.status.values())} of {len(self.stages)} stages ran.\n")
+
+
+# Stages of the site pipeline
+
+def load_stage(filename, lean=False, usecols=None, regularize=False, timezone=None, prune_night=None,
+               fifteen_min_config=None, data_timezone=None, backend="auto", parse_cache_dir=None):
+    df, _ = helper_functions.load_and_initialize_df(filename, lean=lean, usecols=usecols, regularize=regularize,
+                                                    timezone=timezone, parse_cache_dir=parse_cache_dir)
+    if prune_night:
+        df, _ = night_prefilter.prune_night_windows(df, fifteen_min_config, night_mask=prune_night, backend=backend,
+                                                    timezone=data_timezone)
+    return df
+
+
+def three_second_filter_stage(df, name, params, backend="auto", inverters=None):
+    """
+    Runs one 3 second filter on the loaded data and returns what it adds: the rows rejected for each of its
+    reasons and the columns it sets (e.g. the wind stow or constraint flags).
+    """
+    spec = filter_pipeline.FILTER_REGISTRY[name]
+    context = {'inverters': inverters, 'state': None, 'backend': backend, 'events': None}
+
+    # The filter records its reasons as rejection code bits, so they are read back without a loop over the rows
+    base_codes = rejection_codes.get_rejection_codes(df)
+    coded_df = df.drop(columns=['rejection_reason'], errors="ignore").assign(rejection_code=base_codes)
+
+    print(f"    ⚙️  Applying '{spec.description}' filter...\n")
+    result = spec.function(coded_df, **{key: context[key] for key in spec.context}, **params)
+
+    codes = result['rejection_code'].to_numpy(dtype=np.uint64) & ~base_codes
+    reasons = {}
+    for bit, reason in enumerate(list(rejection_codes.REJECTION_REASONS)):
+        rejected = (codes & (np.uint64(1) << np.uint64(bit))) != 0
+        if rejected.any():
+            reasons[reason] = rejected
+
+    columns = {col: result[col] for col in result.columns
+               if col not in VALIDATION_COLUMNS and (col not in df.columns or not result[col].equals(df[col]))}
+    return {'reasons': reasons, 'columns': columns}
+
+
+def combine_stage(df, *filter_results, derived=()):
+    """
+    Applies the results of the 3 second filter stages to the loaded data, in registry order, then runs the
+    filters derived from the validity of the others (see filter_planes.DERIVED_FILTERS).
+    Returns the same data as apply_three_second_filters.
+    """
+    print("\n🔹 Combining 3-second filters...\n")
+    df = df.copy()
+    for result in filter_results:
+        for col, values in result['columns'].items():
+            df[col] = values
+    for result in filter_results:
+        for reason, rejected in result['reasons'].items():
+            df = rejection_codes.add_rejection_reason(df, rejected, reason)
+
+    for name, params in derived:
+        df = filter_pipeline.FILTER_REGISTRY[name].function(df, **params)
+
+    print(f"    ✅  {len(df) - int((df['is_valid'] == 1).sum())} rows invalidated.\n")
+    return df
+
+
+def build_site_graph(input_csv, inverters, filter_config=None, lean=False, usecols=None, regularize=False,
+                     timezone=None, data_timezone=None, prune_night=None, short_circuit=False, backend="auto",
+                     validity_sidecar=False, three_sec_files=(), writer=None, cache_dir=CACHE_DIR,
+                     parse_cache_dir=None):
+    """
+    Returns the stage graph of a batch run: load, one stage per 3 second filter, combine ("3s"), 1 minute
+    aggregation ("1min"), 15 minute filters ("15min") and the exports of the three stages.
+    The values of "load", "3s", "1min" and "15min" are the DataFrames of the script.
+
+    - three_sec_files: files written by the 3 second export
+    - data_timezone: timezone of the timestamps after loading ("UTC" when timezone is given)
+    - parse_cache_dir: parse cache of the input file (see parse_cache)
+    """
+    graph = StageGraph(cache_dir)
+    three_sec_pipeline = filter_pipeline.build_pipeline("3s", filter_config)
+    fifteen_min_config = {name: config for name, config in (filter_config or {}).items()
+                          if filter_pipeline.FILTER_REGISTRY[name].stage == "15min"}
+
+    # Rejection code bits in the order a full run registers them
+    if regularize:
+        rejection_codes.get_rejection_bit(regular_grid.MISSING_SAMPLE_REASON)
+    three_sec_pipeline.register_rejection_reasons(inverters)
+
+    inverter_params = [vars(inverter) for inverter in inverters]
+    graph.add(Stage("load", load_stage, params={
+        'filename': input_csv, 'lean': lean, 'usecols': usecols, 'regularize': regularize, 'timezone': timezone,
+        'prune_night': prune_night, 'fifteen_min_config': fifteen_min_config if prune_night else None,
+        'data_timezone': data_timezone}, context={'backend': backend, 'parse_cache_dir': parse_cache_dir},
+        key={'input': file_fingerprint(input_csv), 'inverters': inverter_params}))
+
+    filter_stages, derived = [], []
+    for spec, params in three_sec_pipeline.steps:
+        if spec.name in filter_planes.DERIVED_FILTERS:
+            derived.append((spec.name, params))
+            continue
+        columns = ['Date'] + spec.required_columns(inverters)
+        columns += [value for key, value in params.items() if key.endswith("_tag") and value]
+        graph.add(Stage(f"3s:{spec.name}", three_second_filter_stage, inputs=[("load", columns)],
+                        params={'name': spec.name, 'params': params},
+                        context={'backend': backend, 'inverters': inverters},
+                        key={'lean': lean, 'inverters': inverter_params if "inverters" in spec.context else None}))
+        filter_stages.append(f"3s:{spec.name}")
+
+    graph.add(Stage("3s", combine_stage, inputs=["load"] + filter_stages, params={'derived': derived}))
+    graph.add(Stage("1min", lambda df: helper_functions.aggregate_to_one_minute(helper_functions.get_valid_3s_data(df)),
+                    inputs=["3s"]))
+    graph.add(Stage("15min", helper_functions.apply_15_min_filter, inputs=["1min"], params={
+        'filter_config': fifteen_min_config, 'short_circuit': short_circuit, 'timezone': data_timezone},
+        context={'backend': backend}))
+
+    def export_3s(df, validity_sidecar):
+        if validity_sidecar:
+            helper_functions.export_3s_validity(df, writer=writer)
+        else:
+            helper_functions.export_3s_data(df, writer=writer)
+
+    graph.add(Stage("3s export", export_3s, inputs=["3s"], params={'validity_sidecar': validity_sidecar},
+                    files=three_sec_files))
+    graph.add(Stage("1min export", lambda df: helper_functions.export_valid_one_minute_data(
+        df, "output_data/one_minute_data.csv", writer=writer), inputs=["1min"],
+        files=["output_data/one_minute_data.csv"]))
+    graph.add(Stage("15min export", lambda df: helper_functions.export_good_15_min_data(df, writer=writer),
+                    inputs=["15min"], files=["output_data/good_15_min_data.csv", "output_data/bad_15_min_data.csv"]))
+    return graph
@@ -1,40 +1,168 @@
+import numpy as np
 import pandas as pd
+import kernels.kernels as kernels
+from rejection_codes.rejection_codes import add_rejection_reason
 
 # This file contains the 3 second filters.
 
-def filter_ac_curtailment_periods(df):
-    return None
-def filter_bad_power_points(df):
-    return None
+# SCADA tags read by the 3 second filters
+POC_ACTIVE_POWER_TAG = r'VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)'
+POC_APPARENT_POWER_TAG = r'VALUE(\HTR-SWBD201-PQM001-S.UNIT3@NET2\)'
+WS211_WIND_SPEED_TAG = r'VALUE(\HTR-WSTAT211-WSWR.UNIT3@NET2\)'
+WS241_WIND_SPEED_TAG = r'VALUE(\HTR-WSTAT241-WSWR.UNIT3@NET2\)'
 
-def point_of_connection_constraint(df):
-    # Solar farm at point of connection (POC) has a real power limit and an apparent power limit. If reaching these limits, the solar farm will be constrained.
+def required_columns(inverters):
+    """
+    Returns the SCADA tags read by each 3 second filter.
+    The 'Date' column is always needed and is not listed.
+    """
+    return {
+        'point_of_connection_constraint': [POC_ACTIVE_POWER_TAG, POC_APPARENT_POWER_TAG],
+        'constrained_inverters': [tag for inverter in inverters for tag in [inverter.apparent_power_scada_tag, inverter.NRM_scada_tag]],
+        'wind_stow': [WS211_WIND_SPEED_TAG, WS241_WIND_SPEED_TAG],
+        'ac_curtailment': [POC_ACTIVE_POWER_TAG],
+        'bad_power_points': [POC_ACTIVE_POWER_TAG] + [inverter.active_power_scada_tag for inverter in inverters],
+    }
+
+def filter_ac_curtailment_periods(df, setpoint_tag=None, rating=30000, tolerance_pct=0.5, min_power_pct=10,
+                                  min_duration_seconds=300):
+    """
+    Identifies periods where the AC output at the point of connection (POC) is curtailed.
+
+    - With a setpoint (setpoint_tag, kW): output is curtailed while the setpoint is below the rating and the
+      output is within tolerance_pct (% of rating) of the setpoint or above it.
+    - Without a setpoint in the data: output is curtailed while it is held flat, i.e. it stays within
+      tolerance_pct (% of rating) over min_duration_seconds, above min_power_pct (% of rating).
+    - Only curtailed periods lasting at least min_duration_seconds are rejected.
+
+    The flat output rule cannot tell curtailment from the clear-sky plateau around solar noon, so the filter is
+    disabled by default in the filter pipeline and is meant to be enabled with a setpoint_tag.
+
+    Rolling ranges, run lengths and searches over the sorted timestamps keep the cost linear in the rows
+    (plus the log of the search). Periods are only found within the rows passed (not across chunks of a stream).
+    """
+    if len(df) == 0:
+        return df
+
+    # Work in time order (the rows normally are already)
+    timestamps = np.asarray(pd.to_datetime(df['Date']), dtype="datetime64[ns]").astype(np.int64)
+    order = np.argsort(timestamps, kind="stable")
+    timestamps = timestamps[order]
+    power = df[POC_ACTIVE_POWER_TAG].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    tolerance = tolerance_pct / 100 * rating
+    min_duration_ns = int(min_duration_seconds * 1e9)
+
+    if setpoint_tag is not None and setpoint_tag in df.columns:
+        setpoint = df[setpoint_tag].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        mask_curtailed = (setpoint < rating - tolerance) & (power >= setpoint - tolerance)
+        mask_curtailed = _runs_lasting(mask_curtailed, timestamps, min_duration_ns)
+    else:
+        if setpoint_tag is not None:
+            print(f"    ⚠ Setpoint tag {setpoint_tag} not in the data, detecting curtailment from flat output.\n")
+
+        # Range of the output over the min_duration_seconds ending at every row
+        series = pd.Series(power, index=pd.DatetimeIndex(timestamps))
+        window = series.rolling(pd.Timedelta(min_duration_ns, unit="ns"), min_periods=2)
+        flat_range = (window.max() - window.min()).to_numpy() <= tolerance
+        window_start = np.searchsorted(timestamps, timestamps - min_duration_ns, side="right")
+        full_window = timestamps - timestamps[window_start] >= min_duration_ns - _sample_spacing(timestamps)
+        flat_window_end = flat_range & full_window & (window.min().to_numpy() >= min_power_pct / 100 * rating)
+
+        # Rows covered by a flat window: a flat window ends within min_duration_seconds after the row
+        window_end = np.searchsorted(timestamps, timestamps + min_duration_ns, side="left")
+        ends_before = np.concatenate([[0], np.cumsum(flat_window_end)])
+        mask_curtailed = ends_before[window_end] - ends_before[np.arange(len(df))] > 0
+
+    df = add_rejection_reason(df, df.index[order[mask_curtailed]], "AC Curtailment")
+
+    return df
+
+def filter_bad_power_points(df, inverters, rating=30000, inverter_rating=4 * 1097.5, negative_pct=1,
+                            spike_pct=20, sample_seconds=3):
+    """
+    Identifies bad active power readings at the point of connection (POC) and of every inverter.
+
+    A reading is bad if it is:
+    - missing (NaN)
+    - negative beyond negative_pct (% of the rating), as the inverters draw a little power at night
+    - a spike: it jumps by more than spike_pct (% of the rating) from both neighbours in the same direction.
+      The neighbours are the readings sample_seconds before and after it, so a reading next to a gap (pruned
+      night rows, the end of a --follow chunk) is never a spike and the result does not depend on the rows passed.
+
+    The filter is disabled by default in the filter pipeline.
+    """
+    columns = [(POC_ACTIVE_POWER_TAG, rating, "Bad power point at POC")]
+    columns += [(inverter.active_power_scada_tag, inverter_rating, f"{inverter.name} has a bad power point")
+                for inverter in inverters]
+
+    # Rows whose next row is exactly one sample later
+    timestamps = np.asarray(pd.to_datetime(df['Date']), dtype="datetime64[ns]").astype(np.int64)
+    next_is_neighbour = np.diff(timestamps) == int(sample_seconds * 1e9)
+
+    for tag, tag_rating, reason in columns:
+        power = df[tag].to_numpy(dtype=np.float64, na_value=np.nan)
+        spike_threshold = spike_pct / 100 * tag_rating
+
+        step = np.diff(power)
+        mask_spike = np.zeros(len(power), dtype=bool)
+        mask_spike[1:-1] = (((step[:-1] > spike_threshold) & (step[1:] < -spike_threshold))
+                            | ((step[:-1] < -spike_threshold) & (step[1:] > spike_threshold)))
+        mask_spike[1:-1] &= next_is_neighbour[:-1] & next_is_neighbour[1:]
+
+        mask_bad = np.isnan(power) | (power < -negative_pct / 100 * tag_rating) | mask_spike
+        df = add_rejection_reason(df, mask_bad, reason)
 
-    real_power_limit = 30000 * 0.998  
-    apparent_power_limit = 35120 * 0.998  
+    return df
+
+def _runs_lasting(mask, timestamps, min_duration_ns):
+    """
+    Returns mask with only the runs of consecutive True rows lasting at least min_duration_ns
+    (from the first row of the run to one sample after its last row).
+    """
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    starts = np.flatnonzero(np.diff(padded) == 1)
+    ends = np.flatnonzero(np.diff(padded) == -1)
+
+    durations = timestamps[ends - 1] - timestamps[starts] + _sample_spacing(timestamps)
+    run_id = np.cumsum(np.diff(padded)[:-1] == 1) - 1
+    return mask & (durations[np.maximum(run_id, 0)] >= min_duration_ns) if len(starts) else mask
+
+def _sample_spacing(timestamps):
+    """
+    Returns the typical spacing of the samples (median difference), 0 for fewer than two samples.
+    """
+    return int(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 0
+
+def point_of_connection_constraint(df, events=None, real_power_limit=30000 * 0.998, apparent_power_limit=35120 * 0.998):
+    # Solar farm at point of connection (POC) has a real power limit and an apparent power limit. If reaching these limits, the solar farm will be constrained.
+    # If an EventStore is passed (see event_intervals), the constraint periods are recorded in it.
 
     mask_poc_limit = (
-        (df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)'] > real_power_limit) | 
-        (df['VALUE(\HTR-SWBD201-PQM001-S.UNIT3@NET2\)'] > apparent_power_limit)
+        (df[POC_ACTIVE_POWER_TAG] > real_power_limit) | 
+        (df[POC_APPARENT_POWER_TAG] > apparent_power_limit)
     )
 
-    df.loc[mask_poc_limit, 'is_valid'] = 0
-    df.loc[mask_poc_limit, 'rejection_reason'] = df.loc[mask_poc_limit, 'rejection_reason'].apply(lambda x: x + ["Point of Connection Limitation"])
+    df = add_rejection_reason(df, mask_poc_limit, "Point of Connection Limitation")
+    if events is not None:
+        events.add_mask(df['Date'], mask_poc_limit.to_numpy(), "Point of Connection Limitation")
 
     return df
 
-def filter_constrained_inverters(df, inverters):
+def filter_constrained_inverters(df, inverters, events=None, module_rating=1.0975, threshold_factor=0.998):
     """
     Filters data based on inverter constraints.
 
     An inverter is constrained if its apparent power output exceeds 99.8%
     of the maximum power rating, which depends on the number of running
     modules (NRM). Each power module is rated at 1.0975 MVA.
+
+    - module_rating: MVA per power module
+    - threshold_factor: 99.8% threshold
+    - events: if an EventStore is passed (see event_intervals), the constraint periods of every inverter are
+      recorded in it instead of the per-row constraint flags
     """
-    module_rating = 1.0975  # MVA per power module
-    threshold_factor = 0.998  # 99.8% threshold
 
-    for inverter in inverters:
+    for inverter_index, inverter in enumerate(inverters):
 
         # Extract SCADA column names
         apparent_power_col = inverter.apparent_power_scada_tag
@@ -53,89 +181,73 @@ def filter_constrained_inverters(df, inverters):
 
 
         # Update DataFrame for constrained inverters (apparent power)
-        df.loc[mask_constrained_apparent_power, 'is_valid'] = 0
-        df.loc[mask_constrained_apparent_power, 'rejection_reason'] = df.loc[mask_constrained_apparent_power, 'rejection_reason'].apply(
-            lambda x: x + [f"{inverter.name} is constrained (apparent power)"]
-        )
-        df.loc[mask_constrained_apparent_power, constraint_col] = 1  # Mark inverter as constrained
+        df = add_rejection_reason(df, mask_constrained_apparent_power, f"{inverter.name} is constrained (apparent power)")
+        df = mark_inverter_constrained(df, mask_constrained_apparent_power, inverter_index, constraint_col, events,
+                                       f"{inverter.name} is constrained (apparent power)")
 
         # Update DataFrame for constrained inverters (NRM)
-        df.loc[mask_constrained_nrm, 'is_valid'] = 0
-        df.loc[mask_constrained_nrm, 'rejection_reason'] = df.loc[mask_constrained_nrm, 'rejection_reason'].apply(
-            lambda x: x + [f"Not all power modules running in {inverter.name} "]
-        )
-        df.loc[mask_constrained_nrm, constraint_col] = 1  # Mark inverter as constrained
+        df = add_rejection_reason(df, mask_constrained_nrm, f"Not all power modules running in {inverter.name} ")
+        df = mark_inverter_constrained(df, mask_constrained_nrm, inverter_index, constraint_col, events,
+                                       f"Not all power modules running in {inverter.name} ")
 
     return df
 
-def filter_wind_stow(df):
+def mark_inverter_constrained(df, mask, inverter_index, constraint_col, events=None, reason=None):
+    """
+    Marks an inverter as constrained, either in its own is_constrained column,
+    as one bit of the constrained_inverters bitfield (lean layout) or as event intervals of reason (events).
+    """
+    if events is not None:
+        events.add_mask(df['Date'], np.asarray(mask, dtype=bool), reason)
+    elif 'constrained_inverters' in df.columns:
+        bit = df['constrained_inverters'].dtype.type(1 << inverter_index)
+        df.loc[mask, 'constrained_inverters'] = df.loc[mask, 'constrained_inverters'] | bit
+    else:
+        df.loc[mask, constraint_col] = 1
+
+    return df
+
+def filter_wind_stow(df, state=None, backend="auto", events=None, stow_start_threshold=11.11, stow_end_threshold=10.55,
+                     stow_release_seconds=300):
     """
     Identifies periods of wind stow based on wind speed sensor data.
 
-    - Wind stow is triggered if both sensors exceed 11.11 m/s for two consecutive 3s intervals.
-    - Wind stow remains active until both sensors drop below 10.55 m/s for 300s.
+    - Wind stow is triggered if both sensors exceed 11.11 m/s (40 km/h) for two consecutive 3s intervals.
+    - Wind stow remains active until both sensors drop below 10.55 m/s (38 km/h) for 300s.
+
+    If a state dict is passed, the hysteresis starts from the state it holds and the
+    final state is written back to it, so consecutive chunks of a stream can be filtered.
+    The scan runs in kernels.wind_stow_scan, backend selects the numba or Python kernel.
+    If an EventStore is passed (see event_intervals), the stow periods are recorded in it
+    instead of the is_wind_stowed column.
     """
     # Wind speed sensor SCADA tags
-    wind_sensor_1 = 'VALUE(\HTR-WSTAT211-WSWR.UNIT3@NET2\)'
-    wind_sensor_2 = 'VALUE(\HTR-WSTAT241-WSWR.UNIT3@NET2\)'
-
-    # Thresholds
-    stow_start_threshold = 11.11  # 40 km/h
-    stow_end_threshold = 10.55  # 38 km/h
-
-    # Create a new column to track wind stow
-    df['is_wind_stowed'] = 0
-
-    # Internal variables to track wind stow status
-    wind_stow_active = False  # Tracks if wind stow is currently active
-    consecutive_high_wind_count = 0  # Counts consecutive high-wind readings
-    stow_deactivation_start = None  # Time when wind speed drops below threshold
-
-    for i in range(len(df)):
-        wind_speed_1 = df.at[i, wind_sensor_1]
-        wind_speed_2 = df.at[i, wind_sensor_2]
-        timestamp = pd.to_datetime(df.at[i, 'Date'])  # Ensure timestamp is datetime
-
-        # Check if both sensors exceed the wind stow start threshold
-        if wind_speed_1 > stow_start_threshold and wind_speed_2 > stow_start_threshold:
-            consecutive_high_wind_count += 1
-        else:
-            consecutive_high_wind_count = 0  # Reset count if wind drops
-
-        # Trigger wind stow if conditions met for two consecutive 3s readings
-        if consecutive_high_wind_count >= 2 and not wind_stow_active:
-            wind_stow_active = True  # Activate wind stow
-            df.at[i, 'is_wind_stowed'] = 1
-            stow_deactivation_start = None  # Reset release timer
-            # print(f"Wind stow activated at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")  # Print full datetime
-
-        # Check if wind stow is active
-        if wind_stow_active:
-            df.at[i, 'is_wind_stowed'] = 1  # Continue marking stow period
-
-            # Check if both sensors have dropped below the release threshold
-            if wind_speed_1 < stow_end_threshold and wind_speed_2 < stow_end_threshold:
-                if stow_deactivation_start is None:
-                    stow_deactivation_start = timestamp  # Store timestamp as datetime
-                    # print(f"Wind stow deactivation started at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
-                elif (timestamp - stow_deactivation_start) >= pd.Timedelta(seconds=300):
-                    wind_stow_active = False  # End wind stow
-                    # print(f"Wind stow ended at {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")  # Debugging statement
-            else:
-                stow_deactivation_start = None  # Reset release timer if wind picks up again
+    wind_sensor_1 = WS211_WIND_SPEED_TAG
+    wind_sensor_2 = WS241_WIND_SPEED_TAG
+
+    # Track wind stow in a new column
+    df['is_wind_stowed'] = kernels.wind_stow_scan(
+        df[wind_sensor_1].to_numpy(dtype=np.float64, na_value=np.nan),
+        df[wind_sensor_2].to_numpy(dtype=np.float64, na_value=np.nan),
+        np.asarray(pd.to_datetime(df['Date']), dtype="datetime64[ns]").astype(np.int64),
+        stow_start_threshold,
+        stow_end_threshold,
+        stow_release_seconds,
+        state=state,
+        backend=backend,
+    )
 
     # Apply wind stow filter
-    df.loc[df['is_wind_stowed'] == 1, 'is_valid'] = 0
-    df.loc[df['is_wind_stowed'] == 1, 'rejection_reason'] = df.loc[
-        df['is_wind_stowed'] == 1, 'rejection_reason'].apply(
-        lambda x: x + ["Wind Stow Active"]
-    )
+    df = add_rejection_reason(df, df['is_wind_stowed'] == 1, "Wind Stow Active")
+    if events is not None:
+        events.add_mask(df['Date'], df['is_wind_stowed'].to_numpy() == 1, "Wind Stow Active")
+        df = df.drop(columns='is_wind_stowed')
 
     return df
 
 
-def check_enough_points_in_minute(df):
-    """ Must have at least 5 valid points in each minute"""
+def check_enough_points_in_minute(df, min_points=5):
+    """ Must have at least min_points (5) valid points in each minute"""
     temp_df = df.copy()
 
     temp_df['minute'] = temp_df['Date'].dt.floor('min')
@@ -143,9 +255,8 @@ def check_enough_points_in_minute(df):
     # For each minute group, count valid points and mark entire group as invalid if < 5 valid points
     for minute, group in temp_df.groupby('minute'):
         valid_count = (group['is_valid'] == 1).sum()
-        if valid_count < 5:
+        if valid_count < min_points:
             # Mark all points in this minute group as invalid
-            df.loc[group.index, 'is_valid'] = 0
-            df.loc[group.index, 'rejection_reason'] = df.loc[group.index, 'rejection_reason'].apply(lambda x: x + ["Not enough points in minute"])
+            df = add_rejection_reason(df, group.index, "Not enough points in minute")
 
     return df
\ No newline at end of file
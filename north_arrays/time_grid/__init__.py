@@ -0,0 +1 @@
+# This file makes the time_grid directory a Python package
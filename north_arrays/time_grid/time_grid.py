@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+# This file contains the time grid indexer.
+# Timestamps are mapped to integer slots (e.g. minute or 15-minute index) counted from a fixed epoch,
+# so windows can be aggregated with bincount on dense arrays instead of hashing and sorting timestamps.
+
+EPOCH = pd.Timestamp("2000-01-01 00:00:00")
+
+
+def to_nanoseconds(dates):
+    """
+    Returns timestamps as int64 nanoseconds since 1970 (whatever the datetime resolution of the input).
+    """
+    return np.asarray(pd.to_datetime(dates), dtype="datetime64[ns]").astype(np.int64)
+
+
+class TimeGrid:
+    """
+    A regular grid of time slots of length period, covering the slots from first_slot to last_slot.
+
+    - slot: number of whole periods between EPOCH and the start of the slot
+    - position: index of the slot in the grid (0 for first_slot), used to index the dense arrays
+    Slots without data are kept in the grid, so missing windows are explicit (count 0).
+    """
+
+    def __init__(self, first_slot, last_slot, period):
+        self.period = pd.Timedelta(period)
+        self.period_ns = self.period.value
+        self.first_slot = int(first_slot)
+        self.size = int(last_slot) - int(first_slot) + 1
+
+    @classmethod
+    def covering(cls, dates, period):
+        """
+        Creates the smallest grid covering all timestamps.
+        """
+        slots = to_slots(dates, period)
+        return cls(slots.min(), slots.max(), period)
+
+    def positions(self, dates):
+        """
+        Maps each timestamp to the position of its slot in the grid.
+        """
+        return to_slots(dates, self.period) - self.first_slot
+
+    def slot_times(self):
+        """
+        Returns the start time of every slot in the grid.
+        """
+        start_ns = EPOCH.value + self.first_slot * self.period_ns
+        return pd.to_datetime(start_ns + np.arange(self.size, dtype=np.int64) * self.period_ns)
+
+    def counts(self, positions):
+        """
+        Returns the number of rows in every slot (0 for missing slots).
+        """
+        return np.bincount(positions, minlength=self.size)
+
+    def sums(self, positions, values):
+        """
+        Returns the sum and the number of non-NaN values of every slot, ignoring NaN values.
+        - values can be one column or a 2-D array with one column per variable
+        - sorted positions (the normal case for SCADA data) are summed with reduceat, others with bincount
+        """
+        values = np.asarray(values, dtype=np.float64)
+        shape = (self.size,) if values.ndim == 1 else (self.size, values.shape[1])
+        columns = values.reshape(len(values), -1).T
+        positions = np.asarray(positions)
+
+        sums = np.zeros((len(columns), self.size))
+        counts = np.zeros((len(columns), self.size))
+
+        is_sorted = len(positions) == 0 or bool(np.all(positions[1:] >= positions[:-1]))
+        if is_sorted:
+            present, starts, ends = window_boundaries(positions)
+            row_counts = ends - starts
+
+        for i, column in enumerate(columns):
+            not_nan = ~np.isnan(column)
+            has_nan = not not_nan.all()
+            if has_nan:
+                column = np.where(not_nan, column, 0.0)
+
+            if is_sorted and len(positions):
+                sums[i, present] = np.add.reduceat(column, starts)
+                counts[i, present] = np.add.reduceat(not_nan, starts, dtype=np.int64) if has_nan else row_counts
+            elif not is_sorted:
+                sums[i] = np.bincount(positions, weights=column, minlength=self.size)
+                counts[i] = np.bincount(positions, weights=not_nan, minlength=self.size)
+
+        return sums.T.reshape(shape), counts.T.reshape(shape)
+
+    def means(self, positions, values):
+        """
+        Returns the mean of every slot, ignoring NaN values (NaN for slots without values).
+        """
+        sums, counts = self.sums(positions, values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+
+    def maxima(self, positions, values):
+        """
+        Returns the maximum of every slot, ignoring NaN values (NaN for slots without values).
+        """
+        return self._reduce(np.fmax, positions, values)
+
+    def minima(self, positions, values):
+        """
+        Returns the minimum of every slot, ignoring NaN values (NaN for slots without values).
+        """
+        return self._reduce(np.fmin, positions, values)
+
+    def _reduce(self, ufunc, positions, values):
+        values = np.asarray(values, dtype=np.float64)
+        positions = np.asarray(positions)
+        result = np.full(self.size, np.nan)
+
+        if len(positions) and np.all(positions[1:] >= positions[:-1]):
+            present, starts, _ = window_boundaries(positions)
+            result[present] = ufunc.reduceat(values, starts)
+        else:
+            ufunc.at(result, positions, values)
+
+        return result
+
+
+def to_slots(dates, period):
+    """
+    Maps timestamps to the number of whole periods since EPOCH.
+    """
+    period_ns = pd.Timedelta(period).value
+    return (to_nanoseconds(dates) - EPOCH.value) // period_ns
+
+
+def window_boundaries(positions):
+    """
+    Splits rows sorted by slot position into windows.
+    Returns the positions present and the start and end row of each window.
+    """
+    positions = np.asarray(positions)
+    if len(positions) == 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(positions)) + 1])
+    ends = np.concatenate([starts[1:], [len(positions)]])
+
+    return positions[starts], starts, ends
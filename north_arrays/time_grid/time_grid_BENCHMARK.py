@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+import helper_functions_dir.helper_functions as helper_functions
+
+# Compares the groupby and time grid versions of the 1-minute aggregation on synthetic 3-second data.
+# Run from the array directory: python -m time_grid.time_grid_BENCHMARK
+
+
+def make_3s_data(days=30, columns=30):
+    rows = days * 24 * 60 * 20
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"Date": pd.date_range("2024-01-01", periods=rows, freq="3s")})
+    for i in range(columns):
+        df[f"column_{i}"] = rng.random(rows)
+    df["is_valid"] = 1
+
+    # Drop some rows, so some minutes are short or missing
+    return df[rng.random(rows) > 0.3].reset_index(drop=True)
+
+
+def time_method(df, method):
+    start = time.perf_counter()
+    result = helper_functions.aggregate_to_one_minute(df, method=method)
+    return result, time.perf_counter() - start
+
+
+def main():
+    df = make_3s_data()
+    print(f"🔹 Benchmarking 1-minute aggregation on {len(df)} rows...")
+    print("-" * 60)
+
+    groupby_df, groupby_time = time_method(df, "groupby")
+    grid_df, grid_time = time_method(df, "grid")
+
+    pd.testing.assert_frame_equal(groupby_df, grid_df, check_dtype=False, check_exact=False, rtol=1e-12)
+
+    print("-" * 60)
+    print(f"✅ groupby: {groupby_time:.3f} s")
+    print(f"✅ grid:    {grid_time:.3f} s ({groupby_time / grid_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
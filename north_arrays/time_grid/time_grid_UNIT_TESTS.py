@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import time_grid
+
+
+class TestTimeGrid(unittest.TestCase):
+
+    def test_positions_and_slot_times(self):
+        dates = pd.Series(pd.to_datetime(["2024-01-10 12:00:03", "2024-01-10 12:00:57", "2024-01-10 12:03:00"]))
+        grid = time_grid.TimeGrid.covering(dates, "1min")
+
+        self.assertEqual(grid.size, 4)
+        np.testing.assert_array_equal(grid.positions(dates), [0, 0, 3])
+        self.assertEqual(grid.slot_times()[3], pd.Timestamp("2024-01-10 12:03:00"))
+
+    def test_missing_slots_have_zero_count(self):
+        dates = pd.Series(pd.to_datetime(["2024-01-10 12:00:00", "2024-01-10 12:45:00"]))
+        grid = time_grid.TimeGrid.covering(dates, "15min")
+
+        np.testing.assert_array_equal(grid.counts(grid.positions(dates)), [1, 0, 0, 1])
+
+    def test_means_ignore_nan(self):
+        grid = time_grid.TimeGrid(0, 2, "1min")
+        positions = np.array([0, 0, 1, 1])
+        means = grid.means(positions, [1.0, 3.0, np.nan, 4.0])
+
+        np.testing.assert_array_equal(means[:2], [2.0, 4.0])
+        self.assertTrue(np.isnan(means[2]))
+
+    def test_maxima(self):
+        grid = time_grid.TimeGrid(0, 2, "1min")
+        sorted_maxima = grid.maxima(np.array([0, 0, 1, 1]), [1.0, 3.0, np.nan, 4.0])
+        unsorted_maxima = grid.maxima(np.array([1, 0, 1, 0]), [np.nan, 3.0, 4.0, 1.0])
+
+        np.testing.assert_array_equal(sorted_maxima[:2], [3.0, 4.0])
+        np.testing.assert_array_equal(unsorted_maxima[:2], [3.0, 4.0])
+        self.assertTrue(np.isnan(sorted_maxima[2]))
+
+    def test_window_boundaries(self):
+        slots, starts, ends = time_grid.window_boundaries(np.array([0, 0, 2, 2, 2, 5]))
+
+        np.testing.assert_array_equal(slots, [0, 2, 5])
+        np.testing.assert_array_equal(starts, [0, 2, 5])
+        np.testing.assert_array_equal(ends, [2, 5, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()
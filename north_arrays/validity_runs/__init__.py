@@ -0,0 +1 @@
+# This file makes the validity_runs directory a Python package
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+import event_intervals.event_intervals as event_intervals
+import rejection_codes.rejection_codes as rejection_codes
+import time_grid.time_grid as time_grid
+
+# This file contains the run-length encoded validity sidecar of the 3-second stage.
+# Instead of one row per sample with its is_valid flag and rejection list, the sidecar stores runs of time:
+# the runs of samples ("Samples") and, for every rejection reason, the runs of rejected samples.
+# Rows are split into runs of equal rejection code in one pass, so the sidecar has one row per change of state.
+# The reader rebuilds the samples, is_valid and rejection codes of any time range from the runs it overlaps.
+
+SAMPLE_PERIOD = "3s"
+SAMPLES = "Samples"
+SIDECAR_COLUMNS = ['start', 'end', 'reason']
+
+
+def encode_validity(df, sample_period=SAMPLE_PERIOD):
+    """
+    Returns an EventStore with the runs of samples (SAMPLES) and the runs rejected for each reason.
+
+    - Rows must be sorted by Date
+    - A run ends one sample_period after its last row, and runs are split at gaps in the data
+    """
+    store = event_intervals.EventStore(sample_period)
+    if len(df) == 0:
+        return store
+
+    dates_ns = time_grid.to_nanoseconds(df['Date'])
+    codes = rejection_codes.get_rejection_codes(df)
+    period_ns = store.sample_period.value
+
+    # Runs of equal rejection code without gaps
+    new_run = np.ones(len(df), dtype=bool)
+    new_run[1:] = (codes[1:] != codes[:-1]) | (np.diff(dates_ns) > period_ns)
+    first = np.flatnonzero(new_run)
+    last = np.append(first[1:] - 1, len(df) - 1)
+
+    run_starts = dates_ns[first]
+    run_ends = dates_ns[last] + period_ns
+    run_codes = codes[first]
+
+    store.add_intervals(run_starts, run_ends, SAMPLES)
+    for bit, reason in enumerate(list(rejection_codes.REJECTION_REASONS)):
+        rejected = (run_codes & (np.uint64(1) << np.uint64(bit))) != 0
+        if rejected.any():
+            store.add_intervals(run_starts[rejected], run_ends[rejected], reason)
+
+    return store
+
+
+def to_sidecar_table(store):
+    """
+    Returns the runs of an EventStore as the sidecar table (start, end, reason), samples first.
+    """
+    table = store.to_table()[SIDECAR_COLUMNS]
+    order = np.argsort(table['reason'].to_numpy() != SAMPLES, kind="stable")
+    return table.iloc[order].reset_index(drop=True)
+
+
+def read_sidecar(filename, sample_period=SAMPLE_PERIOD):
+    """
+    Reads a validity sidecar written by export_3s_validity (see helper_functions).
+    """
+    return ValiditySidecar(pd.read_csv(filename, parse_dates=['start', 'end']), sample_period)
+
+
+class ValiditySidecar:
+    """
+    Reader of a validity sidecar table. Samples, masks and rejection codes are only built for the time range asked for.
+    """
+
+    def __init__(self, table, sample_period=SAMPLE_PERIOD):
+        self.store = event_intervals.EventStore.from_table(table, sample_period)
+        self.sample_period = self.store.sample_period
+
+    @property
+    def reasons(self):
+        return [reason for reason in self.store.reasons if reason != SAMPLES]
+
+    def sample_times(self, start=None, end=None):
+        """
+        Returns the timestamps of the samples in [start, end) (all samples if not given).
+        """
+        starts, ends = self.store.intervals.get(SAMPLES, (np.zeros(0, dtype=np.int64),) * 2)
+        if len(starts) == 0:
+            return pd.DatetimeIndex([])
+
+        start_ns = starts[0] if start is None else pd.Timestamp(start).value
+        end_ns = ends[-1] if end is None else pd.Timestamp(end).value
+        period_ns = self.sample_period.value
+
+        # Runs overlapping the range, clipped to it and aligned on their own samples
+        first = np.searchsorted(ends, start_ns, side="right")
+        last = np.searchsorted(starts, end_ns, side="left")
+        run_starts, run_ends = starts[first:last], ends[first:last]
+        clipped_starts = run_starts + -(-np.maximum(start_ns - run_starts, 0) // period_ns) * period_ns
+        clipped_ends = np.minimum(run_ends, end_ns)
+        counts = np.maximum(-(-(clipped_ends - clipped_starts) // period_ns), 0)
+
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return pd.to_datetime(np.repeat(clipped_starts, counts) + offsets * period_ns)
+
+    def mask(self, dates, reason=None):
+        """
+        Returns for every timestamp whether it was rejected for reason (any reason if None).
+        """
+        if reason is not None:
+            return self.store.to_mask(dates, reason)
+
+        mask = np.zeros(len(dates), dtype=bool)
+        for name in self.reasons:
+            mask |= self.store.to_mask(dates, name)
+        return mask
+
+    def validity(self, start=None, end=None):
+        """
+        Returns the samples of [start, end) with their is_valid flag and rejection code (see rejection_codes).
+        """
+        dates = self.sample_times(start, end)
+        codes = np.zeros(len(dates), dtype=np.uint64)
+        for reason in self.reasons:
+            codes[self.store.to_mask(dates, reason)] |= rejection_codes.get_rejection_bit(reason)
+
+        return pd.DataFrame({'Date': dates, 'is_valid': (codes == 0).astype(np.uint8), 'rejection_code': codes})
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import validity_runs
+from rejection_codes.rejection_codes import add_rejection_reason, encode_rejection_reasons
+
+
+class TestValidityRuns(unittest.TestCase):
+
+    def make_df(self):
+        # 40 samples with a gap of 3 samples, wind stow over a run and two rejection reasons overlapping
+        dates = pd.date_range("2024-01-10 12:00:00", periods=43, freq="3s").delete([20, 21, 22])
+        df = pd.DataFrame({'Date': dates, 'is_valid': 1})
+        df['rejection_reason'] = [[] for _ in range(len(df))]
+        df = add_rejection_reason(df, df.index[5:15], "Wind Stow Active")
+        df = add_rejection_reason(df, df.index[10:25], "Point of Connection Limitation")
+        df = add_rejection_reason(df, df.index[[30]], "Point of Connection Limitation")
+        return df
+
+    def test_round_trip(self):
+        df = self.make_df()
+
+        table = validity_runs.to_sidecar_table(validity_runs.encode_validity(df))
+        validity = validity_runs.ValiditySidecar(table).validity()
+
+        self.assertLess(len(table), 10)
+        self.assertEqual(validity['Date'].tolist(), df['Date'].tolist())
+        self.assertEqual(validity['is_valid'].tolist(), df['is_valid'].tolist())
+        np.testing.assert_array_equal(validity['rejection_code'], encode_rejection_reasons(df['rejection_reason']))
+
+    def test_samples_are_split_at_gaps(self):
+        table = validity_runs.to_sidecar_table(validity_runs.encode_validity(self.make_df()))
+        samples = table[table['reason'] == validity_runs.SAMPLES]
+
+        self.assertEqual(samples['start'].tolist(), [pd.Timestamp("2024-01-10 12:00:00"),
+                                                     pd.Timestamp("2024-01-10 12:01:09")])
+        self.assertEqual(samples['end'].tolist(), [pd.Timestamp("2024-01-10 12:01:00"),
+                                                   pd.Timestamp("2024-01-10 12:02:09")])
+
+    def test_lean_layout(self):
+        df = self.make_df()
+        df['rejection_code'] = encode_rejection_reasons(df.pop('rejection_reason'))
+
+        table = validity_runs.to_sidecar_table(validity_runs.encode_validity(df))
+        validity = validity_runs.ValiditySidecar(table).validity()
+
+        np.testing.assert_array_equal(validity['rejection_code'], df['rejection_code'])
+
+    def test_time_range(self):
+        df = self.make_df()
+        sidecar = validity_runs.ValiditySidecar(validity_runs.to_sidecar_table(validity_runs.encode_validity(df)))
+
+        validity = sidecar.validity("2024-01-10 12:00:50", "2024-01-10 12:01:20")
+
+        expected = df[(df['Date'] >= "2024-01-10 12:00:50") & (df['Date'] < "2024-01-10 12:01:20")]
+        self.assertEqual(validity['Date'].tolist(), expected['Date'].tolist())
+        self.assertEqual(validity['is_valid'].tolist(), expected['is_valid'].tolist())
+        np.testing.assert_array_equal(sidecar.mask(validity['Date'], "Wind Stow Active"), np.zeros(len(validity)))
+
+    def test_read_written_sidecar(self):
+        df = self.make_df()
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "3_sec_validity.csv")
+            validity_runs.to_sidecar_table(validity_runs.encode_validity(df)).to_csv(filename, index=False)
+
+            sidecar = validity_runs.read_sidecar(filename)
+
+        np.testing.assert_array_equal(sidecar.mask(df['Date']), df['is_valid'] == 0)
+        self.assertEqual(sorted(sidecar.reasons), ["Point of Connection Limitation", "Wind Stow Active"])
+
+    def test_empty(self):
+        df = pd.DataFrame({'Date': pd.to_datetime([]), 'is_valid': [], 'rejection_reason': []})
+
+        sidecar = validity_runs.ValiditySidecar(validity_runs.to_sidecar_table(validity_runs.encode_validity(df)))
+
+        self.assertTrue(sidecar.validity().empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
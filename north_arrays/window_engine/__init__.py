@@ -0,0 +1 @@
+# This file makes the window_engine directory a Python package
@@ -0,0 +1,102 @@
+import contextlib
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import window_engine
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import helper_functions_dir.helper_functions as helper_functions
+
+PERIODS = ["5min", "10min", "15min", "60min"]
+
+
+def make_one_minute_df(hours=4, seed=1):
+    """
+    1 minute data of a few hours with varied irradiance, power and temperature, a few missing minutes and NaN
+    values, and stuck sensors.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = pd.date_range("2024-01-10 10:00:00", periods=60 * hours, freq="1min")
+    level = np.repeat(rng.uniform(0.2, 1.2, 4 * hours), 15)
+    noise = 1 + rng.normal(0, 0.02, len(minutes)) * np.repeat(rng.uniform(0, 3, 4 * hours), 15)
+
+    df = pd.DataFrame({'Minute': minutes})
+    for tag in fifteen_min_filters.REQUIRED_COLUMNS['irradiance']:
+        df[tag] = 500 * level * noise
+    df[fifteen_min_filters.WS211_TEMPERATURE_TAG] = 20 + np.cumsum(rng.normal(0, 0.8, len(minutes)))
+    df[fifteen_min_filters.WS241_TEMPERATURE_TAG] = 20 + rng.normal(0, 0.5, len(minutes))
+    df[fifteen_min_filters.WS211_WIND_SPEED_TAG] = 5 + rng.normal(0, 2, len(minutes))
+    df[fifteen_min_filters.WS241_WIND_SPEED_TAG] = 5 + rng.normal(0, 1, len(minutes))
+    df[fifteen_min_filters.POC_ACTIVE_POWER_TAG] = 20000 * level * noise
+
+    # Stuck sensors, NaN values and missing minutes
+    df.loc[15:29, fifteen_min_filters.WS241_TEMPERATURE_TAG] = 21.0
+    df.loc[40:52, fifteen_min_filters.WS211_WIND_SPEED_TAG] = 4.0
+    df.loc[70:80, fifteen_min_filters.POC_ACTIVE_POWER_TAG] = 15000.0
+    df.loc[100:104, fifteen_min_filters.REQUIRED_COLUMNS['irradiance'][0]] = np.nan
+    df.loc[130:144, fifteen_min_filters.POC_ACTIVE_POWER_TAG] = 0.0
+    return df.drop(index=[33, 34, 95, 200]).reset_index(drop=True)
+
+
+class TestWindowEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.df = make_one_minute_df()
+
+    def run_filters(self, period, filter_config=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return helper_functions.apply_15_min_filter(self.df.copy(), "python", filter_config, period=period)
+
+    def test_matches_window_filter(self):
+        for filter_config in [None, {"power_dead_value": {"enabled": True},
+                                     "irradiance_range": {"params": {"TRC": 600}}}]:
+            window_dfs = window_engine.evaluate_periods(self.df, PERIODS, "python", filter_config)
+            for period in PERIODS:
+                with self.subTest(period=period, filter_config=filter_config):
+                    expected = self.run_filters(period, filter_config)
+                    df = window_dfs[period]
+
+                    self.assertEqual(list(df.columns), list(expected.columns))
+                    self.assertEqual(df.iloc[:, 0].tolist(), expected.iloc[:, 0].tolist())
+                    self.assertEqual(df['rejection_reason'].tolist(), expected['rejection_reason'].tolist())
+                    np.testing.assert_allclose(df.iloc[:, 1:-1].to_numpy(dtype=float),
+                                               expected.iloc[:, 1:-1].to_numpy(dtype=float), equal_nan=True)
+                    self.assertGreater(df['rejection_reason'].apply(len).nunique(), 1)
+
+    def test_window_statistics(self):
+        stats = window_engine.MinuteStatistics(self.df).window_statistics("10min")
+        windows = self.df.groupby(self.df['Minute'].dt.floor("10min"))
+        power = windows[fifteen_min_filters.POC_ACTIVE_POWER_TAG]
+        ghi = windows[fifteen_min_filters.REQUIRED_COLUMNS['irradiance'][0]]
+
+        self.assertEqual(stats['10 Minute'].tolist(), list(windows.groups))
+        self.assertEqual(stats['rows'].tolist(), windows.size().tolist())
+        np.testing.assert_allclose(stats['power_std'], power.std(), rtol=1e-9)
+        np.testing.assert_allclose(stats['ghi_mean'], ghi.mean(), rtol=1e-12)
+        np.testing.assert_allclose(stats['wind_211_largest_change'],
+                                   windows[fifteen_min_filters.WS211_WIND_SPEED_TAG].apply(
+                                       lambda x: x.diff().abs().max()), rtol=1e-12)
+
+        # Constant windows are exact
+        self.assertEqual(stats['power_std'][13], 0.0)
+        self.assertEqual(stats['power_mean'][13], 0.0)
+
+    def test_periods(self):
+        self.assertEqual(helper_functions.window_column("1h"), "60 Minute")
+        self.assertEqual(helper_functions.not_enough_data_reason("15min"),
+                         "Not enough 1 minute data in 15 minute period")
+        for period in ["7min", "90s", "0min"]:
+            with self.assertRaises(ValueError):
+                window_engine.apply_window_filters(self.df, period)
+
+    def test_empty(self):
+        df = window_engine.apply_window_filters(self.df.iloc[:0], "5min")
+
+        self.assertTrue(df.empty)
+        self.assertEqual(df.columns[0], "5 Minute")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+# This file makes the event_intervals directory a Python package
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+import time_grid.time_grid as time_grid
+
+# This file contains the event interval store.
+# Wind stow and constraint events last minutes to hours, so they are kept as sorted (start, end, reason)
+# intervals instead of per-row 0/1 flag columns. Intervals are built from row masks with one pass over the
+# mask, turned back into masks with a binary search, and the time each window overlaps an event is read
+# from running totals of the event durations.
+
+SAMPLE_PERIOD = "3s"
+EVENT_COLUMNS = ['start', 'end', 'duration_s', 'reason']
+
+
+def mask_to_intervals(dates, mask, sample_period=SAMPLE_PERIOD):
+    """
+    Returns the (starts, ends) in int64 nanoseconds of the runs of True rows of mask.
+
+    - dates must be sorted
+    - An interval ends one sample_period after its last row (end excluded)
+    - A run is split where consecutive rows are more than sample_period apart, so gaps in the data
+      are not covered
+    """
+    dates_ns = time_grid.to_nanoseconds(dates)
+    mask = np.asarray(mask, dtype=bool)
+    period_ns = pd.Timedelta(sample_period).value
+
+    # A run starts where the mask turns on, or after a gap in the data
+    starts = mask.copy()
+    starts[1:] &= ~mask[:-1] | (np.diff(dates_ns) > period_ns)
+
+    # A run ends where the next row is off or starts a new run
+    ends = mask.copy()
+    ends[:-1] &= ~mask[1:] | starts[1:]
+
+    return dates_ns[starts], dates_ns[ends] + period_ns
+
+
+def merge_intervals(starts, ends):
+    """
+    Returns the union of intervals as sorted, non-overlapping (starts, ends). Touching intervals are joined.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(starts) == 0:
+        return starts, ends
+
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+
+    # A new interval begins where the start is after every earlier end
+    new = np.ones(len(starts), dtype=bool)
+    new[1:] = starts[1:] > np.maximum.accumulate(ends)[:-1]
+    first = np.flatnonzero(new)
+
+    return starts[first], np.maximum.reduceat(ends, first)
+
+
+def intervals_to_mask(starts, ends, dates):
+    """
+    Returns for every timestamp whether it is inside one of the sorted, non-overlapping intervals.
+    """
+    dates_ns = time_grid.to_nanoseconds(dates)
+    if len(starts) == 0:
+        return np.zeros(len(dates_ns), dtype=bool)
+
+    index = np.searchsorted(starts, dates_ns, side="right") - 1
+    return (index >= 0) & (dates_ns < ends[np.maximum(index, 0)])
+
+
+def covered_time(starts, ends, times_ns):
+    """
+    Returns the time (ns) covered by the sorted, non-overlapping intervals before each of times_ns.
+    """
+    if len(starts) == 0:
+        return np.zeros(len(times_ns), dtype=np.int64)
+
+    durations = ends - starts
+    covered_before = np.concatenate([[0], np.cumsum(durations)])
+
+    # Last interval starting before each time: the ones before it are covered fully, it is covered up to the time
+    index = np.maximum(np.searchsorted(starts, times_ns, side="right") - 1, 0)
+    partial = np.clip(times_ns - starts[index], 0, durations[index])
+    return covered_before[index] + partial
+
+
+class EventStore:
+    """
+    Sorted event intervals by reason (e.g. "Wind Stow Active", "inverter_1 is constrained (apparent power)").
+
+    Intervals added for a reason are merged with the ones already stored, so the events of consecutive
+    chunks of a stream join up when the chunks touch.
+    """
+
+    def __init__(self, sample_period=SAMPLE_PERIOD):
+        self.sample_period = pd.Timedelta(sample_period)
+        self.intervals = {}  # reason -> (starts, ends), int64 nanoseconds
+
+    @property
+    def reasons(self):
+        return list(self.intervals)
+
+    def add_intervals(self, starts, ends, reason):
+        """
+        Adds intervals (int64 nanoseconds or timestamps, end excluded) for a reason.
+        """
+        starts = time_grid.to_nanoseconds(starts) if len(starts) else np.zeros(0, dtype=np.int64)
+        ends = time_grid.to_nanoseconds(ends) if len(ends) else np.zeros(0, dtype=np.int64)
+        previous_starts, previous_ends = self.intervals.get(reason, (np.zeros(0, dtype=np.int64),) * 2)
+        self.intervals[reason] = merge_intervals(np.concatenate([previous_starts, starts]),
+                                                 np.concatenate([previous_ends, ends]))
+
+    def add_mask(self, dates, mask, reason):
+        """
+        Adds the runs of True rows of mask as intervals for a reason (see mask_to_intervals).
+        Nothing is stored for a reason without events.
+        """
+        if not np.any(mask):
+            return
+        starts, ends = mask_to_intervals(dates, mask, self.sample_period)
+        self.add_intervals(starts, ends, reason)
+
+    def _merged(self, reason=None):
+        """
+        Returns the intervals of a reason, or the union of the intervals of all reasons.
+        """
+        if reason is not None:
+            return self.intervals.get(reason, (np.zeros(0, dtype=np.int64),) * 2)
+        if not self.intervals:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return merge_intervals(np.concatenate([starts for starts, _ in self.intervals.values()]),
+                               np.concatenate([ends for _, ends in self.intervals.values()]))
+
+    def to_mask(self, dates, reason=None):
+        """
+        Returns for every timestamp whether it is inside an event of reason (any reason if None).
+        """
+        return intervals_to_mask(*self._merged(reason), dates)
+
+    def overlap_seconds(self, window_starts, period, reason=None):
+        """
+        Returns the seconds of each window [start, start + period) covered by events of reason (any reason if None).
+        """
+        starts, ends = self._merged(reason)
+        window_starts_ns = time_grid.to_nanoseconds(window_starts)
+        window_ends_ns = window_starts_ns + pd.Timedelta(period).value
+        return (covered_time(starts, ends, window_ends_ns) - covered_time(starts, ends, window_starts_ns)) / 1e9
+
+    def overlap_table(self, window_starts, period, time_column):
+        """
+        Returns the seconds of each window covered by events, one column per reason and one for any reason.
+        """
+        table = pd.DataFrame({time_column: pd.to_datetime(window_starts)})
+        for reason in self.reasons:
+            table[f"{reason} (s)"] = self.overlap_seconds(window_starts, period, reason)
+        table["Any event (s)"] = self.overlap_seconds(window_starts, period)
+        return table
+
+    def to_table(self):
+        """
+        Returns the events as a compact table, one row per interval sorted by start.
+        """
+        tables = [pd.DataFrame({'start': pd.to_datetime(starts), 'end': pd.to_datetime(ends),
+                                'duration_s': (ends - starts) / 1e9, 'reason': reason})
+                  for reason, (starts, ends) in self.intervals.items()]
+        if not tables:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        return pd.concat(tables, ignore_index=True).sort_values(['start', 'reason'], kind="stable",
+                                                                 ignore_index=True)[EVENT_COLUMNS]
+
+    @classmethod
+    def from_table(cls, table, sample_period=SAMPLE_PERIOD):
+        """
+        Creates a store from an event table (see to_table), e.g. read back from the exported CSV.
+        """
+        store = cls(sample_period)
+        for reason, events in table.groupby('reason', sort=False):
+            store.add_intervals(pd.to_datetime(events['start']), pd.to_datetime(events['end']), reason)
+        return store
+
+    def print_summary(self):
+        """
+        Prints the number and total duration of the events of each reason.
+        """
+        print("\n🔹 Events:\n")
+        for reason, (starts, ends) in self.intervals.items():
+            print(f"    ⚠ {reason}: {len(starts)} events, {pd.Timedelta(int((ends - starts).sum()), unit='ns')}")
+        print("")
@@ -0,0 +1,98 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import event_intervals
+
+
+class TestEventIntervals(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = pd.date_range("2024-01-10 12:00:00", periods=20, freq="3s")
+
+    def test_mask_round_trip(self):
+        mask = np.zeros(20, dtype=bool)
+        mask[[2, 3, 4, 10, 19]] = True
+
+        starts, ends = event_intervals.mask_to_intervals(self.dates, mask)
+
+        self.assertEqual(pd.to_datetime(starts).tolist(), [self.dates[2], self.dates[10], self.dates[19]])
+        self.assertEqual(pd.to_datetime(ends).tolist(), [self.dates[5], self.dates[11], self.dates[19] + pd.Timedelta("3s")])
+        np.testing.assert_array_equal(event_intervals.intervals_to_mask(starts, ends, self.dates), mask)
+
+    def test_runs_are_split_at_gaps(self):
+        dates = self.dates.delete([5, 6])
+        starts, ends = event_intervals.mask_to_intervals(dates, np.ones(len(dates), dtype=bool))
+
+        self.assertEqual(len(starts), 2)
+        self.assertEqual(pd.Timestamp(ends[0]), self.dates[5])
+        self.assertEqual(pd.Timestamp(starts[1]), self.dates[7])
+
+    def test_merge_intervals(self):
+        starts, ends = event_intervals.merge_intervals([10, 0, 5, 30], [20, 5, 8, 40])
+
+        self.assertEqual(starts.tolist(), [0, 10, 30])
+        self.assertEqual(ends.tolist(), [8, 20, 40])
+
+    def test_chunks_join_up(self):
+        store = event_intervals.EventStore()
+        store.add_mask(self.dates[:10], np.r_[np.zeros(5, dtype=bool), np.ones(5, dtype=bool)], "Wind Stow Active")
+        store.add_mask(self.dates[10:], np.r_[np.ones(3, dtype=bool), np.zeros(7, dtype=bool)], "Wind Stow Active")
+        store.add_mask(self.dates, np.zeros(20, dtype=bool), "Point of Connection Limitation")
+
+        table = store.to_table()
+
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.loc[0, 'start'], self.dates[5])
+        self.assertEqual(table.loc[0, 'end'], self.dates[13])
+        self.assertEqual(table.loc[0, 'duration_s'], 24.0)
+        self.assertEqual(store.reasons, ["Wind Stow Active"])
+
+    def test_overlap_seconds(self):
+        store = event_intervals.EventStore()
+        store.add_intervals(pd.to_datetime(["2024-01-10 12:00:30", "2024-01-10 12:01:50"]),
+                            pd.to_datetime(["2024-01-10 12:01:10", "2024-01-10 12:02:00"]), "Wind Stow Active")
+        store.add_intervals(pd.to_datetime(["2024-01-10 12:00:50"]), pd.to_datetime(["2024-01-10 12:01:20"]),
+                            "Point of Connection Limitation")
+
+        windows = pd.date_range("2024-01-10 12:00:00", periods=3, freq="1min")
+
+        np.testing.assert_array_equal(store.overlap_seconds(windows, "1min", "Wind Stow Active"), [30, 20, 0])
+        np.testing.assert_array_equal(store.overlap_seconds(windows, "1min"), [30, 30, 0])
+
+        table = store.overlap_table(windows, "1min", 'Minute')
+        self.assertEqual(table.columns.tolist(), ['Minute', "Wind Stow Active (s)",
+                                                  "Point of Connection Limitation (s)", "Any event (s)"])
+
+    def test_overlap_matches_mask(self):
+        rng = np.random.default_rng(1)
+        dates = pd.date_range("2024-01-10 00:00:00", periods=3000, freq="3s")
+        mask = rng.random(3000) < 0.3
+
+        store = event_intervals.EventStore()
+        store.add_mask(dates, mask, "Wind Stow Active")
+
+        windows = pd.date_range("2024-01-10 00:00:00", periods=150, freq="1min")
+        expected = mask.reshape(150, 20).sum(axis=1) * 3.0
+        np.testing.assert_array_equal(store.overlap_seconds(windows, "1min"), expected)
+        np.testing.assert_array_equal(store.to_mask(dates), mask)
+
+    def test_table_round_trip(self):
+        store = event_intervals.EventStore()
+        store.add_mask(self.dates, np.arange(20) % 7 < 2, "Wind Stow Active")
+
+        copy = event_intervals.EventStore.from_table(store.to_table())
+
+        pd.testing.assert_frame_equal(copy.to_table(), store.to_table())
+
+    def test_empty_store(self):
+        store = event_intervals.EventStore()
+
+        self.assertTrue(store.to_table().empty)
+        self.assertFalse(store.to_mask(self.dates).any())
+        np.testing.assert_array_equal(store.overlap_seconds(self.dates[:2], "1min"), [0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
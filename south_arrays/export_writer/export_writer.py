@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+
+# This file contains the background export writer, which lets the next pipeline stage compute while output files are written.
+
+
+class ExportWriter:
+    """
+    Runs export jobs on background threads.
+
+    - Jobs writing to the same file run in the order they were submitted.
+    - Jobs writing to different files run concurrently.
+    - flush() waits for every job and raises the first error, if any.
+
+    DataFrames passed to submit() must not be modified afterwards.
+    """
+
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export_writer")
+        self.futures = []
+        self.last_future_per_file = {}
+
+    def submit(self, filename, function, *args, **kwargs):
+        """
+        Queues function(*args, **kwargs), which writes to filename.
+        """
+        # Fail fast if an earlier export has already failed
+        self._raise_first_error(done_only=True)
+
+        previous_future = self.last_future_per_file.get(filename)
+        future = self.executor.submit(self._run_after, previous_future, function, *args, **kwargs)
+
+        self.futures.append(future)
+        self.last_future_per_file[filename] = future
+
+        return future
+
+    @staticmethod
+    def _run_after(previous_future, function, *args, **kwargs):
+        # Keep writes to the same file in order (the earlier job was queued first, so it is already running or done)
+        if previous_future is not None:
+            previous_future.result()
+
+        return function(*args, **kwargs)
+
+    def flush(self):
+        """
+        Barrier: waits until every queued export has been written.
+        Raises the first error raised by an export job.
+        """
+        for future in self.futures:
+            future.exception()  # Wait without raising
+
+        try:
+            self._raise_first_error()
+        finally:
+            self.futures = [future for future in self.futures if not future.done()]
+            self.last_future_per_file = {}
+
+    def close(self):
+        """
+        Flushes the queued exports and stops the background threads.
+        """
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def _raise_first_error(self, done_only=False):
+        for future in self.futures:
+            if done_only and not future.done():
+                continue
+            error = future.exception()
+            if error is not None:
+                raise error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Let the pipeline error propagate, but still wait for the queued files
+            self.executor.shutdown(wait=True)
+        return False
@@ -1,4 +1,23 @@
+import math
 import pandas as pd
+import kernels.kernels as kernels
+
+# SCADA tags read by the 15 minute filters
+WS211_GHI_TAG = r'VALUE(\HTR-WSTAT211-CWSAIU.UNIT3@NET2\)'
+WS211_POA_TAG = r'VALUE(\HTR-WSTAT211-PVAIU.UNIT3@NET2\)'
+WS211_TEMPERATURE_TAG = r'VALUE(\HTR-WSTAT211-ATR.UNIT3@NET2\)'
+WS241_TEMPERATURE_TAG = r'VALUE(\HTR-WSTAT241-ATR.UNIT3@NET2\)'
+WS211_WIND_SPEED_TAG = r'VALUE(\HTR-WSTAT211-WSWR.UNIT3@NET2\)'
+WS241_WIND_SPEED_TAG = r'VALUE(\HTR-WSTAT241-WSWR.UNIT3@NET2\)'
+POC_ACTIVE_POWER_TAG = r'VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)'
+
+# SCADA tags read by each 15 minute filter family
+REQUIRED_COLUMNS = {
+    'irradiance': [WS211_GHI_TAG, WS211_POA_TAG],
+    'temperature': [WS211_TEMPERATURE_TAG, WS241_TEMPERATURE_TAG],
+    'wind_speed': [WS211_WIND_SPEED_TAG, WS241_WIND_SPEED_TAG],
+    'AC_power': [POC_ACTIVE_POWER_TAG],
+}
 
 def filter_irradiance(fifteen_min_df,  TRC, POA_lower_limit):
     # Set up rejection reasons list
@@ -20,10 +39,21 @@ def filter_irradiance(fifteen_min_df,  TRC, POA_lower_limit):
 
     return fifteen_min_df
 
-def filter_irradiance_range(fifteen_min_df, rejection_reasons, TRC, POA_lower_limit):
-
-    WS211_ghi_average = fifteen_min_df['VALUE(\HTR-WSTAT211-CWSAIU.UNIT3@NET2\)'].mean()
-    WS211_poa_average = fifteen_min_df['VALUE(\HTR-WSTAT211-PVAIU.UNIT3@NET2\)'].mean()
+def filter_irradiance_range(fifteen_min_df, rejection_reasons, TRC, POA_lower_limit, reference="constant",
+                            reference_ghi=None):
+    """
+    GHI must be between 0.5 and 1.2 times the reference, POA above POA_lower_limit.
+    - reference="constant": the reference is TRC
+    - reference="clear_sky": the reference is reference_ghi, the clear-sky GHI of the window (see solar_table),
+      TRC is used when it is not available
+    """
+    if reference not in ("constant", "clear_sky"):
+        raise ValueError(f"Unknown irradiance reference: {reference}")
+    if reference == "clear_sky" and reference_ghi is not None and not math.isnan(reference_ghi):
+        TRC = reference_ghi
+
+    WS211_ghi_average = fifteen_min_df[WS211_GHI_TAG].mean()
+    WS211_poa_average = fifteen_min_df[WS211_POA_TAG].mean()
 
     WS211_ghi_lower_limit_OK = ((TRC * 0.5) < WS211_ghi_average)
     WS211_ghi_upper_limit_OK = (WS211_ghi_average < (TRC * 1.2))
@@ -43,7 +73,7 @@ def filter_irradiance_range(fifteen_min_df, rejection_reasons, TRC, POA_lower_li
 
 def filter_irradiance_dead_value(fifteen_min_df, rejection_reasons):
     # WS211 GHI dead value check
-    WS211_ghi_series = fifteen_min_df['VALUE(\HTR-WSTAT211-CWSAIU.UNIT3@NET2\)']  # Get full 15-min data series
+    WS211_ghi_series = fifteen_min_df[WS211_GHI_TAG]  # Get full 15-min data series
     WS211_ghi_filtered = WS211_ghi_series[WS211_ghi_series > 5]  # Exclude values ≤ 5 (as per standard)
     WS211_ghi_diffs = WS211_ghi_filtered.diff().abs().dropna()  # Get absolute change between each pair of values
     WS211_ghi_stuck = len(WS211_ghi_diffs) > 0 and (WS211_ghi_diffs < 0.0001).all()  # True if all changes are < 0.0001
@@ -52,24 +82,23 @@ def filter_irradiance_dead_value(fifteen_min_df, rejection_reasons):
 
     return fifteen_min_df, rejection_reasons
 
-def filter_irradiance_abrupt_change(fifteen_min_df, rejection_reasons):
-    # WS211 GHI abrupt change check
-    WS211_ghi = fifteen_min_df['VALUE(\HTR-WSTAT211-CWSAIU.UNIT3@NET2\)']
+def filter_irradiance_abrupt_change(fifteen_min_df, rejection_reasons, max_std_ratio=0.05):
+    # WS211 GHI abrupt change check: standard deviation more than max_std_ratio (5%) of the average
+    WS211_ghi = fifteen_min_df[WS211_GHI_TAG]
     WS211_ghi_avg = WS211_ghi.mean()
     WS211_ghi_std = WS211_ghi.std()
-    if WS211_ghi_std > 0.05 * WS211_ghi_avg:
+    if WS211_ghi_std > max_std_ratio * WS211_ghi_avg:
         rejection_reasons.append("Irradiance - Abrupt change - WS211")
 
     return fifteen_min_df, rejection_reasons
 
 
 
-def filter_temperature_range(fifteen_min_df, rejection_reasons):
-    lower_temp_limit = -10  # °C
-    upper_temp_limit = 50   # °C
+def filter_temperature_range(fifteen_min_df, rejection_reasons, lower_temp_limit=-10, upper_temp_limit=50):
+    # Limits in °C
 
-    WS211_temperature_average = fifteen_min_df['VALUE(\HTR-WSTAT211-ATR.UNIT3@NET2\)'].mean()
-    WS241_temperature_average = fifteen_min_df['VALUE(\HTR-WSTAT241-ATR.UNIT3@NET2\)'].mean()
+    WS211_temperature_average = fifteen_min_df[WS211_TEMPERATURE_TAG].mean()
+    WS241_temperature_average = fifteen_min_df[WS241_TEMPERATURE_TAG].mean()
 
     WS211_temperature_OK = lower_temp_limit < WS211_temperature_average < upper_temp_limit
     WS241_temperature_OK = lower_temp_limit < WS241_temperature_average < upper_temp_limit
@@ -85,7 +114,7 @@ def filter_temperature_range(fifteen_min_df, rejection_reasons):
 
 def filter_temperature_dead_value(fifteen_min_df, rejection_reasons):
     # WS211 Temperature dead value check
-    WS211_temp_series = fifteen_min_df['VALUE(\HTR-WSTAT211-ATR.UNIT3@NET2\)']  # 15-min temp data
+    WS211_temp_series = fifteen_min_df[WS211_TEMPERATURE_TAG]  # 15-min temp data
     WS211_temp_diffs = WS211_temp_series.diff().abs().dropna()  # Absolute changes between values
     WS211_temp_stuck = len(WS211_temp_diffs) > 0 and (WS211_temp_diffs < 0.0001).all()  # True if signal is flat
 
@@ -93,7 +122,7 @@ def filter_temperature_dead_value(fifteen_min_df, rejection_reasons):
         rejection_reasons.append("Temperature - Dead value - WS211")
 
     # WS241 Temperature dead value check
-    WS241_temp_series = fifteen_min_df['VALUE(\HTR-WSTAT241-ATR.UNIT3@NET2\)']
+    WS241_temp_series = fifteen_min_df[WS241_TEMPERATURE_TAG]
     WS241_temp_diffs = WS241_temp_series.diff().abs().dropna()
     WS241_temp_stuck = len(WS241_temp_diffs) > 0 and (WS241_temp_diffs < 0.0001).all()
 
@@ -102,17 +131,17 @@ def filter_temperature_dead_value(fifteen_min_df, rejection_reasons):
 
     return fifteen_min_df, rejection_reasons
 
-def filter_temperature_abrupt_change(fifteen_min_df, rejection_reasons):
+def filter_temperature_abrupt_change(fifteen_min_df, rejection_reasons, max_change=4):
     # WS211 Temperature abrupt change check
-    WS211_temp_series = fifteen_min_df['VALUE(\HTR-WSTAT211-ATR.UNIT3@NET2\)']
+    WS211_temp_series = fifteen_min_df[WS211_TEMPERATURE_TAG]
     WS211_temp_diffs = WS211_temp_series.diff().abs().dropna()  # Absolute differences between readings
-    if (WS211_temp_diffs > 4).any():
+    if (WS211_temp_diffs > max_change).any():
         rejection_reasons.append("Temperature - Abrupt change - WS211")
 
     # WS241 Temperature abrupt change check
-    WS241_temp_series = fifteen_min_df['VALUE(\HTR-WSTAT241-ATR.UNIT3@NET2\)']
+    WS241_temp_series = fifteen_min_df[WS241_TEMPERATURE_TAG]
     WS241_temp_diffs = WS241_temp_series.diff().abs().dropna()
-    if (WS241_temp_diffs > 4).any():
+    if (WS241_temp_diffs > max_change).any():
         rejection_reasons.append("Temperature - Abrupt change - WS241")
 
     return fifteen_min_df, rejection_reasons
@@ -140,14 +169,14 @@ def filter_temperature(fifteen_min_df):
 
 def filter_wind_dead_value(fifteen_min_df, rejection_reasons):
     # WS211 Wind Speed dead value check
-    WS211_wind_series = fifteen_min_df['VALUE(\HTR-WSTAT211-WSWR.UNIT3@NET2\)']  # 15-min wind speed data
+    WS211_wind_series = fifteen_min_df[WS211_WIND_SPEED_TAG]  # 15-min wind speed data
     WS211_wind_diffs = WS211_wind_series.diff().abs().dropna()  # Absolute change between readings
     WS211_wind_stuck = len(WS211_wind_diffs) > 0 and (WS211_wind_diffs < 0.0001).all()  # True if flat
     if WS211_wind_stuck:
         rejection_reasons.append("Wind - Dead value - WS211")
 
     # WS241 Wind Speed dead value check
-    WS241_wind_series = fifteen_min_df['VALUE(\HTR-WSTAT241-WSWR.UNIT3@NET2\)']
+    WS241_wind_series = fifteen_min_df[WS241_WIND_SPEED_TAG]
     WS241_wind_diffs = WS241_wind_series.diff().abs().dropna()
     WS241_wind_stuck = len(WS241_wind_diffs) > 0 and (WS241_wind_diffs < 0.0001).all()
     if WS241_wind_stuck:
@@ -155,17 +184,17 @@ def filter_wind_dead_value(fifteen_min_df, rejection_reasons):
 
     return fifteen_min_df, rejection_reasons
 
-def filter_wind_abrupt_change(fifteen_min_df, rejection_reasons):
+def filter_wind_abrupt_change(fifteen_min_df, rejection_reasons, max_change=10):
     # WS211 Wind Speed abrupt change check
-    WS211_wind_series = fifteen_min_df['VALUE(\HTR-WSTAT211-WSWR.UNIT3@NET2\)']
+    WS211_wind_series = fifteen_min_df[WS211_WIND_SPEED_TAG]
     WS211_wind_diffs = WS211_wind_series.diff().abs().dropna()
-    if (WS211_wind_diffs > 10).any():
+    if (WS211_wind_diffs > max_change).any():
         rejection_reasons.append("Wind - Abrupt change - WS211")
 
     # WS241 Wind Speed abrupt change check
-    WS241_wind_series = fifteen_min_df['VALUE(\HTR-WSTAT241-WSWR.UNIT3@NET2\)']
+    WS241_wind_series = fifteen_min_df[WS241_WIND_SPEED_TAG]
     WS241_wind_diffs = WS241_wind_series.diff().abs().dropna()
-    if (WS241_wind_diffs > 10).any():
+    if (WS241_wind_diffs > max_change).any():
         rejection_reasons.append("Wind - Abrupt change - WS241")
 
     return fifteen_min_df, rejection_reasons
@@ -193,7 +222,7 @@ def filter_wind_speed(fifteen_min_df):
     return fifteen_min_df
 
 def filter_power_range(fifteen_min_df, rejection_reasons, rating):
-    power_series = fifteen_min_df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)']
+    power_series = fifteen_min_df[POC_ACTIVE_POWER_TAG]
     power_average = power_series.mean()
 
     upper_limit = 1.02 * rating
@@ -206,40 +235,36 @@ def filter_power_range(fifteen_min_df, rejection_reasons, rating):
 
     return fifteen_min_df, rejection_reasons
 
-def filter_power_dead_value(fifteen_min_df, rejection_reasons):
+def filter_power_dead_value(fifteen_min_df, rejection_reasons, backend="auto", threshold_pct=0.1, run_length=3):
     # Get power series
-    power_series = fifteen_min_df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)']
-    
-    # Calculate percentage changes between consecutive readings
-    power_pct_changes = power_series.pct_change().abs() * 100
+    power_series = fifteen_min_df[POC_ACTIVE_POWER_TAG]
+
+    # Check for run_length (3) consecutive readings with less than threshold_pct (0.1%) change
+    # The run scan is in kernels.longest_small_change_run, backend selects the numba or Python kernel
+    power_values = power_series.to_numpy(dtype=float, na_value=float("nan"))
+    longest_run = kernels.longest_small_change_run(power_values, threshold_pct, backend=backend)
 
-    # print(power_pct_changes)
-    
-    # Check for 3 consecutive readings with less than 0.1% change
-    # We use rolling window of 3 and check if all values in window are < 0.1
-    dead_value_windows = power_pct_changes.rolling(window=3).apply(lambda x: all(x < 0.1) if len(x) == 3 else False)
-    
     # If any window has dead values, add rejection reason
-    if dead_value_windows.any():
+    if longest_run >= run_length:
         rejection_reasons.append("Power - Dead value")
 
     return fifteen_min_df, rejection_reasons
 
-def filter_power_abrupt_change(fifteen_min_df, rejection_reasons):
+def filter_power_abrupt_change(fifteen_min_df, rejection_reasons, max_std_ratio=0.05):
     # Get power series
-    power_series = fifteen_min_df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)']
+    power_series = fifteen_min_df[POC_ACTIVE_POWER_TAG]
     
     # Calculate average and standard deviation
     power_avg = power_series.mean()
     power_std = power_series.std()
     
-    # Check if standard deviation is more than 5% of average
-    if power_std > 0.05 * power_avg:
+    # Check if standard deviation is more than max_std_ratio (5%) of average
+    if power_std > max_std_ratio * power_avg:
         rejection_reasons.append("Power - Abrupt change")
 
     return fifteen_min_df, rejection_reasons
 
-def filter_AC_power(fifteen_min_df):
+def filter_AC_power(fifteen_min_df, backend="auto"):
     # Set up rejection reasons list
     rejection_reasons = []
 
@@ -249,7 +274,7 @@ def filter_AC_power(fifteen_min_df):
     fifteen_min_df, rejection_reasons = filter_power_range(fifteen_min_df, rejection_reasons, rating=30000)
 
     # Apply dead value filter - Causing issues - tolerence is too high.
-    # fifteen_min_df, rejection_reasons = filter_power_dead_value(fifteen_min_df, rejection_reasons)
+    # fifteen_min_df, rejection_reasons = filter_power_dead_value(fifteen_min_df, rejection_reasons, backend=backend)
 
     # Apply abrupt change and stability filter
     fifteen_min_df, rejection_reasons = filter_power_abrupt_change(fifteen_min_df, rejection_reasons)
@@ -0,0 +1,122 @@
+import unittest
+
+import pandas as pd
+
+import filter_pipeline
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import three_sec_filters.three_sec_filters as three_sec_filters
+
+
+class Inverter:
+    def __init__(self, name):
+        self.name = name
+        self.active_power_scada_tag = f"VALUE({name}-P)"
+        self.apparent_power_scada_tag = f"VALUE({name}-S)"
+        self.NRM_scada_tag = f"VALUE({name}-NRM)"
+
+
+def make_window(ghi=400.0, poa=700.0):
+    df = pd.DataFrame({'15 Minute': [pd.Timestamp("2024-01-10 12:00:00")] * 15})
+    df[fifteen_min_filters.REQUIRED_COLUMNS['irradiance'][0]] = [ghi + i for i in range(15)]
+    df[fifteen_min_filters.REQUIRED_COLUMNS['irradiance'][1]] = [poa + i for i in range(15)]
+    return df
+
+
+class TestFilterPipeline(unittest.TestCase):
+
+    def test_power_dead_value_disabled_by_default(self):
+        self.assertNotIn("power_dead_value", filter_pipeline.build_pipeline("15min").names)
+
+        pipeline = filter_pipeline.build_pipeline("15min", {"power_dead_value": {"enabled": True}})
+        self.assertIn("power_dead_value", pipeline.names)
+        self.assertLess(pipeline.names.index("power_range"), pipeline.names.index("power_dead_value"))
+
+    def test_curtailment_and_bad_power_points_disabled_by_default(self):
+        pipeline = filter_pipeline.build_pipeline("3s")
+        self.assertNotIn("ac_curtailment", pipeline.names)
+        self.assertNotIn("bad_power_points", pipeline.names)
+
+        config = {"ac_curtailment": {"enabled": True}, "bad_power_points": {"enabled": True}}
+        pipeline = filter_pipeline.build_pipeline("3s", config)
+        self.assertIn("ac_curtailment", pipeline.names)
+        self.assertIn("bad_power_points", pipeline.names)
+
+    def test_disable_filter(self):
+        pipeline = filter_pipeline.build_pipeline("3s", {"wind_stow": {"enabled": False}})
+        self.assertNotIn("wind_stow", pipeline.names)
+        self.assertNotIn(three_sec_filters.WS211_WIND_SPEED_TAG, pipeline.required_columns([]))
+
+    def test_unknown_filter_or_parameter(self):
+        with self.assertRaises(ValueError):
+            filter_pipeline.build_pipeline("3s", {"no_such_filter": {"enabled": False}})
+        with self.assertRaises(ValueError):
+            filter_pipeline.build_pipeline("15min", {"irradiance_range": {"params": {"no_such_param": 1}}})
+
+    def test_params_override(self):
+        config = {name: {"enabled": False} for name in filter_pipeline.build_pipeline("15min").names}
+        config["irradiance_range"] = {"params": {"TRC": 400, "POA_lower_limit": 800}}
+        pipeline = filter_pipeline.build_pipeline("15min", config)
+
+        reasons = pipeline.run_window(make_window(), {'backend': "python"})
+
+        self.assertEqual(len(reasons), 1)
+        self.assertTrue(reasons[0].endswith("_poa_lower_limit"))
+        self.assertEqual(pipeline.costs["irradiance_range"]['rejected'], 1)
+
+    def test_short_circuit(self):
+        config = {"irradiance_range": {"params": {"TRC": 400, "POA_lower_limit": 800}}}
+        pipeline = filter_pipeline.build_pipeline("15min", config, short_circuit=True)
+
+        reasons = pipeline.run_window(make_window(), {'backend': "python"})
+
+        # Only irradiance_range ran, every later filter was skipped
+        self.assertEqual(len(reasons), 1)
+        self.assertEqual(pipeline.costs["irradiance_range"]['calls'], 1)
+        self.assertEqual(pipeline.skipped_count, len(pipeline.names) - 1)
+
+    def test_short_circuit_with_initial_reason(self):
+        pipeline = filter_pipeline.build_pipeline("15min", short_circuit=True)
+
+        reasons = pipeline.run_window(make_window().head(10), {'backend': "python"}, ["Not enough data"])
+
+        self.assertEqual(reasons, ["Not enough data"])
+        self.assertEqual(pipeline.skipped_count, len(pipeline.names))
+
+    def test_required_columns_listed_once(self):
+        columns = filter_pipeline.build_pipeline("15min").required_columns()
+        self.assertEqual(len(columns), len(set(columns)))
+        self.assertIn(fifteen_min_filters.POC_ACTIVE_POWER_TAG, columns)
+
+    def test_tag_params_are_required_columns(self):
+        config = {"ac_curtailment": {"enabled": True, "params": {"setpoint_tag": "VALUE(SP)"}}}
+        pipeline = filter_pipeline.build_pipeline("3s", config)
+        self.assertIn("VALUE(SP)", pipeline.required_columns([]))
+        self.assertNotIn(None, filter_pipeline.build_pipeline("3s").required_columns([]))
+
+    def test_inverter_rejection_reasons(self):
+        spec = filter_pipeline.FILTER_REGISTRY["constrained_inverters"]
+        reasons = spec.expanded_rejection_reasons([Inverter("inverter_1"), Inverter("inverter_2")])
+
+        self.assertEqual(len(reasons), 4)
+        self.assertTrue(reasons[0].startswith("inverter_1"))
+        self.assertIn("VALUE(inverter_2-NRM)", spec.required_columns([Inverter("inverter_1"), Inverter("inverter_2")]))
+
+    def test_skip_invalid(self):
+        df = pd.DataFrame({'Date': pd.date_range("2024-01-10 12:00:00", periods=20, freq="3s")})
+        df[three_sec_filters.POC_ACTIVE_POWER_TAG] = 30000.0
+        df[three_sec_filters.POC_APPARENT_POWER_TAG] = 30000.0
+        df['is_valid'] = 1
+        df['rejection_reason'] = [[] for _ in range(len(df))]
+
+        config = {"wind_stow": {"enabled": False}}
+        pipeline = filter_pipeline.build_pipeline("3s", config, skip_invalid=True)
+        df = pipeline.run(df, {'inverters': [], 'state': None, 'backend': "python"})
+
+        self.assertEqual(df['is_valid'].sum(), 0)
+        self.assertEqual(pipeline.costs["point_of_connection_constraint"]['rejected'], 20)
+        self.assertEqual(pipeline.costs["constrained_inverters"]['skipped'], 1)
+        self.assertEqual(df.loc[0, 'rejection_reason'], ["Point of Connection Limitation"])
+
+
+if __name__ == '__main__':
+    unittest.main()
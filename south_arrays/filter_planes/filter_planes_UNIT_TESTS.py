@@ -0,0 +1,143 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import filter_planes
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import filter_pipeline.filter_pipeline as filter_pipeline
+import helper_functions_dir.helper_functions as helper_functions
+import regular_grid.regular_grid as regular_grid
+from rejection_codes.rejection_codes import add_rejection_reason
+
+
+def make_3s_df(seed=1):
+    """
+    45 minutes (three 15 minute windows) of 3 second data with wind stow over minutes 3 to 5, a POC limitation
+    leaving 3 samples in minute 20, and an irradiance drop in the last window.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-10 10:00:00", periods=900, freq="3s")
+    level = np.where(np.arange(900) >= 780, 0.8, 1.0)
+
+    df = pd.DataFrame({'Date': dates})
+    df[fifteen_min_filters.WS211_GHI_TAG] = 400 * level + rng.normal(0, 2, 900)
+    df[fifteen_min_filters.WS211_POA_TAG] = 700 * level + rng.normal(0, 3, 900)
+    df[fifteen_min_filters.WS211_TEMPERATURE_TAG] = 20 + rng.normal(0, 0.2, 900)
+    df[fifteen_min_filters.WS241_TEMPERATURE_TAG] = 20 + rng.normal(0, 0.2, 900)
+    df[fifteen_min_filters.WS211_WIND_SPEED_TAG] = 5 + rng.normal(0, 0.5, 900)
+    df[fifteen_min_filters.WS241_WIND_SPEED_TAG] = 5 + rng.normal(0, 0.5, 900)
+    df[fifteen_min_filters.POC_ACTIVE_POWER_TAG] = 20000 + rng.normal(0, 100, 900)
+    df['is_valid'] = 1
+    df['rejection_reason'] = [[] for _ in range(900)]
+
+    df = add_rejection_reason(df, df.index[60:120], "Wind Stow Active")
+    df = add_rejection_reason(df, df.index[400:417], "Point of Connection Limitation")
+    df = add_rejection_reason(df, df.index[100:110], "Point of Connection Limitation")
+    return df
+
+
+class TestFilterPlanes(unittest.TestCase):
+
+    def setUp(self):
+        self.inverters = helper_functions.create_inverters()
+        self.df = make_3s_df()
+        self.fifteen_min_df = self.run_filters(self.df)
+        self.planes = filter_planes.build_planes(self.df, self.fifteen_min_df, self.inverters)
+
+    def aggregate(self, df, disabled=()):
+        # 1 minute data of the 3 second rows without the reasons of the disabled filters
+        reasons = {reason for name in disabled for reason in
+                   filter_pipeline.FILTER_REGISTRY[name].expanded_rejection_reasons(self.inverters)}
+        df = df.copy()
+        df['rejection_reason'] = [[reason for reason in row if reason not in reasons] for row in df['rejection_reason']]
+        df['is_valid'] = [0 if row else 1 for row in df['rejection_reason']]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return helper_functions.aggregate_to_one_minute(helper_functions.get_valid_3s_data(df))
+
+    def run_filters(self, df, disabled=()):
+        # Rerun of the aggregation and 15 minute filters without the disabled filters
+        one_minute_df = self.aggregate(df, disabled)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return helper_functions.apply_15_min_filter(one_minute_df,
+                                                        filter_config={name: {"enabled": False} for name in disabled
+                                                                       if name in self.fifteen_min_filter_names()})
+
+    def fifteen_min_filter_names(self):
+        return [name for name, spec in filter_pipeline.FILTER_REGISTRY.items() if spec.stage == "15min"]
+
+    def assert_matches_rerun(self, planes, disabled):
+        expected = self.run_filters(self.df, disabled)
+        validity = planes.validity(disabled)
+
+        self.assertEqual(validity['15 Minute'].tolist(), expected['15 Minute'].tolist())
+        self.assertEqual(validity['is_valid'].tolist(), expected['is_valid'].tolist())
+
+    def test_matches_rerun(self):
+        self.assertEqual(self.fifteen_min_df['is_valid'].tolist(), [0.0, 0.0, 0.0])
+
+        for disabled in [(), ("wind_stow",), ("point_of_connection_constraint",), ("irradiance_abrupt_change",),
+                         ("wind_stow", "power_abrupt_change"),
+                         ("wind_stow", "point_of_connection_constraint", "irradiance_abrupt_change")]:
+            with self.subTest(disabled=disabled):
+                self.assert_matches_rerun(self.planes, disabled)
+
+        self.assertEqual(self.planes.validity(("wind_stow", "point_of_connection_constraint",
+                                               "irradiance_abrupt_change"))['is_valid'].tolist(), [1.0, 1.0, 1.0])
+
+    def test_one_minute_means(self):
+        one_minute_df = self.planes.one_minute_means(("wind_stow",))
+        expected = self.aggregate(self.df, ("wind_stow",))
+
+        self.assertEqual(one_minute_df['Minute'].tolist(), expected['Minute'].tolist())
+        np.testing.assert_allclose(one_minute_df[fifteen_min_filters.WS211_GHI_TAG],
+                                   expected[fifteen_min_filters.WS211_GHI_TAG])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "filter_planes.npz")
+            self.planes.save(filename)
+            planes = filter_planes.load_planes(filename)
+
+        self.assertEqual(planes.three_sec_filters, self.planes.three_sec_filters)
+        self.assertEqual(planes.fifteen_min_params, self.planes.fifteen_min_params)
+        self.assert_matches_rerun(planes, ("wind_stow", "point_of_connection_constraint"))
+
+    def test_ablation_table(self):
+        table = self.planes.ablation_table()
+
+        self.assertEqual(len(table), 1 + len(self.planes.three_sec_filters) + len(self.planes.fifteen_min_filters))
+        self.assertEqual(table.loc[0, 'valid_windows'], 0)
+        self.assertEqual(table.loc[table['without'] == "irradiance_abrupt_change", 'windows_gained'].item(), 1)
+
+    def test_regularized_rows(self):
+        # Missing samples added by --regularize (no values), leaving 3 measured samples in minute 35
+        self.df.loc[700:716, self.df.columns[1:-2]] = np.nan
+        self.df = add_rejection_reason(self.df, self.df.index[700:717], regular_grid.MISSING_SAMPLE_REASON)
+        self.fifteen_min_df = self.run_filters(self.df)
+        planes = filter_planes.build_planes(self.df, self.fifteen_min_df, self.inverters)
+
+        for disabled in [(), ("wind_stow",), ("irradiance_abrupt_change",)]:
+            with self.subTest(disabled=disabled):
+                self.assert_matches_rerun(planes, disabled)
+        self.assertEqual(planes.validity()['rows'].tolist(), [12, 14, 14])
+        self.assertEqual(planes.ablation_table().loc[0, 'valid_windows'], self.fifteen_min_df['is_valid'].sum())
+
+    def test_unknown_filter(self):
+        with self.assertRaises(ValueError):
+            self.planes.validity(("no_such_filter",))
+
+    def test_empty(self):
+        df = make_3s_df().iloc[:0]
+        planes = filter_planes.build_planes(df, self.run_filters(df), self.inverters)
+
+        self.assertTrue(planes.validity(("wind_stow",)).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,16 @@
+import os
+
+import numpy as np
 import pandas as pd
-import three_sec_filters.three_sec_filters as three_sec_filters
-import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import memory_layout.memory_layout as memory_layout
+import parse_cache.parse_cache as parse_cache
+import regular_grid.regular_grid as regular_grid
+import rejection_codes.rejection_codes as rejection_codes
+import time_grid.time_grid as time_grid
+import filter_pipeline.filter_pipeline as filter_pipeline
+import solar_position.solar_position as solar_position
+import solar_table.solar_table as solar_table
+import validity_runs.validity_runs as validity_runs
 
 pd.set_option('display.width', 300)
 pd.set_option('display.max_columns', 9)  # or 1000
@@ -21,83 +31,201 @@ class Inverter:
     def __repr__(self):
         return f"Inverter {self.name} ({self.label})"
 
-def load_and_initialize_df(filename):
+def load_and_initialize_df(filename, lean=False, usecols=None, regularize=False, timezone=None,
+                           parse_cache_dir=None):
     """
     Loads and initializes a DataFrame from a CSV file.
+    If lean is True, the memory-lean layout is used (see memory_layout) and a memory report is printed.
+    If usecols is given, only these columns are parsed (see get_required_columns).
+    If parse_cache_dir is given, the parsed columns are kept in the parse cache there and read from it when the same
+    file is loaded again (see parse_cache).
+    If timezone is given, the local timestamps are converted to UTC, de-duplicated and sorted (see normalize_timestamps).
+    If regularize is True, the rows are mapped onto a regular 3-second grid (see regular_grid) and
+    missing samples are added as invalid rows ("Missing sample").
     """
 
     # Visual break
     print("-" * 60)
 
     print(f"\n🔹 Loading data from: {filename}\n")
-    df = pd.read_csv(filename, skiprows=5, parse_dates=[0], date_format="%d/%m/%Y %I:%M:%S %p")
+    df = read_raw_csv(filename, usecols, parse_cache_dir)
 
     print(f"🔹 Loaded {len(df)} rows successfully.\n")
 
-    # Initialize validation columns
-    df["is_valid"] = 1
-    df['rejection_reason'] = df.apply(lambda _: [], axis=1)  # Efficient list initialization
+    if timezone is not None:
+        df = normalize_timestamps(df, timezone)
+
+    if regularize:
+        df, gap_report = regular_grid.regularize(df)
+        regular_grid.print_gap_report(gap_report)
+
+    # Create inverter objects and initialize validation columns
+    inverters = create_inverters()
+    if lean:
+        # Measure the standard layout on a sample, then convert
+        standard_bytes_per_row = memory_layout.bytes_per_row(initialize_validation_columns(df.head(1000).copy(), inverters))
+        df = initialize_validation_columns(df, inverters, lean=True)
+        memory_layout.print_memory_report(standard_bytes_per_row, memory_layout.bytes_per_row(df), len(df))
+    else:
+        df = initialize_validation_columns(df, inverters)
+
+    if regularize:
+        df = rejection_codes.add_rejection_reason(df, gap_report['missing'], regular_grid.MISSING_SAMPLE_REASON)
+
+    # Visual break
+    print("-" * 60)
+
+    return df, inverters  # Return DataFrame and inverter list
+
+def read_raw_csv(filename, usecols=None, cache_dir=None):
+    """
+    Reads a raw SCADA CSV export, skipping the 5 rows above the column header.
+    If usecols is given, the other columns are skipped by the CSV reader.
+    If cache_dir is given, the columns are read from the parse cache when the file was parsed before, and saved to
+    it otherwise (see parse_cache).
+    """
+    if cache_dir is not None:
+        df = parse_cache.load(filename, usecols, cache_dir)
+        if df is not None:
+            print(f"🔹 Parsed columns read from the cache in {cache_dir}\n")
+            return df
 
+    selected_columns = None if usecols is None else set(usecols)
+    df = pd.read_csv(filename, skiprows=5, parse_dates=[0], date_format="%d/%m/%Y %I:%M:%S %p",
+                     usecols=None if selected_columns is None else lambda col: col in selected_columns)
+
+    if selected_columns is not None:
+        missing_columns = [col for col in usecols if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Columns missing from {filename}: {missing_columns}")
+
+    if cache_dir is not None:
+        parse_cache.save(filename, df, list(pd.read_csv(filename, skiprows=5, nrows=0).columns), cache_dir)
+
+    return df
+
+def normalize_timestamps(df, timezone):
+    """
+    Converts the local Date column to UTC (without timezone), drops duplicate samples and sorts the rows by Date,
+    so every timestamp is unique and increasing, also over daylight saving changes.
+    - Local times repeated when daylight saving ends are told apart by file order: rows of the repeated hour
+      that come after the clock has gone back (a backward jump in the file) are standard time
+    - Local times skipped when daylight saving starts do not exist and are dropped
+    - Only the first row (in file order) of each UTC timestamp is kept
+    """
+    local = pd.DatetimeIndex(df['Date'])
+    local_ns = time_grid.to_nanoseconds(local)
+
+    # Number of backward jumps in local time before each row
+    backward_jumps = np.zeros(len(df), dtype=np.int64)
+    backward_jumps[1:] = np.cumsum(local_ns[1:] < local_ns[:-1])
+
+    # Rows of a repeated hour after a backward jump within that hour are in the second (standard time) pass
+    ambiguous = (local.tz_localize(timezone, ambiguous="NaT", nonexistent="NaT").isna()
+                 & ~local.tz_localize(timezone, ambiguous=True, nonexistent="NaT").isna())
+    second_pass = np.zeros(len(df), dtype=bool)
+    if ambiguous.any():
+        jumps = pd.Series(backward_jumps[ambiguous])
+        second_pass[ambiguous] = jumps > jumps.groupby(local[ambiguous].normalize()).transform("min")
+
+    utc = local.tz_localize(timezone, ambiguous=~second_pass, nonexistent="NaT").tz_convert("UTC").tz_localize(None)
+    utc_ns = time_grid.to_nanoseconds(utc)
+
+    # Stable sort, so the first row of each timestamp in file order comes first
+    exists = ~utc.isna()
+    order = np.flatnonzero(exists)
+    out_of_order = int(np.count_nonzero(np.diff(utc_ns[order]) < 0))
+    if out_of_order:
+        order = order[np.argsort(utc_ns[order], kind="stable")]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = utc_ns[order][1:] != utc_ns[order][:-1]
+    order = order[is_first]
+
+    normalized_df = df.iloc[order].reset_index(drop=True)
+    normalized_df['Date'] = utc[order]
+
+    print(f"🔹 Normalized timestamps from {timezone} to UTC: {int((~is_first).sum())} duplicates dropped, "
+          f"{int((~exists).sum())} non-existent local times dropped, {out_of_order} out-of-order rows sorted.\n")
+
+    return normalized_df
+
+def get_required_columns(inverters, output_columns=(), filter_config=None):
+    """
+    Returns the columns read by the enabled 3-second and 15-minute filters, plus any extra columns requested for the outputs.
+    Loading only these columns cuts the parse time and memory of every stage.
+    """
+    columns = ['Date']
+
+    for stage in ["3s", "15min"]:
+        columns += filter_pipeline.build_pipeline(stage, filter_config).required_columns(inverters)
+    columns += list(output_columns)
+
+    return list(dict.fromkeys(columns))  # Remove duplicates, keep order
+
+def create_inverters():
+    """
+    Creates the inverter objects for this array.
+    """
     # Define inverter labels 
     inverter_labels = ["INV011", "INV012", "INV023"]
 
     # Create inverter objects based on available labels
+    return [Inverter(int(label[5]), label) for i, label in enumerate(inverter_labels)]
 
-    inverters = [Inverter(int(label[5]), label) for i, label in enumerate(inverter_labels)]
+def initialize_validation_columns(df, inverters, lean=False):
+    """
+    Adds the is_valid, rejection_reason and inverter constraint columns to freshly loaded raw data.
+    If lean is True, the memory-lean layout is used instead (see memory_layout).
+    """
+    if lean:
+        return memory_layout.initialize_lean_validation_columns(df, inverters)
+
+    # Initialize validation columns
+    df["is_valid"] = 1
+    df['rejection_reason'] = [[] for _ in range(len(df))]  # Efficient list initialization
 
     # Add inverter constraint columns dynamically
     for inverter in inverters:
         df[f'is_constrained_{inverter.name}'] = 0
 
-    # Visual break
-    print("-" * 60)
-
-    return df, inverters  # Return DataFrame and inverter list
+    return df
 
-def apply_three_second_filters(df, inverters):
+def apply_three_second_filters(df, inverters, wind_stow_state=None, backend="auto", filter_config=None,
+                               skip_invalid=False, events=None):
     """
-    Applies multiple filters in sequence to the same DataFrame.
+    Applies the enabled 3-second filters of the filter registry in sequence to the same DataFrame.
     - Ensures each filter modifies df and passes it along.
-    - Splits the valid and non-valid data and saves them into separate CSV files.
-    - Prints information about each filtering step.
+    - Prints information about each filtering step and the cost of each filter.
+    - wind_stow_state carries the wind stow hysteresis between calls when filtering a stream in chunks.
+    - backend selects the kernel for the sequential scans ("auto", "numba" or "python", see kernels).
+    - filter_config enables, disables or re-parameterises filters (see filter_pipeline.build_pipeline).
+    - skip_invalid skips stateless filters once no valid rows are left.
+    - events: an EventStore (see event_intervals) recording the POC constraint, inverter constraint and wind stow
+      periods as intervals. The per-row constraint flag columns are then dropped.
     """
 
     print("\n🔹 Starting 3-second filtering process...\n")
 
+    pipeline = filter_pipeline.build_pipeline("3s", filter_config, skip_invalid=skip_invalid)
+    pipeline.register_rejection_reasons(inverters)
+
+    if events is not None:
+        df = df.drop(columns=[col for col in df.columns
+                              if col.startswith('is_constrained_') or col == 'constrained_inverters'])
 
-    # Apply Point of Connection Limitation Filter
-    print("    ⚙️  Applying 'Point of Connection Constraint' filter...\n")
-    df_before = df["is_valid"].sum()
-    df = three_sec_filters.point_of_connection_constraint(df)
-    df_after = df["is_valid"].sum()
-    print(f"    ✅  Filter applied. {df_before - df_after} rows invalidated.\n")
-
-    # Apply Constrained Inverter Filter
-    print("     ⚙️  Applying 'Constrained Inverter' filter...\n")
-    df_before = df["is_valid"].sum()
-    df = three_sec_filters.filter_constrained_inverters(df, inverters)
-    df_after = df["is_valid"].sum()
-    print(f"    ✅  Filter applied. {df_before - df_after} rows invalidated.\n")
-
-    # Apply Wind Stow Filter
-    print("     ⚙️  Applying 'Wind Stow' filter...\n")
-    df_before = df["is_valid"].sum()
-    df = three_sec_filters.filter_wind_stow(df)
-    df_after = df["is_valid"].sum()
-    print(f"    ✅ Filter applied. {df_before - df_after} rows invalidated.\n")
-
-    # Final Count
-    valid_rows = df["is_valid"].sum()
-    total_rows = len(df)
-    invalid_rows = total_rows - valid_rows
+    context = {'inverters': inverters, 'state': wind_stow_state, 'backend': backend, 'events': events}
+    df = pipeline.run(df, context)
+
+    pipeline.print_cost_report()
 
     return df  # Return fully processed DataFrame
 
 
 
-def export_3s_data(df, valid_csv="output_data/3_sec_valid_data.csv", non_valid_csv="output_data/3_sec_non_valid_data.csv"):
+def export_3s_data(df, valid_csv="output_data/3_sec_valid_data.csv", non_valid_csv="output_data/3_sec_non_valid_data.csv", writer=None):
     """
     Exports valid and non-valid 3-second data to separate CSV files.
+    If an ExportWriter is passed, both files are written concurrently in the background.
     """
     # Ensure DataFrame is not empty
     if df.empty:
@@ -110,16 +238,15 @@ def export_3s_data(df, valid_csv="output_data/3_sec_valid_data.csv", non_valid_c
 
     # Save valid data if available
     if not valid_df.empty:
-        cols_to_exclude = ['is_valid', 'rejection_reason', 'is_constrained_inverter_1', 'is_constrained_inverter_2', 'is_constrained_inverter_3', 'is_wind_stowed']
-        valid_df_to_save = valid_df.drop(columns=cols_to_exclude)
-        valid_df_to_save.to_csv(valid_csv, index=False)
+        valid_df_to_save = get_valid_3s_data(valid_df)
+        write_csv(valid_df_to_save, valid_csv, writer=writer)
         print(f"🔹 Valid 3-second data saved to: {valid_csv} ({len(valid_df)} rows)\n")
     else:
         print("⚠ Warning: No valid 3-second data to save. Check filtering criteria.\n")
 
     # Save non-valid data if available
     if not non_valid_df.empty:
-        non_valid_df.to_csv(non_valid_csv, index=False)
+        write_csv(rejection_codes.decode_rejection_code_column(non_valid_df), non_valid_csv, writer=writer)
         print(f"🔹  Non-valid 3-second data saved to: {non_valid_csv} ({len(non_valid_df)} rows)\n")
     else:
         print("⚠ Warning: No non-valid 3-second data to save. Check filtering criteria.\n")
@@ -127,15 +254,59 @@ def export_3s_data(df, valid_csv="output_data/3_sec_valid_data.csv", non_valid_c
     # Visual break
     print("-" * 60)
 
+def export_3s_validity(df, filename="output_data/3_sec_validity.csv", writer=None):
+    """
+    Exports the validity of the 3-second data as a run-length encoded sidecar (see validity_runs):
+    the runs of samples and the runs rejected for each reason, instead of every row.
+    If an ExportWriter is passed, the file is written in the background.
+    """
+    sidecar_df = validity_runs.to_sidecar_table(validity_runs.encode_validity(df))
+    write_csv(sidecar_df, filename, writer=writer)
+    print(f"🔹 3-second validity saved to: {filename} ({len(sidecar_df)} runs for {len(df)} rows)\n")
+
+    # Visual break
+    print("-" * 60)
+
+def get_valid_3s_data(df):
+    """
+    Returns the valid 3-second rows without the validation and flag columns, i.e. the same
+    data the 1-minute aggregation gets when reading back the exported valid 3-second file.
+    """
+    cols_to_exclude = [col for col in df.columns if col in ['is_valid', 'rejection_reason', 'rejection_code', 'constrained_inverters', 'is_wind_stowed'] or col.startswith('is_constrained_')]
+
+    return df[df["is_valid"] == 1].drop(columns=cols_to_exclude)
 
 
-def aggregate_to_one_minute(df):
+
+def aggregate_to_one_minute(df, method="grid"):
     """
     Aggregates the filtered 3-second data into 1-minute averages.
     - Excludes 1-minute periods that have fewer than 5 valid 3-second data points.
+    - method="grid" maps each row to a minute slot and averages with bincount (see time_grid).
+    - method="groupby" is the original pandas groupby version, kept for comparison.
+    - method="reshape" places the rows in a (minutes x 20) block per column and averages along the rows.
+      The rows must be on the regular 3-second grid without duplicates (see regular_grid).
     """
     print("\n🔹 Starting 1-minute aggregation...\n")
 
+    if method == "groupby":
+        avg_df, invalid_minutes_count = aggregate_to_one_minute_groupby(df)
+    elif method == "grid":
+        avg_df, invalid_minutes_count = aggregate_to_one_minute_grid(df)
+    elif method == "reshape":
+        avg_df, invalid_minutes_count = aggregate_to_one_minute_reshape(df)
+    else:
+        raise ValueError(f"Unknown aggregation method: {method}")
+
+    print(f"🔹  Finished 1-minute aggregation.\n")
+    print(f"🔹 Excluded {invalid_minutes_count} 1-minute periods due to insufficient data.\n")
+
+    return avg_df
+
+def aggregate_to_one_minute_groupby(df):
+    """
+    Groupby version of the 1-minute aggregation.
+    """
     # Make a copy to avoid modifying the original DataFrame
     df = df.copy()
 
@@ -159,16 +330,113 @@ def aggregate_to_one_minute(df):
     numeric_cols = df_filtered.select_dtypes(include=['number']).columns
     avg_df = df_filtered.groupby('Minute')[numeric_cols].mean().reset_index()
 
-    print(f"🔹  Finished 1-minute aggregation.\n")
-    print(f"🔹 Excluded {invalid_minutes_count} 1-minute periods due to insufficient data.\n")
+    return avg_df, invalid_minutes_count
 
-    return avg_df
+def aggregate_to_one_minute_grid(df):
+    """
+    Time grid version of the 1-minute aggregation.
+    - Every row is mapped to its minute slot, empty minutes stay in the grid with a count of 0
+    - Means are computed per column with bincount, ignoring NaN values like groupby does
+    """
+    numeric_cols = df.select_dtypes(include=['number']).columns
+
+    if len(df) == 0:
+        return pd.DataFrame(columns=['Minute'] + list(numeric_cols)), 0
+
+    grid = time_grid.TimeGrid.covering(df['Date'], "1min")
+    positions = grid.positions(df['Date'])
+    counts = grid.counts(positions)
+
+    # Minutes with at least one row but fewer than 5 are excluded, empty minutes are not counted
+    keep = counts >= 5
+    invalid_minutes_count = ((counts > 0) & ~keep).sum()
+
+    values = df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    means = grid.means(positions, values)[keep]
+
+    avg_df = pd.DataFrame(means, columns=numeric_cols)
+    avg_df.insert(0, 'Minute', grid.slot_times()[keep])
+
+    # Keep float32 columns (lean layout) in float32
+    float32_cols = [col for col in numeric_cols if df[col].dtype == np.float32]
+    avg_df[float32_cols] = avg_df[float32_cols].astype(np.float32)
+
+    return avg_df, invalid_minutes_count
 
-def export_valid_one_minute_data(df, output_csv="one_minute_data.csv"):
+def aggregate_to_one_minute_reshape(df):
+    """
+    Fixed-stride version of the 1-minute aggregation, for rows on the regular 3-second grid.
+    - Every row is placed at its sample of the minute, so each column becomes a (minutes x 20) block
+    - Means are taken along the 20 samples, ignoring NaN values and rows that are not there
+    """
+    numeric_cols = df.select_dtypes(include=['number']).columns
+
+    if len(df) == 0:
+        return pd.DataFrame(columns=['Minute'] + list(numeric_cols)), 0
+
+    samples_per_minute = pd.Timedelta("1min") // pd.Timedelta(regular_grid.SAMPLE_PERIOD)
+    dates_ns = time_grid.to_nanoseconds(df['Date'])
+    slots = time_grid.to_slots(df['Date'], regular_grid.SAMPLE_PERIOD)
+    if np.any(dates_ns != time_grid.EPOCH.value + slots * pd.Timedelta(regular_grid.SAMPLE_PERIOD).value):
+        raise ValueError("Rows must be on the regular 3-second grid for the reshape aggregation")
+
+    # Start the block at a minute boundary (EPOCH is one)
+    first_slot = slots.min() // samples_per_minute * samples_per_minute
+    positions = slots - first_slot
+    minute_count = positions.max() // samples_per_minute + 1
+    present = np.zeros(minute_count * samples_per_minute, dtype=bool)
+    present[positions] = True
+    if present.sum() != len(positions):
+        raise ValueError("Rows must not have duplicate timestamps for the reshape aggregation")
+
+    # Minutes with at least one row but fewer than 5 are excluded, empty minutes are not counted
+    counts = present.reshape(minute_count, samples_per_minute).sum(axis=1)
+    keep = counts >= 5
+    invalid_minutes_count = ((counts > 0) & ~keep).sum()
+
+    # Absent rows and NaN values are 0 in the blocks and are not counted
+    block_shape = (minute_count, samples_per_minute, len(numeric_cols))
+    data = df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    not_nan = ~np.isnan(data)
+    has_nan = not not_nan.all()
+    if has_nan:
+        data = np.where(not_nan, data, 0.0)
+
+    if len(positions) == len(present) and positions[0] == 0 and np.all(np.diff(positions) == 1):
+        values = data  # Already every sample of every minute, in order
+    else:
+        values = np.zeros((minute_count * samples_per_minute, len(numeric_cols)))
+        values[positions] = data
+
+    if has_nan:
+        value_present = np.zeros(values.shape, dtype=np.int64)
+        value_present[positions] = not_nan
+        value_counts = value_present.reshape(block_shape).sum(axis=1)[keep]
+    else:
+        value_counts = np.broadcast_to(counts[keep, None], (keep.sum(), len(numeric_cols)))
+
+    sums = values.reshape(block_shape).sum(axis=1)[keep]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(value_counts > 0, sums / value_counts, np.nan)
+
+    avg_df = pd.DataFrame(means, columns=numeric_cols)
+    minute_grid = time_grid.TimeGrid(first_slot // samples_per_minute,
+                                     first_slot // samples_per_minute + minute_count - 1, "1min")
+    avg_df.insert(0, 'Minute', minute_grid.slot_times()[keep])
+
+    # Keep float32 columns (lean layout) in float32
+    float32_cols = [col for col in numeric_cols if df[col].dtype == np.float32]
+    avg_df[float32_cols] = avg_df[float32_cols].astype(np.float32)
+
+    return avg_df, invalid_minutes_count
+
+def export_valid_one_minute_data(df, output_csv="one_minute_data.csv", append=False, writer=None):
     """
     Exports the aggregated 1-minute data to a CSV file.
+    If append is True, rows are added to the end of an existing file.
+    If an ExportWriter is passed, the file is written in the background.
     """
-    df.to_csv(output_csv, index=False)
+    write_csv(df, output_csv, append, writer)
 
     print(f"🔹  1-minute averaged data saved to: {output_csv} ({len(df)} rows)\n")
 
@@ -176,13 +444,36 @@ def export_valid_one_minute_data(df, output_csv="one_minute_data.csv"):
     print("-" * 60)
 
 
-def prepare_15_min_filtering(df):
+def window_minutes(period):
+    """
+    Returns the number of 1 minute rows in a complete window of the period (e.g. 15 for "15min").
+    Windows start at midnight, so the period must divide a day into whole minutes.
+    """
+    minutes, remainder = divmod(pd.Timedelta(period), pd.Timedelta("1min"))
+    if remainder or minutes < 1 or 1440 % minutes:
+        raise ValueError(f"Window period must be a whole number of minutes dividing a day: {period}")
+    return int(minutes)
+
+def window_column(period):
+    """
+    Returns the name of the window start column for the period ('15 Minute' for "15min").
+    """
+    return f"{window_minutes(period)} Minute"
+
+def not_enough_data_reason(period):
+    """
+    Returns the rejection reason of windows without a row for every minute.
+    """
+    return f"Not enough 1 minute data in {window_minutes(period)} minute period"
+
+def prepare_15_min_filtering(df, period="15min"):
     # Rename the first column
     original_col = df.columns[0]
-    df = df.rename(columns={original_col: '15 Minute'})
+    time_col = window_column(period)
+    df = df.rename(columns={original_col: time_col})
 
-    # Convert to datetime and floor to 15-minute, ensuring the entire column is in datetime64[ns] format
-    df['15 Minute'] = pd.to_datetime(df['15 Minute'], format="%Y-%m-%d %H:%M:%S").dt.floor('15min').astype('datetime64[ns]')
+    # Convert to datetime and floor to the window period (15-minute), ensuring the column is in datetime64[ns] format
+    df[time_col] = pd.to_datetime(df[time_col], format="%Y-%m-%d %H:%M:%S").dt.floor(period).astype('datetime64[ns]')
 
     # Add "is_valid" columnS
     df["is_valid"] = 1
@@ -190,10 +481,11 @@ def prepare_15_min_filtering(df):
 
     return df
 
-def apply_15_min_filter(one_minute_df):
+def apply_15_min_filter(one_minute_df, backend="auto", filter_config=None, short_circuit=False,
+                        timezone=solar_position.SITE_TIMEZONE, period="15min"):
     """
     Applies 15-minute filters to the DataFrame.
-    Filters include:
+    Filters include (see the filter registry in filter_pipeline):
     - Irradiance (range, dead value, abrupt change)
     - Temperature (range, dead value, abrupt change)
     - Wind Speed (dead value, abrupt change)
@@ -203,6 +495,14 @@ def apply_15_min_filter(one_minute_df):
 
     Input:
     - df: DataFrame with 1 minute data
+    - backend: kernel for the sequential scans ("auto", "numba" or "python", see kernels)
+    - filter_config: enables, disables or re-parameterises filters (see filter_pipeline.build_pipeline)
+    - short_circuit: stop evaluating filters for a window once it is rejected. Incomplete windows are
+      rejected before any filter runs. Faster, but only the first rejection reason is kept (not for audits).
+    - timezone: timezone of the timestamps ("UTC" for timestamps normalized by the loader), for the solar table
+    - period: length of the windows, a whole number of minutes. The window start column is named after it
+      ('15 Minute' by default, see window_column) and complete windows have a row for every minute.
+      window_engine evaluates the same rules for several periods at once.
 
     Output:
     - df: DataFrame with 15-minute data marked as valid or invalid with rejection reasons
@@ -210,75 +510,108 @@ def apply_15_min_filter(one_minute_df):
     """
 
     print("\n🔹 Starting 15-minute filtering process...\n")
-    # Prepare one_minute_df for 15 min filtering (floor to 15 min)
-    df = prepare_15_min_filtering(one_minute_df)
-
-    # Group by 15-minute timestamp and apply filters
-    filtered_dfs = []
+    pipeline = filter_pipeline.build_pipeline("15min", filter_config, short_circuit=short_circuit)
 
-    for time_slice, fifteen_min_group in df.groupby('15 Minute'):
+    # Prepare one_minute_df for 15 min filtering (floor to 15 min)
+    df = prepare_15_min_filtering(one_minute_df, period)
+    numeric_cols = df.select_dtypes(include=['number']).columns
+    time_col = window_column(period)
+    rows_per_window = window_minutes(period)
+    not_enough_data = not_enough_data_reason(period)
 
-        # Check that there are 15 rows in the fifteen_min_group
-        if len(fifteen_min_group) != 15:
-            enough_data = False
+    if df.empty:
+        return pd.DataFrame(columns=[time_col] + list(numeric_cols) + ['rejection_reason'])
+
+    # Split the rows into 15 minute windows on the time grid (rows are sorted by time)
+    df = df.sort_values(time_col, kind='stable', ignore_index=True)
+    grid = time_grid.TimeGrid.covering(df[time_col], period)
+    positions = grid.positions(df[time_col])
+    window_positions, starts, ends = time_grid.window_boundaries(positions)
+
+    # The filters only see the columns they read, which are sliced together for each window
+    filter_df = df[pipeline.required_columns()]
+    context = {'backend': backend, 'reference_ghi': None}
+    window_times = grid.slot_times()[window_positions]
+    reference_ghi = get_reference_ghi(pipeline, window_times, timezone)
+
+    rejection_reasons = []
+    for window, (start, end) in enumerate(zip(starts, ends)):
+        if reference_ghi is not None:
+            context['reference_ghi'] = reference_ghi[window]
+        enough_data = end - start == rows_per_window  # Check that there is a row for every minute of the window
+
+        if short_circuit and not enough_data:
+            # Rejected before any filter runs
+            window_reasons = pipeline.run_window(filter_df.iloc[start:end], context, [not_enough_data])
         else:
-            enough_data = True
-
-        # fifteen_min_group is a DataFrame with 15, one minute data points for a single 15 minute period
-        fifteen_min_group = fifteen_min_group.copy()
-
-        # Convert the group key (time_slice) to a pandas Timestamp (using pd.Timestamp) 
-        fifteen_min_group['15 Minute'] = pd.Timestamp(time_slice)
-
-        # Apply all filters
-        fifteen_min_group = fifteen_min_filters.filter_irradiance(fifteen_min_group, 400, 250)
-        fifteen_min_group = fifteen_min_filters.filter_temperature(fifteen_min_group)
-        fifteen_min_group = fifteen_min_filters.filter_wind_speed(fifteen_min_group)
-        fifteen_min_group = fifteen_min_filters.filter_AC_power(fifteen_min_group)
-
-        rejection_reasons_list = fifteen_min_group['rejection_reason'].iloc[0]
-        
-        # Create a new dataframe, with only one row. This row will have the mean of all the rows in the fifteen_min_df 
-        fifteen_min_df = fifteen_min_group.mean(numeric_only=True).to_frame().T
-        fifteen_min_df['15 Minute'] = pd.Timestamp(time_slice)
-
-        # Reorder columns to put '15 Minute' first
-        cols = ['15 Minute'] + [col for col in fifteen_min_df.columns if col != '15 Minute']
-        fifteen_min_df = fifteen_min_df[cols]
+            window_reasons = pipeline.run_window(filter_df.iloc[start:end], context)
+            if not enough_data:
+                window_reasons = window_reasons + [not_enough_data]
 
-        # Add rejection reasons to the dataframe     
-        fifteen_min_df['rejection_reason'] = [rejection_reasons_list]
-        
-        if not enough_data:
-            fifteen_min_df['is_valid'] = 0
-            fifteen_min_df['rejection_reason'] = fifteen_min_df['rejection_reason'].apply(lambda x: x + ["Not enough 1 minute data in 15 minute period"])  
+        rejection_reasons.append(window_reasons)
 
-        filtered_dfs.append(fifteen_min_df)
-
-    # Combine all filtered DataFrames
-    df = pd.concat(filtered_dfs, ignore_index=True)
+    # One row per window with the mean of all the rows in the window
+    means = grid.means(positions, df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan))[window_positions]
+    df = pd.DataFrame(means, columns=numeric_cols)
+    df.insert(0, time_col, window_times)
+    df['is_valid'] = [0.0 if reasons else 1.0 for reasons in rejection_reasons]
+    df['rejection_reason'] = rejection_reasons
 
+    pipeline.print_cost_report()
     print(f"🔹  Finished 15-minute filtering process.\n")
 
     return df
 
-def export_good_15_min_data(df):
+def get_reference_ghi(pipeline, window_times, timezone=solar_position.SITE_TIMEZONE):
+    """
+    Returns the clear-sky GHI of each window when the irradiance range filter uses the clear-sky reference,
+    otherwise None.
+    """
+    params = pipeline.params("irradiance_range")
+    if params is None or params['reference'] != "clear_sky" or len(window_times) == 0:
+        return None
+
+    return solar_table.load_for_dates(window_times, timezone=timezone).lookup('clear_sky_ghi', window_times)
+
+def export_good_15_min_data(df, append=False, writer=None):
     """
     Exports the good 15-minute data to a good_15_min_data.csv file only if is_valid is 1    
+    If append is True, rows are added to the end of the existing good and bad files.
+    If an ExportWriter is passed, the files are written in the background.
     """
     # good
     good_15_min_df = df[df['is_valid'] == 1]
-    good_15_min_df.to_csv("output_data/good_15_min_data.csv", index=False)
+    write_csv(good_15_min_df, "output_data/good_15_min_data.csv", append, writer)
 
     print(f"🔹 Good 15-minute data saved to: output_data/good_15_min_data.csv ({len(good_15_min_df)} rows)\n")
 
     # bad
     bad_15_min_df = df[df['is_valid'] == 0]
-    bad_15_min_df.to_csv("output_data/bad_15_min_data.csv", index=False)
+    write_csv(bad_15_min_df, "output_data/bad_15_min_data.csv", append, writer)
 
     print(f"🔹 Bad 15-minute data saved to: output_data/bad_15_min_data.csv ({len(bad_15_min_df)} rows)\n")
 
-
-
-
-
+def export_good_window_data(df, period, writer=None):
+    """
+    Exports the good and bad windows of another period (see window_engine) to good_<N>_min_data.csv and
+    bad_<N>_min_data.csv, as export_good_15_min_data.
+    """
+    minutes = window_minutes(period)
+    for name, is_valid in [("Good", 1), ("Bad", 0)]:
+        window_df = df[df['is_valid'] == is_valid]
+        filename = f"output_data/{name.lower()}_{minutes}_min_data.csv"
+        write_csv(window_df, filename, writer=writer)
+        print(f"🔹 {name} {minutes}-minute data saved to: {filename} ({len(window_df)} rows)\n")
+
+def write_csv(df, filename, append=False, writer=None):
+    """
+    Writes a DataFrame to a CSV file.
+    If append is True, rows are added to the end of the file and the header is only written when the file does not exist yet.
+    If an ExportWriter is passed, the write is queued on its background threads instead.
+    """
+    if writer is not None:
+        writer.submit(filename, write_csv, df, filename, append)
+    elif append:
+        df.to_csv(filename, mode='a', header=not os.path.exists(filename), index=False)
+    else:
+        df.to_csv(filename, index=False)
@@ -0,0 +1 @@
+# This file makes the inverter_analytics directory a Python package
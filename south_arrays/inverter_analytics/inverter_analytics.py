@@ -0,0 +1,109 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import time_grid.time_grid as time_grid
+
+# This file contains the per inverter analytics.
+# Active power and number of running modules (NRM) of all inverters are read as one (rows x inverters) array
+# and aggregated on the time grid, so energy, availability and relative performance of every inverter
+# are computed for every window in a few array operations.
+
+TIME_COLUMNS = {"1min": 'Minute', "15min": '15 Minute'}
+
+
+def required_columns(inverters):
+    """
+    Returns the SCADA tags read by the inverter analytics.
+    """
+    return [tag for inverter in inverters for tag in [inverter.active_power_scada_tag, inverter.NRM_scada_tag]]
+
+
+def compute_inverter_performance(df, inverters, period="15min", min_power=100.0):
+    """
+    Returns the energy, availability and relative performance of every inverter for every window of period
+    ("1min" or "15min") with 3 second data. One row per window, three columns per inverter:
+
+    - {name}_energy_kWh: mean active power of the window times the window length
+    - {name}_availability: fraction of the 3 second rows with at least one power module running
+    - {name}_relative_performance: energy over the median energy of the inverters running in the window,
+      NaN when the median mean power is below min_power (kW), so night windows are not compared
+    """
+    time_column = TIME_COLUMNS[period]
+    if len(df) == 0:
+        return pd.DataFrame(columns=[time_column] + [f"{inverter.name}_{measure}" for inverter in inverters
+                                                     for measure in ["energy_kWh", "availability",
+                                                                     "relative_performance"]])
+
+    grid = time_grid.TimeGrid.covering(df['Date'], period)
+    positions = grid.positions(df['Date'])
+    present = grid.counts(positions) > 0
+
+    power = df[[inverter.active_power_scada_tag for inverter in inverters]].to_numpy(dtype=np.float64,
+                                                                                       na_value=np.nan)
+    running = df[[inverter.NRM_scada_tag for inverter in inverters]].to_numpy(dtype=np.float64, na_value=np.nan) > 0
+
+    window_hours = grid.period / pd.Timedelta(hours=1)
+    energy = grid.means(positions, power)[present] * window_hours
+    availability = grid.means(positions, running)[present]
+
+    # Inverters that never ran in the window are not part of the reference
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Windows where no inverter ran
+        reference = np.nanmedian(np.where(availability > 0, energy, np.nan), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative_performance = np.where(reference[:, None] >= min_power * window_hours, energy / reference[:, None],
+                                        np.nan)
+
+    performance_df = pd.DataFrame({time_column: grid.slot_times()[present]})
+    for i, inverter in enumerate(inverters):
+        performance_df[f"{inverter.name}_energy_kWh"] = energy[:, i]
+        performance_df[f"{inverter.name}_availability"] = availability[:, i]
+        performance_df[f"{inverter.name}_relative_performance"] = relative_performance[:, i]
+
+    return performance_df
+
+
+def summarize_inverters(performance_df, inverters, threshold=0.95):
+    """
+    Returns one row per inverter with its total energy, mean availability, overall relative performance
+    (energy over reference energy of the windows where it was compared) and number of windows below threshold.
+    """
+    energy = performance_df[[f"{inverter.name}_energy_kWh" for inverter in inverters]].to_numpy(dtype=np.float64)
+    availability = performance_df[[f"{inverter.name}_availability"
+                                   for inverter in inverters]].to_numpy(dtype=np.float64)
+    relative_performance = performance_df[[f"{inverter.name}_relative_performance"
+                                           for inverter in inverters]].to_numpy(dtype=np.float64)
+
+    compared = ~np.isnan(relative_performance)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        reference_energy = np.where(compared, energy / relative_performance, 0.0)
+        overall = np.where(compared, energy, 0.0).sum(axis=0) / reference_energy.sum(axis=0)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Inverters without data
+        mean_availability = np.nanmean(availability, axis=0)
+
+    return pd.DataFrame({
+        'inverter': [inverter.name for inverter in inverters],
+        'label': [inverter.label for inverter in inverters],
+        'energy_kWh': np.nansum(energy, axis=0),
+        'availability': mean_availability,
+        'relative_performance': overall,
+        'windows_below_threshold': (compared & (relative_performance < threshold)).sum(axis=0),
+        'windows': len(performance_df),
+    })
+
+
+def print_summary(summary_df, threshold=0.95):
+    """
+    Prints the inverter summary, flagging inverters performing below threshold.
+    """
+    print("\n🔹 Inverter performance:\n")
+    for row in summary_df.itertuples(index=False):
+        symbol = "⚠" if row.relative_performance < threshold else "✅"
+        print(f"    {symbol} {row.inverter} ({row.label}): {row.energy_kWh:.0f} kWh, "
+              f"availability {row.availability:.1%}, relative performance {row.relative_performance:.3f} "
+              f"({row.windows_below_threshold} of {row.windows} windows below {threshold})")
+    print("")
@@ -0,0 +1,145 @@
+import numpy as np
+
+# This file contains the sequential scans of the filters (wind stow hysteresis, dead value runs).
+# Each scan is written once as a plain loop over NumPy arrays. If numba is installed the same
+# function is JIT compiled, otherwise the Python version is used.
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("auto", "numba", "python")
+
+# Marks "no timestamp" in the int64 nanosecond time arrays used by the kernels
+NO_TIME = np.iinfo(np.int64).min
+
+
+def resolve_backend(backend="auto"):
+    """
+    Returns the backend that will actually run ("numba" or "python").
+    - "auto" uses numba when it is installed
+    - "numba" falls back to "python" (with a warning) when numba is not installed
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {backend}. Expected one of {BACKENDS}")
+
+    if backend == "python":
+        return "python"
+
+    if numba is None:
+        if backend == "numba":
+            print("⚠ numba is not installed, using the Python kernels.")
+        return "python"
+
+    return "numba"
+
+
+def _wind_stow_scan(wind_speed_1, wind_speed_2, timestamps, start_threshold, end_threshold, release_ns,
+                    wind_stow_active, consecutive_high_wind_count, stow_deactivation_start):
+    """
+    Wind stow hysteresis over arrays, see three_sec_filters.filter_wind_stow.
+    Returns the stow flags and the final state.
+    """
+    is_wind_stowed = np.zeros(len(timestamps), dtype=np.uint8)
+
+    for i in range(len(timestamps)):
+        high_wind = wind_speed_1[i] > start_threshold and wind_speed_2[i] > start_threshold
+        if high_wind:
+            consecutive_high_wind_count += 1
+        else:
+            consecutive_high_wind_count = 0
+
+        # Trigger wind stow after two consecutive high-wind readings
+        if consecutive_high_wind_count >= 2 and not wind_stow_active:
+            wind_stow_active = True
+            stow_deactivation_start = NO_TIME
+
+        if wind_stow_active:
+            is_wind_stowed[i] = 1
+
+            # Release once both sensors stay below the end threshold for release_ns
+            if wind_speed_1[i] < end_threshold and wind_speed_2[i] < end_threshold:
+                if stow_deactivation_start == NO_TIME:
+                    stow_deactivation_start = timestamps[i]
+                elif timestamps[i] - stow_deactivation_start >= release_ns:
+                    wind_stow_active = False
+            else:
+                stow_deactivation_start = NO_TIME
+
+    return is_wind_stowed, wind_stow_active, consecutive_high_wind_count, stow_deactivation_start
+
+
+def _longest_small_change_run(values, threshold_pct):
+    """
+    Returns the longest run of consecutive readings changing by less than threshold_pct percent.
+    A change from 0, or to or from NaN, breaks the run (pandas pct_change gives inf/NaN there).
+    """
+    longest = 0
+    run = 0
+
+    for i in range(1, len(values)):
+        previous = values[i - 1]
+        current = values[i]
+        small = False
+        if previous != 0 and not np.isnan(previous) and not np.isnan(current):
+            small = abs(current / previous - 1) * 100 < threshold_pct
+
+        if small:
+            run += 1
+            if run > longest:
+                longest = run
+        else:
+            run = 0
+
+    return longest
+
+
+_KERNELS = {
+    "python": {"wind_stow_scan": _wind_stow_scan, "longest_small_change_run": _longest_small_change_run},
+}
+if numba is not None:
+    _KERNELS["numba"] = {name: numba.njit(cache=True)(kernel) for name, kernel in _KERNELS["python"].items()}
+
+
+def wind_stow_scan(wind_speed_1, wind_speed_2, timestamps, start_threshold, end_threshold, release_seconds,
+                   state=None, backend="auto"):
+    """
+    Runs the wind stow hysteresis.
+
+    - wind_speed_1, wind_speed_2: wind speed arrays (m/s)
+    - timestamps: int64 nanosecond timestamps
+    - state: optional dict (wind_stow_active, consecutive_high_wind_count, stow_deactivation_start in ns or None),
+      updated with the final state so consecutive chunks can be scanned
+    Returns the uint8 stow flags.
+    """
+    if state is None:
+        state = {}
+    stow_deactivation_start = state.get('stow_deactivation_start')
+
+    kernel = _KERNELS[resolve_backend(backend)]["wind_stow_scan"]
+    is_wind_stowed, wind_stow_active, consecutive_high_wind_count, stow_deactivation_start = kernel(
+        np.asarray(wind_speed_1, dtype=np.float64),
+        np.asarray(wind_speed_2, dtype=np.float64),
+        np.asarray(timestamps, dtype=np.int64),
+        float(start_threshold),
+        float(end_threshold),
+        np.int64(release_seconds * 1_000_000_000),
+        bool(state.get('wind_stow_active', False)),
+        int(state.get('consecutive_high_wind_count', 0)),
+        np.int64(NO_TIME if stow_deactivation_start is None else stow_deactivation_start),
+    )
+
+    state['wind_stow_active'] = bool(wind_stow_active)
+    state['consecutive_high_wind_count'] = int(consecutive_high_wind_count)
+    state['stow_deactivation_start'] = None if stow_deactivation_start == NO_TIME else int(stow_deactivation_start)
+
+    return is_wind_stowed
+
+
+def longest_small_change_run(values, threshold_pct, backend="auto"):
+    """
+    Returns the longest run of consecutive changes smaller than threshold_pct percent.
+    """
+    kernel = _KERNELS[resolve_backend(backend)]["longest_small_change_run"]
+    return int(kernel(np.asarray(values, dtype=np.float64), float(threshold_pct)))
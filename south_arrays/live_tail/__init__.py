@@ -0,0 +1 @@
+# This file makes the live_tail directory a Python package
@@ -0,0 +1 @@
+# This file makes the memory_layout directory a Python package
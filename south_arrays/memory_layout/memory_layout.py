@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# This file contains the memory-lean layout for the 3-second stage.
+#
+# Standard layout                          Lean layout
+# - SCADA tags: float64                    - SCADA tags: float32
+# - is_valid: int64                        - is_valid: uint8
+# - rejection_reason: list per row         - rejection_code: uint64, one bit per reason (see rejection_codes)
+# - is_constrained_inverter_N: int64 each  - constrained_inverters: one bit per inverter
+# - Date: datetime64[ns]                   - Date: datetime64[ns]
+
+SENSOR_DTYPE = np.float32
+
+# A year of 3-second data, used to project the memory needed for a full run
+ROWS_PER_YEAR = 365 * 24 * 60 * 20
+
+
+def initialize_lean_validation_columns(df, inverters):
+    """
+    Converts freshly loaded raw data to the lean layout and adds the lean validation columns.
+    """
+    # Downcast sensor values one column at a time to keep the peak memory low
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]) or pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype(SENSOR_DTYPE)
+
+    # Ensure "Date" column is in datetime format
+    df['Date'] = pd.to_datetime(df['Date'])
+
+    # Initialize validation columns
+    df['is_valid'] = np.ones(len(df), dtype=np.uint8)
+    df['rejection_code'] = np.zeros(len(df), dtype=np.uint64)
+
+    # One bit per inverter
+    df['constrained_inverters'] = np.zeros(len(df), dtype=constraint_bitfield_dtype(len(inverters)))
+
+    return df
+
+
+def constraint_bitfield_dtype(inverter_count):
+    """
+    Returns the smallest unsigned integer type with one bit per inverter.
+    """
+    for dtype in [np.uint8, np.uint16, np.uint32, np.uint64]:
+        if inverter_count <= np.iinfo(dtype).bits:
+            return dtype
+
+    raise ValueError(f"Cannot store constraint flags for {inverter_count} inverters in one bitfield.")
+
+
+def bytes_per_row(df):
+    """
+    Returns the memory used by a DataFrame per row (including the contents of list and string cells).
+    """
+    if len(df) == 0:
+        return 0.0
+
+    return df.memory_usage(index=True, deep=True).sum() / len(df)
+
+
+def print_memory_report(standard_bytes_per_row, lean_bytes_per_row, row_count):
+    """
+    Prints the memory used per row before and after converting to the lean layout.
+    """
+    print("🔹 Memory report (3-second stage):\n")
+    print(f"    Standard layout: {standard_bytes_per_row:8.1f} bytes/row  "
+          f"({standard_bytes_per_row * row_count / 1e9:.2f} GB for {row_count} rows, "
+          f"{standard_bytes_per_row * ROWS_PER_YEAR / 1e9:.2f} GB per year of 3s data)")
+    print(f"    Lean layout:     {lean_bytes_per_row:8.1f} bytes/row  "
+          f"({lean_bytes_per_row * row_count / 1e9:.2f} GB for {row_count} rows, "
+          f"{lean_bytes_per_row * ROWS_PER_YEAR / 1e9:.2f} GB per year of 3s data)")
+
+    if lean_bytes_per_row > 0:
+        print(f"    Reduction:       {standard_bytes_per_row / lean_bytes_per_row:8.1f}x\n")
@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import memory_layout
+
+
+def make_raw_df(rows=40):
+    df = pd.DataFrame({"Date": pd.date_range("2024-01-10 12:00:00", periods=rows, freq="3s")})
+    df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)'] = 20000.0
+    df['VALUE(\HTR-INV024-NRM.UNIT3@NET2\)'] = 4
+    return df
+
+
+class TestLeanLayout(unittest.TestCase):
+
+    def test_lean_dtypes(self):
+        df = memory_layout.initialize_lean_validation_columns(make_raw_df(), inverters=[None] * 5)
+
+        self.assertEqual(df['VALUE(\HTR-SWBD201-PQM001-P.UNIT3@NET2\)'].dtype, np.float32)
+        self.assertEqual(df['VALUE(\HTR-INV024-NRM.UNIT3@NET2\)'].dtype, np.float32)
+        self.assertEqual(df["is_valid"].dtype, np.uint8)
+        self.assertEqual(df["rejection_code"].dtype, np.uint64)
+        self.assertEqual(df["constrained_inverters"].dtype, np.uint8)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(df["Date"]))
+        self.assertNotIn("rejection_reason", df.columns)
+
+    def test_bytes_per_row(self):
+        df = pd.DataFrame({"a": np.zeros(10, dtype=np.float32), "b": np.zeros(10, dtype=np.uint8)})
+
+        self.assertEqual(memory_layout.bytes_per_row(df), df.memory_usage(index=True, deep=True).sum() / 10)
+        self.assertEqual(memory_layout.bytes_per_row(df.iloc[:0]), 0.0)
+
+    def test_bitfield_dtype(self):
+        self.assertEqual(memory_layout.constraint_bitfield_dtype(5), np.uint8)
+        self.assertEqual(memory_layout.constraint_bitfield_dtype(12), np.uint16)
+        with self.assertRaises(ValueError):
+            memory_layout.constraint_bitfield_dtype(65)
+
+
+if __name__ == '__main__':
+    unittest.main()
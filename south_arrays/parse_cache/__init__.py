@@ -0,0 +1 @@
+# This file makes the parse_cache directory a Python package
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# This file contains the cache of parsed raw SCADA CSV files.
+# Parsing the CSV export and its 12-hour timestamps is most of the load time, and the same export is loaded many
+# times a day. The parsed columns are saved once in an uncompressed npz file, one array per column, so they are
+# read back without parsing, and only the columns asked for are read.
+# Cache files are named after the hash of the file contents. The index maps the path, size and modification time
+# of the files already seen to their hash, so an unchanged file is found without reading it, and a file rewritten
+# with the same contents (e.g. a copy) is found by its hash.
+# The cache is bounded in size: the least recently used files are removed beyond max_bytes.
+
+CACHE_DIR = os.path.join("cache", "parsed")
+INDEX_FILENAME = "index.json"
+CACHE_VERSION = 1  # Increase when the parsing changes, so old cache files are parsed again
+MAX_CACHE_BYTES = 4 * 1024 ** 3
+HASH_CHUNK_BYTES = 16 * 1024 ** 2
+
+
+def content_hash(filename):
+    """
+    Returns the hash of the contents of a file.
+    """
+    digest = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_index(index, cache_dir):
+    filename = os.path.join(cache_dir, INDEX_FILENAME)
+    with open(filename + ".tmp", "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(filename + ".tmp", filename)
+
+
+def file_key(filename, cache_dir):
+    """
+    Returns the content hash of a file, from the index when its path, size and modification time are unchanged.
+    """
+    stat = os.stat(filename)
+    path = os.path.abspath(filename)
+    index = load_index(cache_dir)
+    entry = index.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['hash']
+
+    key = content_hash(filename)
+    index = {other: entry for other, entry in index.items() if os.path.exists(other)}
+    index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': key}
+    os.makedirs(cache_dir, exist_ok=True)
+    save_index(index, cache_dir)
+    return key
+
+
+def cache_filename(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.npz")
+
+
+def read_entry(filename):
+    # Metadata of a cache file: its columns (in file order) and whether every column of the CSV file is cached.
+    # None for the cache files of another version
+    with np.load(filename, allow_pickle=True) as data:
+        meta = json.loads(str(data['meta']))
+    if meta['version'] != CACHE_VERSION:
+        return None
+    return meta
+
+
+def load(filename, usecols=None, cache_dir=CACHE_DIR):
+    """
+    Returns the parsed columns of a CSV file from the cache (usecols, or all of them, in file order), or None when
+    the file is not cached or some of the columns are not.
+    """
+    key = file_key(filename, cache_dir)
+    entry_filename = cache_filename(key, cache_dir)
+    if not os.path.exists(entry_filename):
+        return None
+
+    meta = read_entry(entry_filename)
+    if meta is None:
+        return None
+    if usecols is None:
+        if not meta['complete']:
+            return None
+        columns = meta['columns']
+    else:
+        selected_columns = set(usecols)
+        columns = [col for col in meta['columns'] if col in selected_columns]
+        if len(columns) < len(selected_columns):
+            return None
+
+    with np.load(entry_filename, allow_pickle=True) as data:
+        df = pd.DataFrame({col: data[f"column_{meta['columns'].index(col)}"] for col in columns})
+    os.utime(entry_filename)  # Most recently used
+    return df
+
+
+def save(filename, df, header, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """
+    Saves the parsed columns of a CSV file (header: every column of the file, in order). Columns already cached
+    for the same contents are kept, so loads of different columns share one cache file.
+    """
+    key = file_key(filename, cache_dir)
+    entry_filename = cache_filename(key, cache_dir)
+    columns = {col: df[col].to_numpy() for col in df.columns}
+
+    meta = read_entry(entry_filename) if os.path.exists(entry_filename) else None
+    if meta is not None:
+        with np.load(entry_filename, allow_pickle=True) as data:
+            for i, col in enumerate(meta['columns']):
+                if col not in columns:
+                    columns[col] = data[f"column_{i}"]
+
+    order = [col for col in header if col in columns]
+    meta = {'version': CACHE_VERSION, 'source': os.path.abspath(filename), 'columns': order,
+            'complete': len(order) == len(header)}
+    with open(entry_filename + ".tmp", "wb") as f:
+        np.savez(f, meta=json.dumps(meta), **{f"column_{i}": columns[col] for i, col in enumerate(order)})
+    os.replace(entry_filename + ".tmp", entry_filename)
+    evict(cache_dir, max_bytes, keep=entry_filename)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=None):
+    """
+    Removes the least recently used cache files until the cache holds at most max_bytes (keep is never removed).
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npz"):
+            path = os.path.join(cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path != keep:
+            os.remove(path)
+            total -= size
@@ -0,0 +1 @@
+# This file makes the performance_ratio directory a Python package
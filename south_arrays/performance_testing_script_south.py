@@ -1,30 +1,335 @@
+import argparse
+
+import capacity_test.capacity_test as capacity_test
+import event_intervals.event_intervals as event_intervals
+import export_writer.export_writer as export_writer
+import filter_planes.filter_planes as filter_planes
+import filter_pipeline.filter_pipeline as filter_pipeline
 import helper_functions_dir.helper_functions as helper_functions
+import inverter_analytics.inverter_analytics as inverter_analytics
+import kernels.kernels as kernels
+import live_tail.live_tail as live_tail
+import night_prefilter.night_prefilter as night_prefilter
+import parse_cache.parse_cache as parse_cache
+import parameter_sweep.parameter_sweep as parameter_sweep
+import performance_ratio.performance_ratio as performance_ratio
+import pyramid.pyramid as pyramid
+import rejection_summary.rejection_summary as rejection_summary
+import solar_position.solar_position as solar_position
+import stage_graph.stage_graph as stage_graph
+import window_engine.window_engine as window_engine
 import pandas as pd
 
 # Ensure all columns are printed (disable column truncation)
 pd.set_option('display.max_columns', None)
 
+# Options that --follow mode ignores, as (argument attribute, command line flag)
+BATCH_ONLY_FLAGS = (
+    ("prune_night", "--prune-night"),
+    ("timezone", "--timezone"),
+    ("regularize", "--regularize"),
+    ("inverter_analytics", "--inverter-analytics"),
+    ("rejection_summary", "--rejection-summary"),
+    ("validity_sidecar", "--validity-sidecar"),
+    ("event_table", "--event-table"),
+    ("sweep", "--sweep"),
+    ("filter_planes", "--filter-planes"),
+    ("pyramid", "--pyramid"),
+    ("incremental", "--incremental"),
+    ("window_periods", "--window-periods"),
+    ("performance_ratio", "--performance-ratio"),
+    ("capacity_test", "--capacity-test"),
+)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Waiotahe south arrays performance testing")
+    parser.add_argument("--follow", action="store_true",
+                        help="Follow the raw CSV while the historian appends to it and emit results as windows complete")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between checks for new rows in --follow mode")
+    parser.add_argument("--idle-timeout", type=float, default=None,
+                        help="Stop --follow mode after this many seconds without new rows")
+    parser.add_argument("--lean", action="store_true",
+                        help="Use the memory-lean layout (float32 sensors, packed flags, rejection codes) for the 3-second stage")
+    parser.add_argument("--project-columns", action="store_true",
+                        help="Only load the SCADA tags the filters read (plus --output-columns)")
+    parser.add_argument("--output-columns", nargs="*", default=[],
+                        help="Extra SCADA tags to carry through to the outputs when --project-columns is used")
+    parser.add_argument("--timezone", nargs="?", const=solar_position.SITE_TIMEZONE, default=None,
+                        help="Read the raw timestamps as local time in this timezone (default: site timezone), convert "
+                             "them to UTC, drop duplicate samples and sort them. Outputs are then in UTC, but days and "
+                             "hours (daily performance ratio, rejection summary, pyramid, capacity test calendar "
+                             "periods) and --test-period dates are in local time (the pyramid in local standard time)")
+    parser.add_argument("--regularize", action="store_true",
+                        help="Map the raw rows onto a regular 3-second grid, report gaps and duplicates and add missing "
+                             "samples as invalid rows")
+    parser.add_argument("--kernel-backend", choices=kernels.BACKENDS, default="auto",
+                        help="Kernel for the sequential filter scans: numba when installed (auto), numba or python")
+    parser.add_argument("--filter-config", default=None,
+                        help="JSON file enabling, disabling or re-parameterising filters, e.g. "
+                             "{\"power_dead_value\": {\"enabled\": true}, \"irradiance_range\": {\"params\": {\"TRC\": 450}}}")
+    parser.add_argument("--skip-invalid", action="store_true",
+                        help="Skip stateless 3-second filters once no valid rows are left (their rejection reasons are not added)")
+    parser.add_argument("--short-circuit", action="store_true",
+                        help="Stop evaluating 15-minute filters for a window once it is rejected (only the first rejection reason is kept)")
+    parser.add_argument("--prune-night", nargs="?", const="irradiance", choices=night_prefilter.NIGHT_MASKS, default=None,
+                        help="Drop night-time 15-minute windows before the 3-second stage, using the irradiance readings "
+                             "(default, valid outputs unchanged) or the solar geometry of the site")
+    parser.add_argument("--incremental", nargs="?", const=stage_graph.CACHE_DIR, default=None, metavar="CACHE_DIR",
+                        help="Run the pipeline as a stage graph and only re-run the stages whose inputs or parameters "
+                             "changed since the last run, reading the others back from CACHE_DIR (default: cache/stages)")
+    parser.add_argument("--no-parse-cache", action="store_true",
+                        help="Always parse the input CSV file instead of reading its parsed columns from the parse "
+                             "cache in cache/parsed (written on the first run over a file)")
+    parser.add_argument("--inverter-analytics", action="store_true",
+                        help="Compute the 1-minute and 15-minute energy, availability and relative performance of every inverter")
+    parser.add_argument("--rejection-summary", action="store_true",
+                        help="Write rejection counts and durations by reason, inverter, hour of day and day "
+                             "to output_data/rejection_summary.csv")
+    parser.add_argument("--validity-sidecar", action="store_true",
+                        help="Write the validity of the 3-second data as run-length encoded runs per rejection reason "
+                             "(output_data/3_sec_validity.csv) instead of every 3-second row")
+    parser.add_argument("--event-table", action="store_true",
+                        help="Record POC constraint, inverter constraint and wind stow periods as intervals instead of "
+                             "per-row flags and write them to output_data/event_table.csv, with the seconds of every "
+                             "1-minute and 15-minute window covered by each event type")
+    parser.add_argument("--sweep", default=None, metavar="SWEEP_JSON",
+                        help="JSON file with lists of 15-minute filter thresholds to try, e.g. "
+                             "{\"irradiance_range\": {\"TRC\": [350, 400, 450]}}. Writes the valid windows and "
+                             "performance ratio of every combination to output_data/parameter_sweep.csv")
+    parser.add_argument("--filter-planes", action="store_true",
+                        help="Write the per-filter bit planes of the run to output_data/filter_planes.npz and the "
+                             "valid windows without each filter to output_data/filter_ablation.csv")
+    parser.add_argument("--pyramid", action="store_true",
+                        help="Build the 15-minute, hourly and daily sums, counts, minima and maxima of the valid 1-minute "
+                             "data (output_data/pyramid.npz) and write the hourly and daily means to "
+                             "output_data/hourly_data.csv and output_data/daily_data.csv")
+    parser.add_argument("--window-periods", nargs="+", default=None, metavar="PERIOD",
+                        help="Also apply the 15-minute filters to windows of other lengths (e.g. 5min 10min 1h), from "
+                             "one set of 1-minute statistics, and write output_data/good_<N>_min_data.csv and "
+                             "output_data/bad_<N>_min_data.csv for each")
+    parser.add_argument("--performance-ratio", action="store_true",
+                        help="Compute the measured and expected energy and the performance ratio of the good 15-minute windows")
+    parser.add_argument("--rated-power", type=float, default=None,
+                        help="Rated power of the array at STC in kW for --performance-ratio (default: inverter nameplate)")
+    parser.add_argument("--test-period", nargs=2, action="append", metavar=("START", "END"), default=None,
+                        help="Test period for --performance-ratio and --capacity-test (end excluded), can be given "
+                             "several times. Default: all windows")
+    parser.add_argument("--capacity-test", nargs="?", const="", default=None, metavar="FREQ",
+                        help="Fit the capacity test regression (power against POA irradiance, ambient temperature and "
+                             "wind speed) of the good 15-minute windows of every test period, or of every calendar "
+                             "period FREQ (e.g. MS for months, YS for years), to output_data/capacity_test.csv")
+    return parser.parse_args()
+
 
 def main():
 
-    # Import data
-    raw_df, inverters = helper_functions.load_and_initialize_df(
-        "input_data/waiotahe_south_raw_sensor_data.csv")  # Load raw data
+    args = parse_arguments()
+    input_csv = "input_data/waiotahe_south_raw_sensor_data.csv"
+
+    # Filters to run
+    filter_config = None
+    if args.filter_config:
+        filter_config = filter_pipeline.load_filter_config(args.filter_config)
+
+    # Columns to load
+    usecols = None
+    if args.project_columns:
+        output_columns = list(args.output_columns)
+        if args.inverter_analytics:
+            output_columns += inverter_analytics.required_columns(helper_functions.create_inverters())
+        if args.performance_ratio:
+            output_columns += performance_ratio.required_columns(helper_functions.create_inverters())
+        if args.sweep:
+            output_columns += parameter_sweep.required_columns(helper_functions.create_inverters())
+        if args.capacity_test is not None:
+            output_columns += capacity_test.required_columns()
+        usecols = helper_functions.get_required_columns(helper_functions.create_inverters(), output_columns,
+                                                        filter_config)
+
+    # Live mode
+    if args.follow:
+        for attribute, flag in BATCH_ONLY_FLAGS:
+            # Not only truthy values: --capacity-test without a FREQ is an empty string
+            if getattr(args, attribute) not in (None, False):
+                print(f"⚠ {flag} is only used for batch runs, not in --follow mode.")
+        live_tail.follow(input_csv, helper_functions.create_inverters(),
+                         poll_interval=args.poll_interval, idle_timeout=args.idle_timeout, usecols=usecols,
+                         backend=args.kernel_backend, filter_config=filter_config, short_circuit=args.short_circuit)
+        return
+
+    # Timezone of the timestamps after loading
+    data_timezone = "UTC" if args.timezone else solar_position.SITE_TIMEZONE
+
+    # Test periods are given in local time
+    test_periods = args.test_period
+    if args.timezone and test_periods:
+        test_periods = [tuple(solar_position.to_utc([start, end], args.timezone)) for start, end in test_periods]
+    parse_cache_dir = None if args.no_parse_cache else parse_cache.CACHE_DIR
+
+    with export_writer.ExportWriter() as writer:  # Files are written in the background while the next stage computes
+
+        if args.incremental:
+            # Stage graph: only the stages whose inputs or parameters changed since the last run are run again
+            if args.skip_invalid:
+                print("⚠ --skip-invalid is not used with --incremental, every 3-second filter runs on every row.")
+            if args.event_table:
+                print("⚠ --event-table is not used with --incremental.")
+            inverters = helper_functions.create_inverters()
+            three_sec_files = (["output_data/3_sec_validity.csv"] if args.validity_sidecar
+                               else ["output_data/3_sec_valid_data.csv", "output_data/3_sec_non_valid_data.csv"])
+            graph = stage_graph.build_site_graph(input_csv, inverters, filter_config, lean=args.lean, usecols=usecols,
+                                                 regularize=args.regularize, timezone=args.timezone,
+                                                 data_timezone=data_timezone, prune_night=args.prune_night,
+                                                 short_circuit=args.short_circuit, backend=args.kernel_backend,
+                                                 validity_sidecar=args.validity_sidecar,
+                                                 three_sec_files=three_sec_files, writer=writer,
+                                                 cache_dir=args.incremental, parse_cache_dir=parse_cache_dir)
+            graph.run()
+            graph.print_report()
+
+            # Data read by the other outputs, from the cache when their stage did not run
+            events = None
+            filtered_df_3s = graph.value("3s") if (args.rejection_summary or args.inverter_analytics
+                                                   or args.filter_planes) else None
+            one_minute_df = graph.value("1min") if (args.sweep or args.pyramid or args.window_periods) else None
+            fifteen_min_df = graph.value("15min") if (args.rejection_summary or args.filter_planes
+                                                      or args.performance_ratio
+                                                      or args.capacity_test is not None) else None
+        else:
+            # Import data
+            raw_df, inverters = helper_functions.load_and_initialize_df(input_csv, lean=args.lean, usecols=usecols,
+                                                                        regularize=args.regularize,
+                                                                        timezone=args.timezone,
+                                                                        parse_cache_dir=parse_cache_dir)  # Load raw data
+
+            # Drop night-time windows
+            if args.prune_night:
+                raw_df, _ = night_prefilter.prune_night_windows(raw_df, filter_config, night_mask=args.prune_night,
+                                                                backend=args.kernel_backend, timezone=data_timezone)
+
+            # Apply 3-second filters
+            events = event_intervals.EventStore() if args.event_table else None
+            filtered_df_3s = helper_functions.apply_three_second_filters(raw_df, inverters, backend=args.kernel_backend,
+                                                                         filter_config=filter_config,
+                                                                         skip_invalid=args.skip_invalid,
+                                                                         events=events) # Apply filter
+            if args.validity_sidecar:
+                helper_functions.export_3s_validity(filtered_df_3s, writer=writer) # Export validity runs
+            else:
+                helper_functions.export_3s_data(filtered_df_3s, writer=writer) # Export data
+
+        # Rejections of the 3-second stage, counted before the rejected rows are dropped
+        if args.rejection_summary:
+            three_sec_summary_df = rejection_summary.summarize_3s_rejections(filtered_df_3s, inverters,
+                                                                             local_timezone=args.timezone)
+
+        # Inverter energy, availability and relative performance (all rows, site filters do not apply)
+        if args.inverter_analytics:
+            for period, filename in [("1min", "output_data/inverter_one_minute_data.csv"),
+                                     ("15min", "output_data/inverter_15_min_data.csv")]:
+                inverter_df = inverter_analytics.compute_inverter_performance(filtered_df_3s, inverters, period)
+                helper_functions.write_csv(inverter_df, filename, writer=writer)
+            inverter_analytics.print_summary(inverter_analytics.summarize_inverters(inverter_df, inverters))
+
+        # Every row is kept for the filter planes
+        all_rows_3s_df = filtered_df_3s if args.filter_planes else None
+
+        if not args.incremental:
+            # Average to 1 minute
+            filtered_df_3s = helper_functions.get_valid_3s_data(filtered_df_3s) # Only keep valid data
+            one_minute_df = helper_functions.aggregate_to_one_minute(filtered_df_3s) # Average
+            helper_functions.export_valid_one_minute_data(one_minute_df, "output_data/one_minute_data.csv", writer=writer)  # Export data
+
+            # Filter and Average to 15 mins
+            fifteen_min_df = helper_functions.apply_15_min_filter(one_minute_df, backend=args.kernel_backend,
+                                                                  filter_config=filter_config,
+                                                                  short_circuit=args.short_circuit,
+                                                                  timezone=data_timezone)
+            helper_functions.export_good_15_min_data(fifteen_min_df, writer=writer)
+
+        # Valid windows and performance ratio for every combination of 15-minute filter thresholds
+        if args.sweep:
+            sweep_df = parameter_sweep.sweep(one_minute_df, parameter_sweep.load_sweep_grid(args.sweep), inverters,
+                                             filter_config, backend=args.kernel_backend,
+                                             rated_power=args.rated_power, timezone=data_timezone)
+            helper_functions.write_csv(sweep_df, "output_data/parameter_sweep.csv", writer=writer)
+            parameter_sweep.print_summary(sweep_df)
+
+        # Hourly and daily rollups of the valid 1-minute data
+        if args.pyramid:
+            data_pyramid = pyramid.build_pyramid(one_minute_df, local_timezone=args.timezone)
+            data_pyramid.save("output_data/pyramid.npz")
+            helper_functions.write_csv(data_pyramid.query("hour"), "output_data/hourly_data.csv", writer=writer)
+            helper_functions.write_csv(data_pyramid.query("day"), "output_data/daily_data.csv", writer=writer)
+            pyramid.print_summary(data_pyramid)
+
+        # Good and bad windows of other lengths (the 15-minute windows are written above)
+        window_periods = [period for period in args.window_periods or []
+                          if helper_functions.window_minutes(period) != 15]
+        if window_periods:
+            window_dfs = window_engine.evaluate_periods(one_minute_df, window_periods, backend=args.kernel_backend,
+                                                        filter_config=filter_config, timezone=data_timezone)
+            for period, window_df in window_dfs.items():
+                helper_functions.export_good_window_data(window_df, period, writer=writer)
+            window_engine.print_summary(window_dfs)
+
+        # Per-filter bit planes, and the valid windows without each filter
+        if args.filter_planes:
+            planes = filter_planes.build_planes(all_rows_3s_df, fifteen_min_df, inverters, filter_config,
+                                                timezone=data_timezone)
+            planes.save("output_data/filter_planes.npz")
+            ablation_df = planes.ablation_table(backend=args.kernel_backend)
+            helper_functions.write_csv(ablation_df, "output_data/filter_ablation.csv", writer=writer)
+            filter_planes.print_summary(ablation_df)
+
+        # Constraint and stow events, and the time they cover in every window
+        if events is not None:
+            helper_functions.write_csv(events.to_table(), "output_data/event_table.csv", writer=writer)
+            for window_df, time_column, period, filename in [
+                    (one_minute_df, 'Minute', "1min", "output_data/event_overlap_one_minute.csv"),
+                    (fifteen_min_df, '15 Minute', "15min", "output_data/event_overlap_15_min.csv")]:
+                window_starts = window_df[time_column] if not window_df.empty else []
+                helper_functions.write_csv(events.overlap_table(window_starts, period, time_column), filename,
+                                           writer=writer)
+            events.print_summary()
+
+        # Rejection counts and durations of both stages
+        if args.rejection_summary:
+            summary_df = pd.concat([three_sec_summary_df,
+                                    rejection_summary.summarize_15_min_rejections(fifteen_min_df, args.timezone)],
+                                   ignore_index=True)
+            helper_functions.write_csv(summary_df, "output_data/rejection_summary.csv", writer=writer)
+            rejection_summary.print_summary(summary_df)
+
+        # Performance ratio of the good windows
+        if args.performance_ratio:
+            window_df = performance_ratio.compute_window_energy(fifteen_min_df, inverters, "south",
+                                                                rated_power=args.rated_power)
+            helper_functions.write_csv(window_df, "output_data/performance_ratio_15_min.csv", writer=writer)
+            helper_functions.write_csv(performance_ratio.summarize_days(window_df, combine_arrays=False,
+                                                                        local_timezone=args.timezone),
+                                       "output_data/performance_ratio_daily.csv", writer=writer)
+            performance_ratio.print_summary(performance_ratio.summarize_periods(window_df, test_periods,
+                                                                                combine_arrays=False))
+
+        # Capacity test regression of the good windows
+        if args.capacity_test is not None:
+            periods = test_periods
+            if args.capacity_test:
+                good_windows = fifteen_min_df.loc[fifteen_min_df['is_valid'] == 1, '15 Minute']
+                periods = capacity_test.calendar_periods(good_windows, args.capacity_test, args.timezone)
+            capacity_df = capacity_test.fit_capacity(fifteen_min_df, periods)
+            helper_functions.write_csv(capacity_df, "output_data/capacity_test.csv", writer=writer)
+            capacity_test.print_summary(capacity_df)
 
-    # Apply 3-second filters
-    filtered_df_3s = helper_functions.apply_three_second_filters(raw_df, inverters) # Apply filter
-    helper_functions.export_3s_data(filtered_df_3s) # Export data
+    # Fingerprints of the stages that ran, once their files are written
+    if args.incremental:
+        graph.save()
 
-    # Average to 1 minute
-    filtered_df_3s = pd.read_csv("output_data/3_sec_valid_data.csv") # Import data
-    one_minute_df = helper_functions.aggregate_to_one_minute(filtered_df_3s) # Average
-    helper_functions.export_valid_one_minute_data(one_minute_df, "output_data/one_minute_data.csv")  # Export data
+    print("🔹 All output files written.\n")
 
-    # Filter and Average to 15 mins
-    one_minute_df = pd.read_csv("output_data/one_minute_data.csv") # Import data
-    fifteen_min_df = helper_functions.apply_15_min_filter(one_minute_df)
-    helper_functions.export_good_15_min_data(fifteen_min_df)
-    
 
 main()
 
@@ -0,0 +1 @@
+# This file makes the pyramid directory a Python package
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import pyramid
+
+
+def make_one_minute_df(days=3, seed=1):
+    """
+    Valid 1 minute data of a few days with a third of the minutes missing and some NaN values.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = pd.date_range("2024-01-10 00:00:00", periods=days * 1440, freq="1min")
+    minutes = minutes[rng.random(len(minutes)) > 0.3]
+
+    df = pd.DataFrame({'Minute': minutes})
+    df['VALUE(A)'] = rng.normal(400, 100, len(minutes))
+    df['VALUE(B)'] = rng.normal(20, 5, len(minutes))
+    df.loc[df.index[::7], 'VALUE(B)'] = np.nan
+    df['is_valid'] = 1.0
+    return df
+
+
+class TestPyramid(unittest.TestCase):
+
+    def setUp(self):
+        self.df = make_one_minute_df()
+        self.pyramid = pyramid.build_pyramid(self.df)
+
+    def test_levels_match_resample(self):
+        self.assertEqual(self.pyramid.columns, ['VALUE(A)', 'VALUE(B)'])
+
+        for level, period in [("15min", "15min"), ("hour", "1h"), ("day", "1D")]:
+            resampled = self.df.set_index('Minute')[['VALUE(A)', 'VALUE(B)']].resample(period)
+            for stat in ["mean", "sum", "count", "min", "max"]:
+                with self.subTest(level=level, stat=stat):
+                    expected = getattr(resampled, stat)()
+                    expected = expected[resampled.size() > 0]
+                    result = self.pyramid.query(level, stat=stat)
+
+                    self.assertEqual(result[pyramid.TIME_COLUMNS[level]].tolist(), expected.index.tolist())
+                    np.testing.assert_allclose(result[['VALUE(A)', 'VALUE(B)']], expected, equal_nan=True)
+
+    def test_range_query(self):
+        result = self.pyramid.query("hour", "2024-01-10 10:30", "2024-01-10 14:00", columns=['VALUE(A)'])
+
+        self.assertEqual(result['Hour'].tolist(), list(pd.date_range("2024-01-10 11:00", periods=3, freq="h")))
+        self.assertEqual(list(result.columns), ['Hour', 'VALUE(A)', 'minutes'])
+        self.assertEqual(result['minutes'].iloc[0],
+                         self.df['Minute'].between("2024-01-10 11:00", "2024-01-10 11:59").sum())
+
+    def test_totals(self):
+        for start, end in [("2024-01-10 10:07", "2024-01-12 13:44"), (None, "2024-01-11 05:00"),
+                           ("2024-01-11 23:58", None), ("2024-01-10 10:03", "2024-01-10 10:05"), (None, None)]:
+            selected = self.df
+            if start is not None:
+                selected = selected[selected['Minute'] >= start]
+            if end is not None:
+                selected = selected[selected['Minute'] < end]
+
+            with self.subTest(start=start, end=end):
+                for stat in ["mean", "count", "min", "max"]:
+                    np.testing.assert_allclose(self.pyramid.totals(start, end, stat),
+                                               getattr(selected[['VALUE(A)', 'VALUE(B)']], stat)())
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "pyramid.npz")
+            self.pyramid.save(filename)
+            loaded = pyramid.load_pyramid(filename)
+
+        self.assertEqual(loaded.columns, self.pyramid.columns)
+        for level in pyramid.LEVELS:
+            pd.testing.assert_frame_equal(loaded.query(level, stat="max"), self.pyramid.query(level, stat="max"))
+        np.testing.assert_allclose(loaded.totals("2024-01-10 10:07", "2024-01-12 13:44"),
+                                   self.pyramid.totals("2024-01-10 10:07", "2024-01-12 13:44"))
+
+    def test_local_days(self):
+        # UTC data: days in New Zealand standard time (UTC+12), hours unchanged
+        utc_df = self.df.assign(Minute=self.df['Minute'] - pd.Timedelta(hours=12))
+        local_pyramid = pyramid.build_pyramid(utc_df, local_timezone="Pacific/Auckland")
+
+        days = local_pyramid.query("day")
+        expected = self.pyramid.query("day")
+        self.assertEqual(days['Day'].tolist(), (expected['Day'] - pd.Timedelta(hours=12)).tolist())
+        np.testing.assert_allclose(days[['VALUE(A)', 'VALUE(B)']], expected[['VALUE(A)', 'VALUE(B)']])
+        pd.testing.assert_frame_equal(local_pyramid.query("hour", "2024-01-10 10:00", "2024-01-11 04:00"),
+                                      pyramid.build_pyramid(utc_df).query("hour", "2024-01-10 10:00",
+                                                                          "2024-01-11 04:00"))
+        np.testing.assert_allclose(local_pyramid.totals("2024-01-10 10:07", "2024-01-12 13:44"),
+                                   utc_df[utc_df['Minute'].between("2024-01-10 10:07", "2024-01-12 13:43:59")]
+                                   [['VALUE(A)', 'VALUE(B)']].mean())
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "pyramid.npz")
+            local_pyramid.save(filename)
+            pd.testing.assert_frame_equal(pyramid.load_pyramid(filename).query("day"), days)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.pyramid.query("week")
+        with self.assertRaises(ValueError):
+            self.pyramid.query("hour", stat="median")
+        with self.assertRaises(ValueError):
+            self.pyramid.totals(columns=['VALUE(C)'])
+        with self.assertRaises(ValueError):
+            pyramid.build_pyramid(pd.concat([self.df, self.df.iloc[:1]]))
+
+    def test_empty(self):
+        empty = pyramid.build_pyramid(self.df.iloc[:0])
+
+        self.assertTrue(empty.query("day").empty)
+        self.assertTrue(np.isnan(empty.totals()).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
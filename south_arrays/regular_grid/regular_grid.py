@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+import time_grid.time_grid as time_grid
+
+# This file contains the gap detector and regularizer of the raw SCADA data.
+# Every timestamp is mapped to its slot on a regular 3 second grid. The result has exactly one row per slot
+# from the first to the last sample, with missing samples as explicit NaN rows, so the data can be handled
+# as fixed-stride arrays (e.g. 20 rows per minute) instead of irregular groups.
+
+SAMPLE_PERIOD = "3s"
+MISSING_SAMPLE_REASON = "Missing sample"
+
+
+def regularize(df, period=SAMPLE_PERIOD):
+    """
+    Returns the rows of df on a regular grid of period, and a gap report.
+
+    - Timestamps between slots are moved to the start of their slot (reported as off_grid)
+    - Only the first sample of a slot is kept (the others are reported as duplicates)
+    - Slots without a sample get a row with NaN values, report['missing'] flags these rows
+    """
+    if len(df) == 0:
+        return df, {'samples': 0, 'slots': 0, 'duplicates': 0, 'off_grid': 0, 'missing': np.zeros(0, dtype=bool),
+                    'gaps': pd.DataFrame(columns=['start', 'end', 'missing_samples'])}
+
+    dates_ns = time_grid.to_nanoseconds(df['Date'])
+    grid = time_grid.TimeGrid.covering(df['Date'], period)
+    slots = time_grid.to_slots(df['Date'], period)
+    positions = slots - grid.first_slot
+    off_grid = int(np.count_nonzero(dates_ns != time_grid.EPOCH.value + slots * grid.period_ns))
+
+    # First sample of every slot (stable sort, so the first in file order)
+    order = np.argsort(positions, kind="stable")
+    sorted_positions = positions[order]
+    is_first = np.ones(len(order), dtype=bool)
+    is_first[1:] = sorted_positions[1:] != sorted_positions[:-1]
+    rows = order[is_first]
+
+    missing = np.ones(grid.size, dtype=bool)
+    missing[sorted_positions[is_first]] = False
+
+    regular_df = df.iloc[rows].set_index(sorted_positions[is_first]).reindex(pd.RangeIndex(grid.size))
+    regular_df['Date'] = grid.slot_times().as_unit(pd.DatetimeIndex(df['Date']).unit)
+
+    report = {
+        'samples': len(df),
+        'slots': grid.size,
+        'duplicates': len(df) - len(rows),
+        'off_grid': off_grid,
+        'missing': missing,
+        'gaps': find_gaps(missing, grid),
+    }
+    return regular_df, report
+
+
+def find_gaps(missing, grid):
+    """
+    Returns the runs of missing slots: first missing slot, first slot after the gap and number of missing samples.
+    """
+    padded = np.concatenate([[False], missing, [False]]).astype(np.int8)
+    starts = np.flatnonzero(np.diff(padded) == 1)
+    ends = np.flatnonzero(np.diff(padded) == -1)
+
+    slot_times = grid.slot_times()
+    return pd.DataFrame({
+        'start': slot_times[starts],
+        'end': slot_times[starts] + (ends - starts) * grid.period,
+        'missing_samples': ends - starts,
+    })
+
+
+def print_gap_report(report, largest=5):
+    """
+    Prints the duplicates, off-grid samples and the largest gaps.
+    """
+    missing = int(report['missing'].sum())
+    print(f"🔹 Regularized {report['samples']} samples to {report['slots']} slots of {SAMPLE_PERIOD}: "
+          f"{report['duplicates']} duplicates dropped, {report['off_grid']} off-grid samples moved, "
+          f"{missing} missing samples in {len(report['gaps'])} gaps.\n")
+
+    for gap in report['gaps'].nlargest(largest, 'missing_samples').itertuples(index=False):
+        print(f"    ⚠ Gap from {gap.start} to {gap.end} ({gap.missing_samples} missing samples)")
+    if len(report['gaps']):
+        print("")
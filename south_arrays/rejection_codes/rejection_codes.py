@@ -0,0 +1,108 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# This file contains the rejection code registry.
+# In the lean layout every 3-second rejection reason is one bit of the uint64 'rejection_code' column,
+# instead of an entry in the per-row 'rejection_reason' list.
+
+# Bit i of a rejection code stands for REJECTION_REASONS[i]. Reasons are registered in the order the
+# filters first use them, which is the order they appear in the rejection_reason lists.
+REJECTION_REASONS = []
+MAX_REJECTION_REASONS = 64
+
+
+def get_rejection_bit(reason):
+    """
+    Returns the bit (as a uint64 mask) standing for a rejection reason, registering the reason if it is new.
+    """
+    if reason not in REJECTION_REASONS:
+        if len(REJECTION_REASONS) >= MAX_REJECTION_REASONS:
+            raise ValueError(f"Cannot register '{reason}': all {MAX_REJECTION_REASONS} rejection code bits are in use.")
+        REJECTION_REASONS.append(reason)
+
+    return np.uint64(1) << np.uint64(REJECTION_REASONS.index(reason))
+
+
+def add_rejection_reason(df, mask, reason):
+    """
+    Marks the rows selected by mask as invalid and records the rejection reason,
+    either in the rejection_reason lists or as a bit of the rejection_code column (lean layout).
+    """
+    df.loc[mask, 'is_valid'] = 0
+
+    if 'rejection_code' in df.columns:
+        bit = get_rejection_bit(reason)
+        df.loc[mask, 'rejection_code'] = df.loc[mask, 'rejection_code'] | bit
+    else:
+        df.loc[mask, 'rejection_reason'] = df.loc[mask, 'rejection_reason'].apply(lambda x: x + [reason])
+
+    return df
+
+
+def decode_rejection_codes(codes):
+    """
+    Converts rejection codes back to lists of rejection reasons.
+    Only the distinct codes are decoded, so this is cheap even for millions of rows.
+    """
+    codes = np.asarray(codes, dtype=np.uint64)
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+
+    reason_lists = []
+    for code in unique_codes:
+        reason_lists.append([reason for bit, reason in enumerate(REJECTION_REASONS)
+                             if code & (np.uint64(1) << np.uint64(bit))])
+
+    return [reason_lists[i] for i in inverse.ravel()]
+
+
+def encode_rejection_reasons(reason_lists):
+    """
+    Converts lists of rejection reasons to rejection codes.
+    The lists are flattened into one array of reasons, the distinct reasons are looked up once and the bits of
+    every list are combined with one reduction, so this is cheap even for millions of rows.
+    """
+    reason_lists = pd.Series(reason_lists, dtype=object).to_numpy()
+    lengths = np.fromiter(map(len, reason_lists), dtype=np.int64, count=len(reason_lists))
+    codes = np.zeros(len(reason_lists), dtype=np.uint64)
+    if not lengths.any():
+        return codes
+
+    # Reasons in list order, registered in the order they first appear
+    reasons = np.fromiter(itertools.chain.from_iterable(reason_lists), dtype=object, count=int(lengths.sum()))
+    inverse, unique_reasons = pd.factorize(reasons)
+    bits = np.array([get_rejection_bit(reason) for reason in unique_reasons], dtype=np.uint64)
+
+    rejected = lengths > 0
+    starts = np.concatenate([[0], np.cumsum(lengths[rejected])[:-1]])
+    codes[rejected] = np.bitwise_or.reduceat(bits[inverse], starts)
+
+    return codes
+
+
+def decode_rejection_code_column(df):
+    """
+    Returns a copy of a lean-layout DataFrame with the rejection_code column replaced by
+    the equivalent rejection_reason lists (e.g. for exporting). Other DataFrames are returned unchanged.
+    """
+    if 'rejection_code' not in df.columns:
+        return df
+
+    position = df.columns.get_loc('rejection_code')
+    reasons = pd.Series(decode_rejection_codes(df['rejection_code']), index=df.index, dtype=object)
+
+    df = df.drop(columns=['rejection_code'])
+    df.insert(position, 'rejection_reason', reasons)
+
+    return df
+
+
+def get_rejection_codes(df):
+    """
+    Returns the rejection code of every row, from the rejection_code column (lean layout)
+    or by encoding the rejection_reason lists.
+    """
+    if 'rejection_code' in df.columns:
+        return df['rejection_code'].to_numpy(dtype=np.uint64)
+    return encode_rejection_reasons(df['rejection_reason'])
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import rejection_codes
+
+
+class TestRejectionCodes(unittest.TestCase):
+
+    def test_encode_decode_round_trip(self):
+        reason_lists = [[], ["Point of Connection Limitation"], ["Point of Connection Limitation", "Wind Stow Active"], []]
+
+        codes = rejection_codes.encode_rejection_reasons(reason_lists)
+
+        self.assertEqual(codes.dtype, np.uint64)
+        self.assertEqual(codes[0], 0)
+        self.assertEqual(rejection_codes.decode_rejection_codes(codes), reason_lists)
+
+    def test_encode_series(self):
+        reason_lists = pd.Series([["Wind Stow Active"], [], ["Missing sample", "Wind Stow Active"]] * 1000,
+                                 index=np.arange(3000) + 10)
+
+        codes = rejection_codes.encode_rejection_reasons(reason_lists)
+
+        wind_stow = rejection_codes.get_rejection_bit("Wind Stow Active")
+        missing_sample = rejection_codes.get_rejection_bit("Missing sample")
+        self.assertEqual(codes[:3].tolist(), [wind_stow, 0, wind_stow | missing_sample])
+        self.assertEqual(codes[-3:].tolist(), codes[:3].tolist())
+        self.assertEqual(len(rejection_codes.encode_rejection_reasons([])), 0)
+
+    def test_add_rejection_reason_list_layout(self):
+        df = pd.DataFrame({"is_valid": [1, 1, 1]})
+        df["rejection_reason"] = [[] for _ in range(len(df))]
+
+        df = rejection_codes.add_rejection_reason(df, df.index == 1, "Wind Stow Active")
+
+        self.assertEqual(df["is_valid"].tolist(), [1, 0, 1])
+        self.assertEqual(df["rejection_reason"].tolist(), [[], ["Wind Stow Active"], []])
+
+    def test_add_rejection_reason_lean_layout(self):
+        df = pd.DataFrame({"is_valid": np.ones(3, dtype=np.uint8), "rejection_code": np.zeros(3, dtype=np.uint64)})
+
+        df = rejection_codes.add_rejection_reason(df, df.index >= 1, "Point of Connection Limitation")
+        df = rejection_codes.add_rejection_reason(df, df.index == 2, "Wind Stow Active")
+
+        self.assertEqual(df["is_valid"].tolist(), [1, 0, 0])
+        self.assertEqual(df["is_valid"].dtype, np.uint8)
+        self.assertEqual(df["rejection_code"].dtype, np.uint64)
+
+        decoded = rejection_codes.decode_rejection_code_column(df)
+        self.assertNotIn("rejection_code", decoded.columns)
+        self.assertEqual(decoded["rejection_reason"].tolist(),
+                         [[], ["Point of Connection Limitation"], ["Point of Connection Limitation", "Wind Stow Active"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
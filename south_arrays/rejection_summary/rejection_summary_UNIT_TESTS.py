@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import rejection_summary
+import helper_functions_dir.helper_functions as helper_functions
+import rejection_codes.rejection_codes as rejection_codes
+
+
+POC_REASON = "Point of Connection Limitation"
+WIND_REASON = "Wind Stow Active"
+
+
+class TestRejectionSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.inverters = helper_functions.create_inverters()[:2]
+        self.constrained_reason = f"{self.inverters[0].name} is constrained (apparent power)"
+        dates = pd.to_datetime(["2024-01-10 10:00:00", "2024-01-10 10:00:03", "2024-01-10 11:00:00",
+                                "2024-01-11 10:00:00", "2024-01-11 10:00:03"])
+        self.df = pd.DataFrame({
+            'Date': dates,
+            'rejection_reason': [[POC_REASON], [POC_REASON, self.constrained_reason], [], [WIND_REASON],
+                                 [self.constrained_reason]],
+        })
+
+    def get_rows(self, summary_df, group, key, reason):
+        rows = summary_df[(summary_df['group'] == group) & (summary_df['key'] == key)
+                          & (summary_df['reason'] == reason)]['rows']
+        return int(rows.sum())
+
+    def test_totals(self):
+        summary_df = rejection_summary.summarize_3s_rejections(self.df, self.inverters)
+
+        self.assertEqual(self.get_rows(summary_df, "total", "all", POC_REASON), 2)
+        self.assertEqual(self.get_rows(summary_df, "total", "all", self.constrained_reason), 2)
+        self.assertEqual(self.get_rows(summary_df, "total", "all", rejection_summary.ANY_REASON), 4,
+                         "Rows with several reasons are only counted once.")
+        self.assertEqual(summary_df[summary_df['reason'] == WIND_REASON]['duration_s'].iloc[0], 3)
+
+    def test_groups(self):
+        summary_df = rejection_summary.summarize_3s_rejections(self.df, self.inverters)
+
+        self.assertEqual(self.get_rows(summary_df, "inverter", self.inverters[0].name, rejection_summary.ANY_REASON), 2)
+        self.assertEqual(self.get_rows(summary_df, "inverter", self.inverters[1].name, rejection_summary.ANY_REASON), 0)
+        self.assertEqual(self.get_rows(summary_df, "hour", "10:00", rejection_summary.ANY_REASON), 4)
+        self.assertEqual(self.get_rows(summary_df, "hour", "11:00", rejection_summary.ANY_REASON), 0)
+        self.assertEqual(self.get_rows(summary_df, "day", "2024-01-11", POC_REASON), 0)
+        self.assertEqual(self.get_rows(summary_df, "day", "2024-01-11", rejection_summary.ANY_REASON), 2)
+
+    def test_local_time(self):
+        utc_df = self.df.assign(Date=self.df['Date'] - pd.Timedelta(hours=13))
+
+        pd.testing.assert_frame_equal(
+            rejection_summary.summarize_3s_rejections(utc_df, self.inverters, local_timezone="Pacific/Auckland"),
+            rejection_summary.summarize_3s_rejections(self.df, self.inverters))
+
+    def test_lean_layout(self):
+        lean_df = self.df.drop(columns=['rejection_reason'])
+        lean_df['rejection_code'] = rejection_codes.encode_rejection_reasons(self.df['rejection_reason'])
+
+        pd.testing.assert_frame_equal(rejection_summary.summarize_3s_rejections(lean_df, self.inverters),
+                                      rejection_summary.summarize_3s_rejections(self.df, self.inverters))
+
+    def test_15_min_windows(self):
+        fifteen_min_df = pd.DataFrame({'15 Minute': pd.to_datetime(["2024-01-10 10:00:00", "2024-01-10 10:15:00"]),
+                                       'rejection_reason': [[WIND_REASON], []]})
+
+        summary_df = rejection_summary.summarize_15_min_rejections(fifteen_min_df)
+
+        self.assertEqual(summary_df['stage'].unique().tolist(), ["15min"])
+        self.assertEqual(summary_df[summary_df['group'] == "total"]['duration_s'].tolist(), [900, 900])
+        self.assertTrue(np.array_equal(summary_df.columns, rejection_summary.SUMMARY_COLUMNS))
+
+
+if __name__ == '__main__':
+    unittest.main()
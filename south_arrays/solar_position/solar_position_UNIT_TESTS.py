@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import solar_position
+
+
+class TestSolarPosition(unittest.TestCase):
+
+    def test_summer_noon_and_midnight(self):
+        # Around the December solstice the noon sun at 38 S is about 75 degrees high
+        elevation = solar_position.solar_elevation(solar_position.to_utc(["2024-12-21 13:00:00", "2024-12-21 01:00:00"]))
+
+        self.assertTrue(70 < elevation[0] < 80)
+        self.assertLess(elevation[1], -20)
+
+    def test_winter_noon(self):
+        elevation = solar_position.solar_elevation(solar_position.to_utc(["2024-06-21 12:15:00"]))
+        self.assertTrue(25 < elevation[0] < 32)
+
+    def test_daylight_saving_gap_is_not_night(self):
+        # 02:30 does not exist on the day daylight saving starts
+        night = solar_position.is_night(["2024-09-29 02:30:00", "2024-09-29 03:30:00"])
+        np.testing.assert_array_equal(night, [False, True])
+
+    def test_to_utc(self):
+        self.assertEqual(solar_position.to_utc(["2024-01-10 13:00:00"])[0], pd.Timestamp("2024-01-10 00:00:00"))
+
+    def test_to_local(self):
+        local = ["2024-01-10 13:00:00", "2024-06-10 12:00:00"]
+
+        self.assertEqual(solar_position.to_local(solar_position.to_utc(local)).tolist(), pd.to_datetime(local).tolist())
+        self.assertEqual(solar_position.to_local(local, None).tolist(), pd.to_datetime(local).tolist())
+        self.assertEqual(solar_position.standard_utc_offset(), pd.Timedelta(hours=12))
+
+
+if __name__ == '__main__':
+    unittest.main()
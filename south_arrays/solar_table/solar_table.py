@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import solar_position.solar_position as solar_position
+import time_grid.time_grid as time_grid
+
+# This file contains the per 15 minute solar table of the site.
+# Solar elevation and clear-sky GHI are computed for every 15 minute window of a year in one vectorized pass,
+# saved to disk and kept in memory, so filters can look up time-varying references at no per-window cost.
+
+CACHE_DIR = "cache"
+TABLE_VERSION = 1  # Increase when the table contents change, so old cache files are rebuilt
+
+# Tables already loaded in this process, by cache key
+_loaded_tables = {}
+
+
+class SolarTable:
+    """
+    Solar elevation and clear-sky GHI for consecutive 15 minute windows (local time).
+
+    - solar_elevation: elevation at the middle of the window (degrees)
+    - max_solar_elevation: highest elevation over the window (start, middle and end)
+    - clear_sky_ghi: Haurwitz clear-sky GHI at the middle of the window (W/m2)
+    """
+
+    def __init__(self, first_slot, solar_elevation, max_solar_elevation, clear_sky_ghi):
+        self.grid = time_grid.TimeGrid(first_slot, first_slot + len(solar_elevation) - 1, "15min")
+        self.solar_elevation = solar_elevation
+        self.max_solar_elevation = max_solar_elevation
+        self.clear_sky_ghi = clear_sky_ghi
+
+    def lookup(self, column, dates):
+        """
+        Returns the values of a column for the windows containing dates (NaN outside the table).
+        """
+        values = getattr(self, column)
+        positions = self.grid.positions(dates)
+        inside = (positions >= 0) & (positions < self.grid.size)
+        result = np.full(len(positions), np.nan)
+        result[inside] = values[positions[inside]]
+        return result
+
+    def is_night(self, dates):
+        """
+        Returns True for windows where the sun stays below the horizon.
+        """
+        with np.errstate(invalid="ignore"):
+            return self.lookup('max_solar_elevation', dates) < 0
+
+
+def build_year(year, latitude=solar_position.SITE_LATITUDE, longitude=solar_position.SITE_LONGITUDE,
+               timezone=solar_position.SITE_TIMEZONE):
+    """
+    Computes the solar table of one year.
+    """
+    starts = pd.date_range(f"{year}-01-01", f"{year}-12-31 23:45:00", freq="15min")
+
+    elevations = [
+        solar_position.solar_elevation(solar_position.to_utc(starts + pd.Timedelta(minutes=offset), timezone),
+                                       latitude, longitude)
+        for offset in [0, 7.5, 15]
+    ]
+
+    return SolarTable(
+        int(time_grid.to_slots(starts[:1], "15min")[0]),
+        solar_elevation=elevations[1],
+        max_solar_elevation=np.max(elevations, axis=0),
+        clear_sky_ghi=solar_position.clear_sky_ghi(elevations[1]),
+    )
+
+
+def load_year(year, latitude=solar_position.SITE_LATITUDE, longitude=solar_position.SITE_LONGITUDE,
+              timezone=solar_position.SITE_TIMEZONE, cache_dir=None):
+    """
+    Returns the solar table of one year, from memory, from the cache file or freshly computed (and saved).
+    The cache file is kept in cache_dir (CACHE_DIR by default).
+    """
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    key = (year, latitude, longitude, timezone, TABLE_VERSION)
+    if key in _loaded_tables:
+        return _loaded_tables[key]
+
+    filename = os.path.join(cache_dir, f"solar_table_{year}_{latitude}_{longitude}_{timezone.replace('/', '-')}.npz")
+
+    table = None
+    if os.path.exists(filename):
+        with np.load(filename) as data:
+            if int(data['version']) == TABLE_VERSION and str(data['timezone']) == str(timezone):
+                table = SolarTable(int(data['first_slot']), data['solar_elevation'], data['max_solar_elevation'],
+                                   data['clear_sky_ghi'])
+
+    if table is None:
+        table = build_year(year, latitude, longitude, timezone)
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(filename, version=TABLE_VERSION, timezone=str(timezone), first_slot=table.grid.first_slot,
+                 solar_elevation=table.solar_elevation, max_solar_elevation=table.max_solar_elevation,
+                 clear_sky_ghi=table.clear_sky_ghi)
+
+    _loaded_tables[key] = table
+    return table
+
+
+def load_for_dates(dates, cache_dir=None, timezone=solar_position.SITE_TIMEZONE):
+    """
+    Returns one solar table covering every year in dates.
+    timezone is the timezone of dates ("UTC" for timestamps normalized by the loader).
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    years = range(dates.min().year, dates.max().year + 1)
+    tables = [load_year(year, timezone=timezone, cache_dir=cache_dir) for year in years]
+    if len(tables) == 1:
+        return tables[0]
+
+    return SolarTable(
+        tables[0].grid.first_slot,
+        np.concatenate([table.solar_elevation for table in tables]),
+        np.concatenate([table.max_solar_elevation for table in tables]),
+        np.concatenate([table.clear_sky_ghi for table in tables]),
+    )
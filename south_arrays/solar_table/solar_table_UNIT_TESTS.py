@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import solar_table
+
+
+class TestSolarTable(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        solar_table._loaded_tables.clear()
+
+    def tearDown(self):
+        solar_table._loaded_tables.clear()
+        self.cache_dir.cleanup()
+
+    def test_build_year(self):
+        table = solar_table.build_year(2024)
+
+        self.assertEqual(table.grid.size, 366 * 96)
+        self.assertEqual(table.grid.slot_times()[0], pd.Timestamp("2024-01-01 00:00:00"))
+        self.assertEqual(np.nanmin(table.clear_sky_ghi), 0)
+        self.assertTrue(np.nanmax(table.clear_sky_ghi) < 1098)
+
+    def test_lookup(self):
+        table = solar_table.build_year(2024)
+        dates = pd.to_datetime(["2024-12-21 13:05:00", "2024-12-21 01:00:00", "2025-01-01 12:00:00"])
+
+        clear_sky_ghi = table.lookup('clear_sky_ghi', dates)
+
+        self.assertTrue(900 < clear_sky_ghi[0] < 1100)
+        self.assertEqual(clear_sky_ghi[1], 0)
+        self.assertTrue(np.isnan(clear_sky_ghi[2]))
+        np.testing.assert_array_equal(table.is_night(dates), [False, True, False])
+
+    def test_cache_file_is_reused(self):
+        table = solar_table.load_year(2024, cache_dir=self.cache_dir.name)
+        self.assertIs(solar_table.load_year(2024, cache_dir=self.cache_dir.name), table)
+
+        filename = os.path.join(self.cache_dir.name, os.listdir(self.cache_dir.name)[0])
+        modified = os.path.getmtime(filename)
+        solar_table._loaded_tables.clear()
+        reloaded = solar_table.load_year(2024, cache_dir=self.cache_dir.name)
+
+        self.assertEqual(os.path.getmtime(filename), modified)
+        np.testing.assert_array_equal(reloaded.clear_sky_ghi, table.clear_sky_ghi)
+
+    def test_timezone(self):
+        # Midnight UTC is the middle of the day in New Zealand
+        dates = pd.to_datetime(["2024-01-10 00:00:00"])
+
+        self.assertTrue(solar_table.load_for_dates(dates, cache_dir=self.cache_dir.name).is_night(dates)[0])
+        self.assertFalse(solar_table.load_for_dates(dates, cache_dir=self.cache_dir.name,
+                                                    timezone="UTC").is_night(dates)[0])
+
+    def test_several_years(self):
+        dates = pd.to_datetime(["2023-12-31 23:50:00", "2024-01-01 00:05:00"])
+        table = solar_table.load_for_dates(dates, cache_dir=self.cache_dir.name)
+
+        self.assertEqual(table.grid.size, (365 + 366) * 96)
+        self.assertFalse(np.isnan(table.lookup('solar_elevation', dates)).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
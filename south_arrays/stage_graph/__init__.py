@@ -0,0 +1 @@
+# This file makes the stage_graph directory a Python package
@@ -0,0 +1,170 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import stage_graph
+import helper_functions_dir.helper_functions as helper_functions
+import three_sec_filters.three_sec_filters as three_sec_filters
+
+
+def write_raw_csv(filename, inverters, rows=600, seed=1):
+    """
+    Writes 30 minutes of raw 3 second data in the SCADA export format, with a wind gust above the stow threshold
+    and the point of connection at its apparent power limit.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'Date': pd.date_range("2024-01-10 10:00:00", periods=rows, freq="3s")})
+    for col in helper_functions.get_required_columns(inverters)[1:]:
+        df[col] = 1000 + rng.normal(0, 10, rows)
+    for inverter in inverters:
+        df[inverter.NRM_scada_tag] = 4.0
+    df[three_sec_filters.WS211_WIND_SPEED_TAG] = 5 + rng.normal(0, 0.5, rows)
+    df.loc[100:110, three_sec_filters.WS211_WIND_SPEED_TAG] = 13.0
+    df.loc[300:320, three_sec_filters.POC_APPARENT_POWER_TAG] = 36000.0
+
+    df['Date'] = df['Date'].dt.strftime("%d/%m/%Y %I:%M:%S %p")
+    with open(filename, "w") as f:
+        f.write("\n" * 5)
+    df.to_csv(filename, mode="a", index=False)
+
+
+class TestStageGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.calls = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build_graph(self, scale=2, offset=1):
+        graph = stage_graph.StageGraph(self.directory.name)
+
+        def source():
+            self.calls.append("source")
+            return pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]})
+
+        def scaled(df, factor):
+            self.calls.append("scaled")
+            return df['a'] * factor
+
+        def shifted(values, offset):
+            self.calls.append("shifted")
+            return values + offset
+
+        graph.add(stage_graph.Stage("source", source, key=self.source_key))
+        graph.add(stage_graph.Stage("scaled", scaled, inputs=[("source", ['a'])], params={'factor': scale}))
+        graph.add(stage_graph.Stage("shifted", shifted, inputs=["scaled"], params={'offset': offset}))
+        return graph
+
+    def run_graph(self, **kwargs):
+        self.calls = []
+        graph = self.build_graph(**kwargs)
+        value = graph.value("shifted")
+        graph.save()
+        return graph, value
+
+    def test_reuses_cached_values(self):
+        self.source_key = 1
+        _, value = self.run_graph()
+        self.assertEqual(self.calls, ["source", "scaled", "shifted"])
+        self.assertEqual(value.tolist(), [3, 5, 7])
+
+        graph, value = self.run_graph()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(value.tolist(), [3, 5, 7])
+        self.assertEqual(graph.status, {'shifted': "cached"})
+
+        _, value = self.run_graph(offset=2)
+        self.assertEqual(self.calls, ["shifted"])
+        self.assertEqual(value.tolist(), [4, 6, 8])
+
+    def test_unchanged_columns(self):
+        # The source runs again, but column a does not change, so scaled is read from the cache
+        self.source_key = 1
+        self.run_graph()
+        self.source_key = 2
+        _, value = self.run_graph()
+
+        self.assertEqual(self.calls, ["source"])
+        self.assertEqual(value.tolist(), [3, 5, 7])
+
+    def test_file_stage(self):
+        self.source_key = 1
+        filename = os.path.join(self.directory.name, "shifted.csv")
+
+        def build():
+            graph = self.build_graph()
+            graph.add(stage_graph.Stage("export", lambda values: values.to_csv(filename), inputs=["shifted"],
+                                        files=[filename]))
+            return graph
+
+        graph = build()
+        graph.run()
+        graph.save()
+        self.assertTrue(os.path.exists(filename))
+
+        graph = build()
+        graph.run()
+        self.assertEqual(graph.status, {'export': "up to date"})
+
+        os.remove(filename)
+        graph = build()
+        graph.run()
+        self.assertEqual(graph.status['export'], "ran")
+        self.assertEqual(graph.status['shifted'], "cached")
+
+    def test_unknown_input(self):
+        graph = stage_graph.StageGraph(self.directory.name)
+        with self.assertRaises(ValueError):
+            graph.add(stage_graph.Stage("scaled", lambda df: df, inputs=["source"]))
+
+
+class TestSiteGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.inverters = helper_functions.create_inverters()
+        self.filename = os.path.join(self.directory.name, "raw.csv")
+        write_raw_csv(self.filename, self.inverters)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def build_graph(self, filter_config=None, lean=False):
+        return stage_graph.build_site_graph(self.filename, self.inverters, filter_config, lean=lean,
+                                            cache_dir=os.path.join(self.directory.name, "cache"))
+
+    def test_matches_three_second_filters(self):
+        for lean in [False, True]:
+            with self.subTest(lean=lean), contextlib.redirect_stdout(io.StringIO()):
+                df = self.build_graph(lean=lean).value("3s")
+                raw_df, inverters = helper_functions.load_and_initialize_df(self.filename, lean=lean)
+                expected = helper_functions.apply_three_second_filters(raw_df, inverters)
+
+            pd.testing.assert_frame_equal(df, expected)
+            self.assertGreater((df['is_valid'] == 0).sum(), 0)
+
+    def test_changed_filter_parameter(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            graph = self.build_graph()
+            graph.value("15min")
+            graph.save()
+
+            graph = self.build_graph({"wind_stow": {"params": {"stow_start_threshold": 20}}})
+            df = graph.value("15min")
+
+        self.assertEqual(graph.status['3s:wind_stow'], "ran")
+        self.assertEqual(graph.status['3s:point_of_connection_constraint'], "cached")
+        self.assertEqual(graph.status['load'], "cached")
+        self.assertEqual(len(df), 2)
+        self.assertFalse(graph.value("3s")['rejection_reason'].apply(lambda x: "Wind Stow Active" in x).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
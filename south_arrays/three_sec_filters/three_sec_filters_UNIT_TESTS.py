@@ -1,14 +1,44 @@
+import os
 import unittest
 
-import three_sec_filters
+import numpy as np
+import pandas as pd
+
+# Run from the arrays directory (python -m unittest three_sec_filters.three_sec_filters_UNIT_TESTS): there
+# three_sec_filters is the package the other modules import, not this directory's module
+from three_sec_filters import three_sec_filters
+
+from helper_functions_dir.helper_functions import create_inverters, load_and_initialize_df
+
+TEST_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "unit_test_data")
+
+
+def make_3s_df(power, dates=None):
+    """
+    3 second data with the POC active power, from 10 am unless dates are given.
+    """
+    if dates is None:
+        dates = pd.date_range("2024-01-10 10:00:00", periods=len(power), freq="3s")
+    df = pd.DataFrame({'Date': pd.to_datetime(dates), three_sec_filters.POC_ACTIVE_POWER_TAG: power, 'is_valid': 1})
+    df['rejection_reason'] = [[] for _ in range(len(df))]
+    return df
+
+
+def make_clear_sky_noon(seed=1):
+    """
+    3 second data of a clear day from 10 am to 4 pm: a 28 MW peak at solar noon with 20 kW of noise.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-10 10:00:00", "2024-01-10 15:59:57", freq="3s")
+    hours_from_noon = (dates - pd.Timestamp("2024-01-10 13:15:00")) / pd.Timedelta(hours=1)
+    return make_3s_df(28000 * np.cos(hours_from_noon / 7 * np.pi) ** 2 + rng.normal(0, 20, len(dates)), dates)
 
-from helper_functions import load_and_initialize_df
 
 class TestPointOfConnectionLimitation(unittest.TestCase):
 
     def setUp(self):
         # Read the CSV data from the file
-        self.filename = 'unit_test_data/point_of_connection_limitation_test_data.csv'
+        self.filename = os.path.join(TEST_DATA_DIR, 'point_of_connection_limitation_test_data.csv')
         self.df, _ = load_and_initialize_df(self.filename)
 
     def test_point_of_connection_limitation(self):
@@ -43,7 +73,7 @@ class TestFilterConstrainedInverters(unittest.TestCase):
 
     def setUp(self):
         # Read the CSV data from the file
-        self.filename = 'unit_test_data/filter_constrained_inverters_test_data.csv'
+        self.filename = os.path.join(TEST_DATA_DIR, 'filter_constrained_inverters_test_data.csv')
         self.df, self.inverters = load_and_initialize_df(self.filename)
 
     def test_filter_constrained_inverters(self):
@@ -95,5 +125,92 @@ class TestFilterConstrainedInverters(unittest.TestCase):
         # self.assertEqual(df.loc[6, 'is_valid'], 1)
         # self.assertEqual(df.loc[7, 'is_valid'], 0)
 
+
+class TestFilterACCurtailmentPeriods(unittest.TestCase):
+
+    def make_df(self, power, setpoint=None):
+        df = make_3s_df(power)
+        if setpoint is not None:
+            df['setpoint'] = setpoint
+        return df
+
+    def test_flat_output(self):
+        # Rising output, held flat for 10 minutes, rising again
+        power = np.concatenate([np.linspace(10000, 19000, 100), np.full(200, 20000.0) + np.tile([0, 50], 100),
+                                np.linspace(21000, 25000, 100)])
+        df = three_sec_filters.filter_ac_curtailment_periods(self.make_df(power))
+
+        self.assertTrue((df['is_valid'].iloc[100:300] == 0).all())
+        self.assertTrue((df['is_valid'].iloc[:100] == 1).all())
+        self.assertTrue((df['is_valid'].iloc[300:] == 1).all())
+        self.assertEqual(df.loc[150, 'rejection_reason'], ["AC Curtailment"])
+
+    def test_short_or_low_flat_output_is_kept(self):
+        # Flat for 2 minutes only, then flat below the minimum power
+        power = np.concatenate([np.linspace(10000, 20000, 100), np.full(40, 20000.0), np.linspace(20000, 25000, 100),
+                                np.full(200, 1000.0)])
+        df = three_sec_filters.filter_ac_curtailment_periods(self.make_df(power))
+
+        self.assertTrue((df['is_valid'] == 1).all())
+
+    def test_setpoint(self):
+        # Output follows a 15 MW setpoint for 6 minutes, then the setpoint is released
+        power = np.full(240, 14950.0)
+        setpoint = np.concatenate([np.full(120, 15000.0), np.full(120, 30000.0)])
+        df = three_sec_filters.filter_ac_curtailment_periods(self.make_df(power, setpoint), setpoint_tag='setpoint')
+
+        self.assertTrue((df['is_valid'].iloc[:120] == 0).all())
+        self.assertTrue((df['is_valid'].iloc[120:] == 1).all())
+
+        # A setpoint period shorter than the minimum duration is kept
+        df = three_sec_filters.filter_ac_curtailment_periods(self.make_df(power, setpoint), setpoint_tag='setpoint',
+                                                             min_duration_seconds=600)
+        self.assertTrue((df['is_valid'] == 1).all())
+
+    def test_clear_sky_noon_plateau(self):
+        # Without a setpoint, the plateau around solar noon looks like curtailment (why the filter is disabled by
+        # default), with a setpoint at the rating it is kept
+        df = three_sec_filters.filter_ac_curtailment_periods(make_clear_sky_noon())
+        self.assertGreater((df['is_valid'] == 0).sum(), 0)
+
+        df = make_clear_sky_noon()
+        df['setpoint'] = 30000.0
+        df = three_sec_filters.filter_ac_curtailment_periods(df, setpoint_tag='setpoint')
+        self.assertTrue((df['is_valid'] == 1).all())
+
+
+class TestFilterBadPowerPoints(unittest.TestCase):
+
+    def setUp(self):
+        self.inverter = create_inverters()[0]
+
+    def test_filter_bad_power_points(self):
+        df = make_3s_df([10000, 10100, 25000, 10200, np.nan, -20, -500])
+        df[self.inverter.active_power_scada_tag] = [2000, 2000, 2000, 100, 2000, 2000, 2000]
+
+        df = three_sec_filters.filter_bad_power_points(df, [self.inverter])
+
+        self.assertEqual(df['is_valid'].tolist(), [1, 1, 0, 0, 0, 1, 0])
+        self.assertEqual(df.loc[2, 'rejection_reason'], ["Bad power point at POC"])
+        self.assertEqual(df.loc[3, 'rejection_reason'], [f"{self.inverter.name} has a bad power point"])
+        self.assertEqual(df.loc[4, 'rejection_reason'], ["Bad power point at POC"])
+        self.assertEqual(df.loc[6, 'rejection_reason'], ["Bad power point at POC"])
+
+    def test_spike_neighbours(self):
+        # The night rows between 10:00:06 and 10:05:00 were pruned: 25000 is not a spike next to the gap
+        dates = ["2024-01-10 10:00:00", "2024-01-10 10:00:03", "2024-01-10 10:00:06", "2024-01-10 10:05:00",
+                 "2024-01-10 10:05:03"]
+        df = make_3s_df([10000, 10100, 25000, 10200, 10300], dates)
+        df[self.inverter.active_power_scada_tag] = 2000.0
+
+        whole_df = three_sec_filters.filter_bad_power_points(df.copy(), [self.inverter])
+        self.assertTrue((whole_df['is_valid'] == 1).all())
+
+        # Nor does it depend on the chunks the rows are passed in
+        chunks = [three_sec_filters.filter_bad_power_points(df.iloc[rows].copy(), [self.inverter])
+                  for rows in [slice(0, 2), slice(2, 4), slice(4, 5)]]
+        pd.testing.assert_frame_equal(pd.concat(chunks), whole_df)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,354 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+import fifteen_min_filters.fifteen_min_filters as fifteen_min_filters
+import filter_pipeline.filter_pipeline as filter_pipeline
+import helper_functions_dir.helper_functions as helper_functions
+import kernels.kernels as kernels
+import solar_position.solar_position as solar_position
+import time_grid.time_grid as time_grid
+
+# This file contains the window engine of the 15 minute filters, for windows of any length (5, 10, 15, 60 minutes).
+# The 1 minute data is read once into prefix sums: of the values and their squares (means and standard deviations)
+# and of the changes between consecutive readings (dead values). The statistics of a window are then differences
+# of the prefix sums at its first and last row, so every window length costs a binary search per window.
+# Windows never cross midnight, so the values are summed as deviations from the mean of their day, in extended
+# precision: the sums of years of data keep the precision of the window statistics.
+# The largest change of a window and the power dead value scan are read window by window (one pass per length).
+# Every filter has a reason rule that returns its rejection reasons with the windows they apply to, in the order
+# the filter adds them, so the engine gives the same table as apply_15_min_filter with the same period.
+
+MINUTES_PER_DAY = 1440
+DEAD_VALUE_CHANGE = 0.0001  # Largest change of a dead (stuck) signal, as in the dead value filters
+IRRADIANCE_DEAD_VALUE_MINIMUM = 5  # Irradiance readings at or below this are ignored by the dead value check
+
+# SCADA tags of the window statistics, by statistic name
+GHI_TAG, POA_TAG = fifteen_min_filters.REQUIRED_COLUMNS['irradiance']
+IRRADIANCE_DEAD_VALUE_TAGS = {'ghi': GHI_TAG}  # Checked by the dead value filter
+TEMPERATURE_TAGS = {'temperature_211': fifteen_min_filters.WS211_TEMPERATURE_TAG,
+                    'temperature_241': fifteen_min_filters.WS241_TEMPERATURE_TAG}
+WIND_SPEED_TAGS = {'wind_211': fifteen_min_filters.WS211_WIND_SPEED_TAG,
+                   'wind_241': fifteen_min_filters.WS241_WIND_SPEED_TAG}
+POWER_TAG = fifteen_min_filters.POC_ACTIVE_POWER_TAG
+
+
+def prefix_sums(values, dtype=np.int64):
+    """
+    Returns the sums of the first 0 to n values (n + 1 sums, the first 0).
+    """
+    sums = np.zeros(len(values) + 1, dtype=dtype)
+    np.cumsum(values, dtype=dtype, out=sums[1:])
+    return sums
+
+
+class PrefixSeries:
+    """
+    The readings of one column, sorted by minute, with the prefix sums of:
+    - sums, squares, counts: the non-NaN values (as deviations from the mean of their day, offsets), their
+      squares and their number
+    - measured, moving, large: the changes between consecutive readings that are not NaN, not 0, and at least
+      DEAD_VALUE_CHANGE (change i is between readings i and i + 1)
+    """
+
+    def __init__(self, slots, values):
+        self.slots = slots
+        self.values = values
+        not_nan = ~np.isnan(values)
+        _, days = np.unique(slots // MINUTES_PER_DAY, return_inverse=True)
+        day_counts = np.bincount(days, not_nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            day_means = np.where(day_counts > 0, np.bincount(days, np.where(not_nan, values, 0.0)) / day_counts, 0.0)
+        self.offsets = day_means[days]
+        deviations = np.where(not_nan, values - self.offsets, 0.0).astype(np.longdouble)
+        self.sums = prefix_sums(deviations, np.longdouble)
+        self.squares = prefix_sums(deviations ** 2, np.longdouble)
+        self.counts = prefix_sums(not_nan)
+
+        self.changes = np.abs(np.diff(values))
+        measured = ~np.isnan(self.changes)
+        self.measured = prefix_sums(measured)
+        self.moving = prefix_sums(measured & (self.changes != 0))
+        self.large = prefix_sums(measured & (self.changes >= DEAD_VALUE_CHANGE))
+
+    def subset(self, keep):
+        return PrefixSeries(self.slots[keep], self.values[keep])
+
+    def bounds(self, windows, minutes):
+        """
+        Returns the first and last (excluded) reading of every window (numbered in windows of minutes minutes).
+        """
+        return (np.searchsorted(self.slots, windows * minutes, side="left"),
+                np.searchsorted(self.slots, (windows + 1) * minutes, side="left"))
+
+    def count(self, prefix, starts, ends, changes=False):
+        # Sum of a prefix over every window: its readings, or the changes between its readings
+        if changes:
+            ends = (ends - 1).clip(min=0)
+            starts = np.minimum(starts, ends)
+        return prefix[ends] - prefix[starts]
+
+    def means(self, starts, ends):
+        """
+        Mean of every window, as pandas Series.mean. Call on the non-NaN readings, so constant windows (no change
+        between readings) are exactly their value.
+        """
+        counts = self.count(self.counts, starts, ends)
+        if not len(self.values):
+            return np.full(len(starts), np.nan)
+        first = starts.clip(max=len(self.values) - 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (self.count(self.sums, starts, ends) / counts).astype(np.float64) + self.offsets[first]
+        means = np.where(self.count(self.moving, starts, ends, changes=True) == 0, self.values[first], means)
+        return np.where(counts > 0, means, np.nan)
+
+    def stds(self, starts, ends):
+        """
+        Sample standard deviation (ddof=1, NaN ignored) of every window, as pandas Series.std. Call on the
+        non-NaN readings, so constant windows (no change between readings) are exactly 0.
+        """
+        counts = self.count(self.counts, starts, ends)
+        sums = self.count(self.sums, starts, ends)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variances = (self.count(self.squares, starts, ends) - sums * sums / counts) / (counts - 1)
+        stds = np.sqrt(variances.astype(np.float64).clip(min=0))
+        stds[self.count(self.moving, starts, ends, changes=True) == 0] = 0.0
+        return np.where(counts > 1, stds, np.nan)
+
+    def dead(self, starts, ends):
+        # At least one change between readings, all below DEAD_VALUE_CHANGE
+        return ((self.count(self.measured, starts, ends, changes=True) > 0)
+                & (self.count(self.large, starts, ends, changes=True) == 0))
+
+    def largest_changes(self, starts, ends):
+        """
+        Largest change between readings of every window (NaN without changes). The windows must cover the
+        readings one after the other.
+        """
+        changes = np.append(self.changes, np.nan)
+        changes[ends - 1] = np.nan  # Changes across windows
+        return np.fmax.reduceat(changes, starts) if len(starts) else np.zeros(0)
+
+
+class MinuteStatistics:
+    """
+    The 1 minute data as prefix series of the columns the rules read, built once for every window length.
+    """
+
+    def __init__(self, one_minute_df):
+        slots = time_grid.to_slots(pd.to_datetime(one_minute_df[one_minute_df.columns[0]]), "1min")
+        order = np.argsort(slots, kind="stable")
+        self.slots = np.asarray(slots)[order]
+        self.numeric_cols = list(one_minute_df.iloc[:, 1:].select_dtypes(include=['number']).columns)
+        self.values = one_minute_df[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+
+        def column(tag):
+            return one_minute_df[tag].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+
+        # Every reading (changes and dead values), the non-NaN readings (means and standard deviations)
+        self.series = {}
+        self.present = {}
+        tags = [GHI_TAG, POA_TAG, POWER_TAG] + list(TEMPERATURE_TAGS.values()) + list(WIND_SPEED_TAGS.values())
+        for tag in tags:
+            self.series[tag] = PrefixSeries(self.slots, column(tag))
+            self.present[tag] = self.series[tag].subset(~np.isnan(self.series[tag].values))
+
+        # Irradiance readings above IRRADIANCE_DEAD_VALUE_MINIMUM, for the irradiance dead value check
+        self.irradiance_above = {tag: self.series[tag].subset(self.series[tag].values > IRRADIANCE_DEAD_VALUE_MINIMUM)
+                                 for tag in IRRADIANCE_DEAD_VALUE_TAGS.values()}
+
+    def windows(self, period):
+        """
+        Returns the windows of the period with data (numbered from the time grid epoch), and the first and last
+        (excluded) row of each.
+        """
+        minutes = helper_functions.window_minutes(period)
+        windows, starts, ends = time_grid.window_boundaries(self.slots // minutes)
+        return windows.astype(np.int64), starts, ends
+
+    def window_times(self, period):
+        windows, _, _ = self.windows(period)
+        return pd.to_datetime(time_grid.EPOCH.value + windows * pd.Timedelta(period).value)
+
+    def window_statistics(self, period="15min"):
+        """
+        Returns the statistics of every window of the period read by the rules, as arrays with one value per
+        window, and the window start times (window_column of the period, e.g. '15 Minute').
+        The clear-sky GHI of the windows ('reference_ghi') is NaN until it is looked up (see add_reference_ghi).
+        """
+        minutes = helper_functions.window_minutes(period)
+        windows, starts, ends = self.windows(period)
+
+        def present(tag, statistic):
+            return getattr(self.present[tag], statistic)(*self.present[tag].bounds(windows, minutes))
+
+        stats = {
+            helper_functions.window_column(period): self.window_times(period),
+            'rows': ends - starts,
+            'ghi_mean': present(GHI_TAG, 'means'),
+            'ghi_std': present(GHI_TAG, 'stds'),
+            'poa_mean': present(POA_TAG, 'means'),
+            'power_mean': present(POWER_TAG, 'means'),
+            'power_std': present(POWER_TAG, 'stds'),
+            'reference_ghi': np.full(len(windows), np.nan),
+        }
+        for name, tag in IRRADIANCE_DEAD_VALUE_TAGS.items():
+            stats[f'{name}_dead'] = self.irradiance_above[tag].dead(*self.irradiance_above[tag].bounds(windows,
+                                                                                                      minutes))
+        stats['irradiance_dead'] = functools.reduce(np.logical_or, (stats[f'{name}_dead']
+                                                                    for name in IRRADIANCE_DEAD_VALUE_TAGS))
+        for name, tag in {**TEMPERATURE_TAGS, **WIND_SPEED_TAGS}.items():
+            if name in TEMPERATURE_TAGS:
+                stats[f'{name}_mean'] = present(tag, 'means')
+            stats[f'{name}_largest_change'] = self.series[tag].largest_changes(starts, ends)
+            stats[f'{name}_dead'] = self.series[tag].dead(starts, ends)
+
+        # 1 minute power readings of every window, for the sequential dead value scan
+        stats['power_windows'] = np.split(self.series[POWER_TAG].values, starts[1:])
+        return stats
+
+    def window_means(self, period="15min"):
+        """
+        Returns the mean of every numeric column over every window of the period, ignoring NaN values.
+        """
+        _, starts, _ = self.windows(period)
+        if not len(starts):
+            return np.zeros((0, len(self.numeric_cols)))
+        not_nan = ~np.isnan(self.values)
+        sums = np.add.reduceat(np.where(not_nan, self.values, 0.0), starts)
+        counts = np.add.reduceat(not_nan, starts, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+
+# Reason rules: filter name -> function(stats, **params) -> list of (rejection reason, True where the window is
+# rejected), in the order the filter adds its reasons. Parameters are scalars, or columns (combinations x 1) for
+# parameters swept against the row of windows (see parameter_sweep).
+
+def _irradiance_range(stats, TRC, POA_lower_limit, reference="constant"):
+    if reference not in ("constant", "clear_sky"):
+        raise ValueError(f"Unknown irradiance reference: {reference}")
+    reference_ghi = TRC
+    if reference == "clear_sky":
+        reference_ghi = np.where(np.isnan(stats['reference_ghi']), TRC, stats['reference_ghi'])
+    ghi = stats['ghi_mean']
+    return [("Irradiance - Range - WS211_ghi_lower_limit", ~((reference_ghi * 0.5) < ghi)),
+            ("Irradiance - Range - WS211_ghi_upper_limit", ~(ghi < (reference_ghi * 1.2))),
+            ("Irradiance - Range - WS211_poa_lower_limit", ~(POA_lower_limit < stats['poa_mean']))]
+
+
+def _irradiance_dead_value(stats):
+    return [("Irradiance - Dead value - WS211", stats[f'{name}_dead']) for name in IRRADIANCE_DEAD_VALUE_TAGS]
+
+
+def _temperature_range(stats, lower_temp_limit=-10, upper_temp_limit=50):
+    return [(f"Temperature - Range - WS{station}",
+             ~((lower_temp_limit < stats[f'temperature_{station}_mean'])
+               & (stats[f'temperature_{station}_mean'] < upper_temp_limit)))
+            for station in ("211", "241")]
+
+
+def _power_range(stats, rating):
+    return [("Power - Range", ~((-0.01 * rating <= stats['power_mean']) & (stats['power_mean'] <= 1.02 * rating)))]
+
+
+def _power_dead_value(stats, backend="auto", threshold_pct=0.1, run_length=3):
+    # Sequential scan, evaluated window by window
+    longest_runs = np.array([kernels.longest_small_change_run(values, threshold_pct, backend=backend)
+                             for values in stats['power_windows']])
+    return [("Power - Dead value", longest_runs >= run_length)]
+
+
+REASON_RULES = {
+    'irradiance_range': _irradiance_range,
+    'irradiance_dead_value': _irradiance_dead_value,
+    'irradiance_abrupt_change': lambda stats, max_std_ratio=0.05:
+        [("Irradiance - Abrupt change - WS211", stats['ghi_std'] > max_std_ratio * stats['ghi_mean'])],
+    'temperature_range': _temperature_range,
+    'temperature_dead_value': lambda stats:
+        [(f"Temperature - Dead value - WS{station}", stats[f'temperature_{station}_dead'])
+         for station in ("211", "241")],
+    'temperature_abrupt_change': lambda stats, max_change=4:
+        [(f"Temperature - Abrupt change - WS{station}", stats[f'temperature_{station}_largest_change'] > max_change)
+         for station in ("211", "241")],
+    'wind_dead_value': lambda stats:
+        [(f"Wind - Dead value - WS{station}", stats[f'wind_{station}_dead']) for station in ("211", "241")],
+    'wind_abrupt_change': lambda stats, max_change=10:
+        [(f"Wind - Abrupt change - WS{station}", stats[f'wind_{station}_largest_change'] > max_change)
+         for station in ("211", "241")],
+    'power_range': _power_range,
+    'power_dead_value': _power_dead_value,
+    'power_abrupt_change': lambda stats, max_std_ratio=0.05:
+        [("Power - Abrupt change", stats['power_std'] > max_std_ratio * stats['power_mean'])],
+}
+
+
+def rule_params(spec, params, backend="auto"):
+    """
+    Returns the keyword arguments of the reason rule of a pipeline step.
+    """
+    if spec.name not in REASON_RULES:
+        raise ValueError(f"Filter {spec.name} has no window engine rule")
+    params = dict(params)
+    if spec.name == 'power_dead_value':
+        params['backend'] = backend
+    return params
+
+
+def apply_window_filters(one_minute_df, period="15min", backend="auto", filter_config=None,
+                         timezone=solar_position.SITE_TIMEZONE, minute_stats=None):
+    """
+    Applies the 15 minute filters to windows of the period, with the statistics of the window engine.
+    Returns the same table as apply_15_min_filter with the same period: one row per window with the mean of its
+    rows, is_valid and the rejection reasons in the order the filters add them.
+
+    - period: length of the windows, a whole number of minutes dividing a day (e.g. "5min", "1h")
+    - minute_stats: MinuteStatistics of one_minute_df, to share between periods (see evaluate_periods)
+    """
+    time_col = helper_functions.window_column(period)
+    pipeline = filter_pipeline.build_pipeline("15min", filter_config)
+    if one_minute_df.empty:
+        numeric_cols = list(one_minute_df.iloc[:, 1:].select_dtypes(include=['number']).columns)
+        return pd.DataFrame(columns=[time_col] + numeric_cols + ['is_valid', 'rejection_reason'])
+    minute_stats = minute_stats or MinuteStatistics(one_minute_df)
+
+    stats = minute_stats.window_statistics(period)
+    reference_ghi = helper_functions.get_reference_ghi(pipeline, stats[time_col], timezone)
+    if reference_ghi is not None:
+        stats['reference_ghi'] = reference_ghi
+
+    rejection_reasons = [[] for _ in range(len(stats['rows']))]
+    for spec, params in pipeline.steps:
+        for reason, rejected in REASON_RULES[spec.name](stats, **rule_params(spec, params, backend)):
+            for window in np.flatnonzero(rejected):
+                rejection_reasons[window].append(reason)
+    for window in np.flatnonzero(stats['rows'] != helper_functions.window_minutes(period)):
+        rejection_reasons[window].append(helper_functions.not_enough_data_reason(period))
+
+    df = pd.DataFrame(minute_stats.window_means(period), columns=minute_stats.numeric_cols)
+    df.insert(0, time_col, stats[time_col])
+    df['is_valid'] = [0.0 if reasons else 1.0 for reasons in rejection_reasons]
+    df['rejection_reason'] = rejection_reasons
+    return df
+
+
+def evaluate_periods(one_minute_df, periods, backend="auto", filter_config=None,
+                     timezone=solar_position.SITE_TIMEZONE):
+    """
+    Applies the 15 minute filters to windows of every period, from one set of 1 minute statistics.
+    Returns the table of every period (see apply_window_filters), by period.
+    """
+    minute_stats = None if one_minute_df.empty else MinuteStatistics(one_minute_df)
+    return {period: apply_window_filters(one_minute_df, period, backend, filter_config, timezone, minute_stats)
+            for period in periods}
+
+
+def print_summary(window_dfs):
+    """
+    Prints the valid windows of every period.
+    """
+    print("\n🔹 Window periods:\n")
+    for period, df in window_dfs.items():
+        print(f"    ✅ {period:<6} {int(df['is_valid'].sum())} valid windows of {len(df)}")
+    print("")